@@ -56,6 +56,7 @@
         'wizard/memo_config_duplication_wizard_views.xml',
         'wizard/memo_confirmation.xml',
         'wizard/import_logistic_item.xml',
+        'wizard/memo_bulk_action_views.xml',
     ],
     
     'assets': {
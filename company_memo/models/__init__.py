@@ -15,4 +15,14 @@ from . import ir_attachment
 from . import stock_location
 from . import waybill
 from . import sale_order
-from . import crm
\ No newline at end of file
+from . import crm
+from . import memo_finance
+from . import res_currency
+from . import memo_finance_snapshot
+from . import memo_mmr
+from . import memo_profiler
+from . import memo_access
+from . import mail_queue
+from . import memo_stage_graph
+from . import memo_artifact
+from . import memo_cache_version
\ No newline at end of file
@@ -64,6 +64,19 @@ class AccountMoveMemo(models.Model):
         # if invline_without_price:
         #     raise ValidationError(f"All invoice line must have a unit price amount greater than 0 {[rec.product_id.name for rec in self.invoice_line_ids]} ")
         
+    @api.model_create_multi
+    def create(self, vals_list):
+        moves = super(AccountMoveMemo, self).create(vals_list)
+        self.env['memo.finance.snapshot.queue'].enqueue_moves(moves.ids)
+        return moves
+    
+    def write(self, vals):
+        res = super(AccountMoveMemo, self).write(vals)
+        if 'state' in vals or 'line_ids' in vals or 'invoice_line_ids' in vals:
+            # invoice status of the related orders may have changed
+            self.env['memo.finance.snapshot.queue'].enqueue_moves(self.ids)
+        return res
+    
     def action_post(self):
         if self.memo_id:
             self.validate_invoice_lines()
@@ -13,6 +13,14 @@ import logging
 from datetime import date, datetime, timedelta
 import json
 
+from .memo_profiler import profiled
+
+# cursor cache key of the (memo id, stage id) whose artifacts the bulk action creates at once
+DEFERRED_ARTIFACTS = 'memo_deferred_artifacts'
+
+# fields of the memo giving access to it, see memo.access
+MEMO_ACCESS_FIELDS = {'employee_id', 'users_followers', 'memo_setting_id', 'stage_id'}
+
 
 _logger = logging.getLogger(__name__)
 
@@ -80,6 +88,9 @@ class Memo_Model(models.Model):
         result = super(Memo_Model, self).create(vals)
         if self.attachment_ids:
             self.attachment_ids.write({'res_model': self._name, 'res_id': self.id})
+        if vals.get('so_ids') or vals.get('po_ids'):
+            self.env['memo.finance.snapshot.queue'].enqueue_memos(result.ids)
+        self.env['memo.access'].refresh_access(result.ids)
         return result
 
     def _compute_attachment_number(self):
@@ -167,7 +178,7 @@ class Memo_Model(models.Model):
     memo_type_key = fields.Char('Memo type key', readonly=True)
     name = fields.Char('Subject', size=400)
     code = fields.Char('Code', readonly=True, store=True)
-    employee_id = fields.Many2one('hr.employee', string = 'Employee', default =_default_employee) 
+    employee_id = fields.Many2one('hr.employee', string = 'Employee', default =_default_employee, index=True) 
     direct_employee_id = fields.Many2one('hr.employee', string = 'Employee') 
     set_staff = fields.Many2one('hr.employee', string = 'Employee')
     demo_staff = fields.Integer(string='User',
@@ -193,6 +204,7 @@ class Memo_Model(models.Model):
         'memo.stage', 
         string='Stage', 
         store=True,
+        index=True,
         domain=lambda self: self._get_related_stage(),
         )
             
@@ -212,7 +224,7 @@ class Memo_Model(models.Model):
                              required=True,
                              store=True,
                              help='Request Report state')
-    date = fields.Datetime('Request Date', default=fields.Datetime.now())
+    date = fields.Datetime('Request Date', default=fields.Datetime.now(), index=True)
     client_id = fields.Many2one('res.partner', 'Client')
     client_address = fields.Char('Client Address', related="client_id.street", store=True)
     client_address2 = fields.Char('Address 2', related="client_id.street2", store=True)
@@ -456,6 +468,7 @@ class Memo_Model(models.Model):
     memo_setting_id = fields.Many2one(
         'memo.config', 
         string="Memo config id",
+        index=True,
         # related="stage_id.memo_config_id"
         )
     
@@ -978,34 +991,101 @@ class Memo_Model(models.Model):
             # rec.displayed_cost_revenue_margin = '₦' + str("{0:,}".format(total)) if total > 0 else '₦ 0.00'
             rec.displayed_cost_revenue_margin = '₦' + str("{0:,}".format(float(str(total).split('.')[0]))) if total > 0 else '₦ 0.00'
      
+    @api.model
+    def _get_visible_memo_domain(self, user_id):
+        '''memos of the user employee, followed by it, of the employees it supervises
+        or approved by it in the memo config or the current stage, see memo.access'''
+        query, params = self.env['memo.access'].get_visible_memo_query(user_id)
+        return [('id', 'inselect', (query, params))]
+
+    def _get_dashboard_order_sums(self):
+        '''returns for the saved memos in self, the amount of confirmed po (not converted)
+        and the amount_total / amount_untaxed of paid invoices of the so_ids
+        {memo_id: {'confirmed_po': 0.00, 'paid_total': 0.00, 'paid_untaxed': 0.00}}'''
+        memo_ids = [memo_id for memo_id in self.ids if isinstance(memo_id, int)]
+        result = {memo_id: {'confirmed_po': 0.00, 'paid_total': 0.00, 'paid_untaxed': 0.00} for memo_id in memo_ids}
+        if not memo_ids:
+            return result
+        po_field, so_field = self._fields['po_ids'], self._fields['so_ids']
+        self.env['purchase.order'].flush_model(['amount_total', 'state'])
+        self.env['account.move'].flush_model(['amount_total', 'amount_untaxed', 'payment_state', 'move_type'])
+        self.env.cr.execute(f'''
+            SELECT rel.{po_field.column1}, SUM(po.amount_total)
+              FROM {po_field.relation} rel
+              JOIN purchase_order po ON po.id = rel.{po_field.column2}
+             WHERE rel.{po_field.column1} = ANY(%s)
+               AND COALESCE(po.state, '') NOT IN ('draft', 'cancel')
+          GROUP BY 1
+        ''', [memo_ids])
+        for memo_id, amount in self.env.cr.fetchall():
+            result[memo_id]['confirmed_po'] = amount or 0.00
+        self.env.cr.execute(f'''
+            SELECT inv.memo_id, SUM(inv.amount_total), SUM(inv.amount_untaxed)
+              FROM (
+                SELECT DISTINCT rel.{so_field.column1} AS memo_id, move.id, move.amount_total, move.amount_untaxed
+                  FROM {so_field.relation} rel
+                  JOIN sale_order_line sol ON sol.order_id = rel.{so_field.column2}
+                  JOIN sale_order_line_invoice_rel inv_rel ON inv_rel.order_line_id = sol.id
+                  JOIN account_move_line aml ON aml.id = inv_rel.invoice_line_id
+                  JOIN account_move move ON move.id = aml.move_id
+                 WHERE rel.{so_field.column1} = ANY(%s)
+                   AND move.move_type IN ('out_invoice', 'out_refund')
+                   AND move.payment_state IN ('paid', 'in_payment')
+              ) inv
+          GROUP BY 1
+        ''', [memo_ids])
+        for memo_id, paid_total, paid_untaxed in self.env.cr.fetchall():
+            result[memo_id].update({'paid_total': paid_total or 0.00, 'paid_untaxed': paid_untaxed or 0.00})
+        return result
+
+    def _get_dashboard_order_values(self, finances, order_sums):
+        '''returns the so values, po values (as compute_so_naira_dollar_value and compute_po_naira_dollar_value),
+        confirmed po amount, paid invoices amount_total and amount_untaxed of the memo.
+        Unsaved memos (onchange) are computed from their orders'''
+        self.ensure_one()
+        if self.id in finances:
+            so_totals, po_totals = finances[self.id]['so'], finances[self.id]['po']
+            sums = order_sums[self.id]
+            return (
+                (round(so_totals['budget'], 2), round(so_totals['active'], 2), round(so_totals['invoiced'], 2), round(so_totals['to_invoice'], 2)),
+                (round(po_totals['budget']), round(po_totals['confirmed']), round(po_totals['invoiced']), round(po_totals['to_invoice'], 2)),
+                sums['confirmed_po'], sums['paid_total'], sums['paid_untaxed'],
+            )
+        paid_invoices = self.so_ids.mapped('invoice_ids').filtered(
+            lambda inv: inv.payment_state in ('paid', 'in_payment'))
+        confirmed_pos = self.mapped('po_ids').filtered(lambda po: po.state not in ['draft', 'cancel'])
+        return (
+            self.compute_so_naira_dollar_value(self.so_ids),
+            self.compute_po_naira_dollar_value(self.po_ids),
+            sum(confirmed_pos.mapped('amount_total')),
+            sum(paid_invoices.mapped('amount_total')),
+            sum(paid_invoices.mapped('amount_untaxed')),
+        )
+
     @api.depends('name')
+    @profiled()
     def compute_dashboard_total(self):
+        # all the orders and invoices amounts of the memos are loaded at once
+        saved_memos = self.filtered(lambda memo: memo.name and isinstance(memo.id, int))
+        finances = self.env['memo.finance'].compute_totals(saved_memos, 'NGN')
+        order_sums = saved_memos._get_dashboard_order_sums()
         for rec in self:
             closed_stage = rec.memo_setting_id.stage_ids[-1].id if rec.memo_setting_id.stage_ids else 0
             # total_budgeted, total_revenue, total_paid_revenue = 0,0,0
             
             if rec.name: 
                 frame_agreement_budget = 0
-                # cost = rec.compute_po_naira_dollar_value(rec.so_ids)
-                budget, revenue, paid_revenue, total_so_to_be_invoiced = rec.compute_so_naira_dollar_value(rec.so_ids)
-                _logger.info(f"here is the computed value: {budget} {revenue} {paid_revenue}")
+                so_values, sum_po_ids, confirmed_po_amount, total_with_tax, total_without_tax = \
+                    rec._get_dashboard_order_values(finances, order_sums)
+                budget, revenue, paid_revenue, total_so_to_be_invoiced = so_values
                 
                 paid_revenue_untaxed = 0
-                paid_invoices = rec.so_ids.mapped('invoice_ids').filtered(
-                    lambda inv: inv.payment_state in ('paid', 'in_payment')
-                )
-                if paid_invoices:
-                    total_with_tax = sum(paid_invoices.mapped('amount_total'))
-                    total_without_tax = sum(paid_invoices.mapped('amount_untaxed'))
-                    
-                    if total_with_tax > 0:
-                        untaxed_ratio = total_without_tax / total_with_tax
-                        paid_revenue_untaxed = paid_revenue * untaxed_ratio
+                if total_with_tax > 0:
+                    untaxed_ratio = total_without_tax / total_with_tax
+                    paid_revenue_untaxed = paid_revenue * untaxed_ratio
                         
                 frame_agreement_budget = sum([r.agreed_budget for r in rec.frame_agreement_ids])
-                sum_po_ids = rec.compute_po_naira_dollar_value(rec.po_ids)
                 total_cost = sum_po_ids[0]
-                _logger.info(f"here is the computed value: {total_cost} {budget} {revenue} {paid_revenue}")
                 
                 rec.total_cost = total_cost
                 total_so_to_be_invoiced = total_so_to_be_invoiced if rec.stage_id.id != closed_stage else 0 
@@ -1031,9 +1111,7 @@ class Memo_Model(models.Model):
                 rec.total_budget = budget if budget > 1 else frame_agreement_budget \
                     if frame_agreement_budget > 1 else sum_po_ids[0]
                 # pos not in draft or cancel state
-                confirmed_pos = rec.mapped('po_ids').filtered(
-                    lambda po: po.state not in ['draft', 'cancel'])
-                rec.total_paid_po_expenses = sum([amt.amount_total for amt in confirmed_pos])
+                rec.total_paid_po_expenses = confirmed_po_amount
                 
                 ##################
                 rec.total_budgeted = budget
@@ -1114,159 +1192,36 @@ class Memo_Model(models.Model):
     def view_general_finance(self):
         pass 
                 
+    @profiled()
     def compute_so_naira_dollar_value(self, so_ids, currency='NGN'):
         total_budget_revenue, total_invoiced_revenue, total_paid_revenue, total_so_to_be_invoiced = 0.00, 0.00, 0.00, 0.00
         if so_ids:
-            currency_usd_id = self.env.ref('base.USD') 
-            usd_rate = currency_usd_id.mapped('rate_ids')
-            rate = usd_rate[0].inverse_company_rate
+            memo_finance = self.env['memo.finance']
+            rate_index = memo_finance._get_usd_rate_index()
             for so in so_ids:
-                currency_id = so.pricelist_id.currency_id
-                # compute btw dates of date approve
-                two_date_before, two_date_after = so.date_order + timedelta(days=-2), so.date_order + timedelta(days=2)
-                if currency in ['Naira', 'NGN']:
-                    # do conversion to naira value
-                    if currency_id.name == 'USD' or currency_id.id == 1:
-                        # set the inverse company rate. ie compute from USD to naira
-                        # filter the currency rate as at that time, if not found, used the current rate
-                        # e.g 22 sep < 24 sep > 26 sept
-                        
-                        currency_rate = currency_id.mapped('rate_ids').filtered(
-                            lambda cr: two_date_before.date() < cr.name and two_date_after.date() > cr.name
-                            )
-                        currency_rate_alternative = currency_id.rate_ids
-                        if currency_rate.ids: # or currency_rate_alternative:
-                            # rate = currency_rate[0].inverse_inverse_company_rate# or currency_rate_alternative[0].inverse_inverse_company_rate
-                            rate = currency_rate[0].inverse_company_rate# or currency_rate_alternative[0].inverse_inverse_company_rate
-                            total_budget_revenue += float(so.amount_total * rate)
-                            total_invoiced_revenue += float(so.amount_total * rate) if so.state not in ['cancel'] else 0.00
-                            total_so_to_be_invoiced += float(so.amount_total * rate) if so.invoice_status not in ['invoiced'] else 0.00
-                            total_paid_revenue += float(so.amount_total * rate) if so.invoice_status in ['invoiced'] else 0.00
-                        elif usd_rate:
-                            rate = usd_rate[0].inverse_company_rate
-                            total_budget_revenue += float(so.amount_total * rate)
-                            total_invoiced_revenue += float(so.amount_total * rate) if so.state not in ['cancel'] else 0.00
-                            total_paid_revenue += float(so.amount_total * rate) if so.invoice_status in ['invoiced'] else 0.00
-                            total_so_to_be_invoiced += float(so.amount_total * rate) if so.invoice_status not in ['invoiced'] else 0.00
-                        else:
-                            raise ValidationError('You must ensure that both currencies (NGN, USD) has at least an update rate ids')
-                    else: # value to display is in naira
-                        total_budget_revenue += float(so.amount_total)
-                        total_invoiced_revenue += float(so.amount_total) if so.state not in ['cancel'] else 0.00
-                        total_paid_revenue += float(so.amount_total) if so.invoice_status in ['invoiced'] else 0.00
-                        total_so_to_be_invoiced += float(so.amount_total) if so.invoice_status not in ['invoiced'] else 0.00
-                else: 
-                    # Convert all value to USD value
-                    _logger.info(f'Rate SO converted {so.amount_total} --- {so.amount_total / 1600}')
-                    if currency_id.name in ['NGN', 'Naira', False]:# or currency_id.currency_unit_label == 'Naira':
-                        currency_rate = usd_rate.filtered(
-                            lambda cr: two_date_before.date() < cr.name and two_date_after.date() > cr.name)
-                        if currency_rate.ids:
-                            # _logger.info(f'Rate sxxxx SO {currency_usd_id} --- {so}... {currency_rate} or {usd_rate}')
-                            rate = currency_rate[0].inverse_company_rate or usd_rate[0].inverse_company_rate
-                            # total += so.amount_total / rate
-                            total_budget_revenue += float(so.amount_total / rate)
-                            total_invoiced_revenue += float(so.amount_total / rate) if so.state not in ['cancel'] else 0.00
-                            total_paid_revenue += float(so.amount_total / rate) if so.invoice_status in ['invoiced'] else 0.00
-                            total_so_to_be_invoiced += float(so.amount_total / rate) if so.invoice_status not in ['invoiced'] else 0.00
-                            # ie. 50000 * 1600
-                        elif usd_rate:
-                            rate = usd_rate[0].inverse_company_rate
-                            total_budget_revenue += float(so.amount_total / rate)
-                            total_invoiced_revenue += float(so.amount_total / rate) if so.state not in ['cancel'] else 0.00
-                            total_paid_revenue += float(so.amount_total / rate) if so.invoice_status in ['invoiced'] else 0.00
-                            total_so_to_be_invoiced += float(so.amount_total / rate) if so.invoice_status not in ['invoiced'] else 0.00
-                            _logger.info(f"AT WHAT RATE {so.name} {so.amount_total} -{rate} TOTAL {total_budget_revenue}")
-                        else:
-                            raise ValidationError('You must ensure that currencies (USD) has at least an update rate ids')
-                    else: # value to display is in USD
-                        _logger.info(f"AT WHAT RATE 2{so.name}")
-                        # total += so.amount_total
-                        total_budget_revenue += float(so.amount_total)
-                        total_invoiced_revenue += float(so.amount_total) if so.state not in ['cancel'] else 0.00
-                        total_paid_revenue += float(so.amount_total) if so.invoice_status in ['invoiced'] else 0.00
-                        total_so_to_be_invoiced += float(so.amount_total) if so.invoice_status not in ['invoiced'] else 0.00
-        _logger.info(f"TOTAL COMPUTED 2 {total_budget_revenue} =--- {total_invoiced_revenue},  -- {total_paid_revenue}")
+                # converts to naira or USD value at the rate of the order date
+                amount = float(memo_finance._convert_amount(
+                    so.amount_total, so.pricelist_id.currency_id, so.date_order, currency, rate_index))
+                total_budget_revenue += amount
+                total_invoiced_revenue += amount if so.state not in ['cancel'] else 0.00
+                total_paid_revenue += amount if so.invoice_status in ['invoiced'] else 0.00
+                total_so_to_be_invoiced += amount if so.invoice_status not in ['invoiced'] else 0.00
         return round(total_budget_revenue, 2), round(total_invoiced_revenue, 2), round(total_paid_revenue, 2),  round(total_so_to_be_invoiced, 2)
     
+    @profiled()
     def compute_po_naira_dollar_value(self, poo, currency='NGN'):
         total_cost, total_invoiced_cost, total_paid_cost, total_po_to_be_invoiced = 0.00, 0.00, 0.00, 0.00
         if poo:
-            _logger.info(f'TEST MY {poo}')
+            memo_finance = self.env['memo.finance']
+            rate_index = memo_finance._get_usd_rate_index()
             for po in poo:
-                currency_id = po.currency_id
-                # compute btw dates of date approve
-                two_date_before, two_date_after = po.date_approve or po.date_order + timedelta(days=-2), po.date_approve or po.date_order + timedelta(days=2)
-                if currency in ['Naira', 'NGN']:
-                    # do conversion to naira value
-                    if currency_id.name == 'USD' or currency_id.id == 1:
-                        # set the inverse company rate. ie compute from USD to naira
-                        # filter the currency rate as at that time, if not found, used the current rate
-                        # e.g 22 sep < 24 sep > 26 sept
-                        currency_rate = currency_id.mapped('rate_ids').filtered(
-                            lambda cr: two_date_before.date() < cr.name and two_date_after.date() > cr.name
-                            )
-                        currency_usd_id = self.env.ref('base.USD')
-                        usd_rate = currency_usd_id.mapped('rate_ids')
-                        
-                        currency_rate_alternative = currency_id.rate_ids
-                        if currency_rate.ids: # if currency_rate or usd_rate:
-                            _logger.info(f"am joj {currency_rate}")
-                            rate = currency_rate[0].inverse_company_rate# or currency_rate_alternative[0].inverse_inverse_company_rate
-                            total_cost += po.amount_total * rate
-                            total_invoiced_cost += po.amount_total * rate if po.state not in ['draft', 'cancel'] else 0.00
-                            total_paid_cost += po.amount_total * rate if po.invoice_status in ['invoiced'] else 0.00
-                            total_po_to_be_invoiced += float(po.amount_total * rate) if po.invoice_status not in ['invoiced'] else 0.00
-                        
-                            # ie. 50000 * 0.002600
-                        elif usd_rate:
-                            rate = usd_rate[0].inverse_company_rate
-                            total_cost += po.amount_total * rate
-                            total_invoiced_cost += (po.amount_total * rate) if po.state not in ['draft', 'cancel'] else 0.00
-                            total_paid_cost += (po.amount_total * rate) if po.invoice_status in ['invoiced'] else 0.00
-                            total_po_to_be_invoiced += float(po.amount_total * rate) if po.invoice_status not in ['invoiced'] else 0.00
-                        else:
-                            raise ValidationError('You must ensure that both currencies (NGN, USD) has at least an update rate ids')
-                    else: # value to display is in naira
-                        total_cost += po.amount_total
-                        total_invoiced_cost += po.amount_total if po.state not in ['draft', 'cancel'] else 0.00
-                        total_paid_cost += po.amount_total if po.invoice_status in ['invoiced'] else 0.00
-                        total_po_to_be_invoiced += float(po.amount_total) if po.invoice_status not in ['invoiced'] else 0.00
-                else: 
-                    # Convert all to USD value
-                    if currency_id.name in ['NGN', 'Naira', False] or currency_id.currency_unit_label == 'Naira':
-                        # set the company rate. ie compute from naira to USD
-                        # filter the currency rate as at that time, if not found, used the current rate
-                        # e.g 22 sep < 24 sep > 26 sept
-                        currency_usd_id = self.env.ref('base.USD')
-                        usd_rate = currency_usd_id.mapped('rate_ids')
-                        
-                        currency_rate = usd_rate.filtered(
-                            lambda cr: two_date_before.date() < cr.name and two_date_after.date() > cr.name
-                            )
-                        # currency_rate_alternative = currency_id.rate_ids
-                        if currency_rate.ids:
-                            rate = currency_rate[0].inverse_company_rate or usd_rate[0].inverse_company_rate
-                            # total += po.amount_total / rate
-                            total_cost += float(po.amount_total / rate)
-                            total_invoiced_cost += (po.amount_total / rate) if po.state not in ['draft', 'cancel'] else 0.00
-                            total_paid_cost += po.amount_total / rate if po.invoice_status in ['invoiced'] else 0.00
-                            total_po_to_be_invoiced += float(po.amount_total / rate) if po.invoice_status not in ['invoiced'] else 0.00
-                            # ie. 50000 * 1600
-                        elif usd_rate:
-                            rate = usd_rate[0].inverse_company_rate
-                            total_cost += float(po.amount_total / rate)
-                            total_invoiced_cost += (po.amount_total / rate) if po.state not in ['draft', 'cancel'] else 0.00
-                            total_paid_cost += (po.amount_total / rate) if po.invoice_status in ['invoiced'] else 0.00
-                            total_po_to_be_invoiced += float(po.amount_total / rate) if po.invoice_status not in ['invoiced'] else 0.00
-                        else:
-                            raise ValidationError('You must ensure that both currencies (NGN, USD) has at least an update rate ids')
-                    else: # value to display is in USD
-                        total_cost += po.amount_total
-                        total_invoiced_cost += po.amount_total if po.state not in ['draft', 'cancel'] else 0.00
-                        total_paid_cost += po.amount_total if po.invoice_status in ['invoiced'] else 0.00
-                        total_po_to_be_invoiced += float(po.amount_total) if po.invoice_status not in ['invoiced'] else 0.00
-        _logger.info(f'TOTAL NOT INVOICED==> {total_po_to_be_invoiced}')
+                # converts to naira or USD value at the rate of the approval date
+                amount = float(memo_finance._convert_amount(
+                    po.amount_total, po.currency_id, po.date_approve or po.date_order, currency, rate_index))
+                total_cost += amount
+                total_invoiced_cost += amount if po.state not in ['draft', 'cancel'] else 0.00
+                total_paid_cost += amount if po.invoice_status in ['invoiced'] else 0.00
+                total_po_to_be_invoiced += amount if po.invoice_status not in ['invoiced'] else 0.00
         return round(total_cost), round(total_invoiced_cost), round(total_paid_cost), round(total_po_to_be_invoiced, 2)
     
     @api.depends('memo_setting_id')
@@ -1400,6 +1355,10 @@ class Memo_Model(models.Model):
         if 'users_followers' in vals:
             if len(self.users_followers) < old_length:
                 raise ValidationError("Sorry you cannot remove followers")
+        if 'so_ids' in vals or 'po_ids' in vals:
+            self.env['memo.finance.snapshot.queue'].enqueue_memos(self.ids)
+        if set(vals) & MEMO_ACCESS_FIELDS:
+            self.env['memo.access'].refresh_access(self.ids)
         return res
 
     @api.constrains('document_folder')
@@ -1493,11 +1452,6 @@ class Memo_Model(models.Model):
                     self.users_followers = [
                         (4, self.employee_id.administrative_supervisor_id.id),
                         ]
-                    invoices, documents = self.generate_required_artifacts(self.stage_id, self, '')
-                    self.sudo().write({
-                        'invoice_ids': [(4, iv) for iv in invoices],
-                        'attachment_ids': [(4, dc) for dc in documents]
-                        })
                     self.generate_sub_stage_artifacts(self.stage_id)
                 else:
                     self.memo_type = False
@@ -1510,144 +1464,58 @@ class Memo_Model(models.Model):
             self.stage_id = False
 
     def generate_sub_stage_artifacts(self, stage_id):
-        sub_stage_ids = stage_id.sub_stage_ids
-        self.has_sub_stage = True if stage_id.sub_stage_ids else False
-        self.sudo().write({
-                'memo_sub_stage_ids': [(3, exist_stage.id) for exist_stage in self.memo_sub_stage_ids],
-                })
-        if sub_stage_ids:
-            for stg in sub_stage_ids:
-                sub_stage = self.env['memo.sub.stage'].sudo().create({
-                    'name': stg.name,
-                    'memo_id': self.id,
-                    'sub_stage_id': stg.id,
-                    'approver_ids': stg.approver_ids.ids,
-                    'description': stg.description,
+        """artifacts and sub stages of the stage for the memo, see generate_stages_artifacts"""
+        self.generate_stages_artifacts([(self, stage_id)])
+
+    @api.model
+    def generate_stages_artifacts(self, memo_stages):
+        """Creates the invoices, documents and sub stages required by the stages of the memos.
+        memo_stages: [(memo, stage)], the sub stages are those of the last stage of each memo.
+        The records of all the memos are created with one create per model"""
+        items, sub_stage_values, last_stages = [], [], {}
+        for memo, stage in memo_stages:
+            items.append((memo, stage, memo, memo.code))
+            last_stages[memo] = stage
+        for memo, stage in last_stages.items():
+            memo.has_sub_stage = True if stage.sub_stage_ids else False
+            memo.sudo().write({
+                'memo_sub_stage_ids': [(3, exist_stage.id) for exist_stage in memo.memo_sub_stage_ids],
                 })
-                invoices, documents = self.generate_required_artifacts(stg, sub_stage, '')
-                sub_stage.sudo().write({
+            sub_stage_values += [(memo, stg) for stg in stage.sub_stage_ids]
+        sub_stages = self.env['memo.sub.stage'].sudo().create([{
+            'name': stg.name,
+            'memo_id': memo.id,
+            'sub_stage_id': stg.id,
+            'approver_ids': stg.approver_ids.ids,
+            'description': stg.description,
+        } for memo, stg in sub_stage_values])
+        items += [(memo, stg, sub_stage, '') for (memo, stg), sub_stage in zip(sub_stage_values, sub_stages)]
+        artifacts = self.env['memo.artifact.builder'].generate_artifacts(items)
+        for (memo, stage, obj, code), (invoices, documents) in zip(items, artifacts):
+            if invoices or documents:
+                obj.sudo().write({
                 'invoice_ids': [(4, iv) for iv in invoices],
                 'attachment_ids': [(4, dc) for dc in documents]
                 })
-                
-                self.sudo().write({
-                'memo_sub_stage_ids': [(4, sub_stage.id)],
+        for memo in last_stages:
+            memo_sub_stages = [sub_stage.id for (sub_memo, stg), sub_stage in zip(sub_stage_values, sub_stages) if sub_memo == memo]
+            if memo_sub_stages:
+                memo.sudo().write({
+                'memo_sub_stage_ids': [(4, sub_stage_id) for sub_stage_id in memo_sub_stages],
                 })
 
     def generate_required_artifacts(self, stage_id, obj, code=''):
         """This generate invoice lines from the configure stage"""
-        stage_invoice_line = stage_id.mapped('required_invoice_line')
-        stage_document_line = stage_id.mapped('required_document_line')
-        invoices, documents= [], []
-        if stage_invoice_line:
-            if not self.client_id:
-                raise ValidationError("Client / Partner must be selected before invoice validation")
-            for stage_inv in stage_invoice_line:
-                already_existing_stage_invoice_line = obj.mapped('invoice_ids').filtered(
-                    lambda exist: exist.stage_invoice_name == stage_inv.name and exist.state not in ['posted'])
-                if not already_existing_stage_invoice_line:
-                    movetype = 'in_invoice' if stage_inv.move_type == 'vendor' else 'out_invoice'
-                    invid = self.function_generate_move_entries(
-                        invoice_name = f"{stage_inv.name}/{self.id}/{self.stage_id.id}", invoice_required=stage_inv.compulsory, code=code, movetype=movetype)
-                    
-                    invoices.append(invid.id)
-
-        if stage_document_line:
-            for stage_doc in stage_document_line:
-                already_existing_stage_document_line = obj.mapped('attachment_ids').filtered(
-                    lambda exist: exist.stage_document_name == stage_doc.name)
-                if not already_existing_stage_document_line:
-                    doc_name = f"EXP-P/{stage_doc.name}/{code}"
-                    # ref = str(self.id)[] if str(self.id).startswith('NewId') else self.id
-                    docid = self.function_generate_attachment(
-                        attachment_name=stage_doc.name, 
-                        report_binary = False, 
-                        mimetype = False,
-                        document_name = f"{stage_doc.name}-{self.id}-{stage_id.id}", 
-                        compulsory=stage_doc.compulsory,
-                        code=code
-                        )
-                    documents.append(docid.id) 
+        invoices, documents = self.env['memo.artifact.builder'].generate_artifacts([(self, stage_id, obj, code)])[0]
         return invoices, documents, 
 
     def function_generate_attachment(self, **kwargs):
-        attachment_name, report_binary, mimetype,document_name, compulsory = kwargs.get('attachment_name'),\
-            kwargs.get('report_binary'), kwargs.get('mimetype'), kwargs.get('document_name'), \
-            kwargs.get('compulsory')
-        code = kwargs.get('code')
-        attachObj = self.env['ir.attachment']
-        attachid = attachObj.search([('stage_document_name', '=', document_name),('code', '=', code)], limit=1) # recasting this means you must recast this line above
-        if not attachid:
-            attachid = attachObj.create({
-                'name': attachment_name,
-                # 'type': 'binary',
-                'datas': report_binary,
-                'store_fname': attachment_name,
-                'res_model': self._name,
-                'res_id': self.id,
-                'mimetype': mimetype,
-                'stage_document_name': document_name,
-                'stage_document_required': compulsory,
-                'code': code,
-                'memo_id': self.id,
-            })
-        return attachid
+        return self.env['memo.artifact.builder']._create_documents([(self, kwargs)])[0]
     
     def function_generate_move_entries(self, **kwargs):
         """Check if the user is enlisted as the approver for memo type
         if approver is an account officer, system generates move and open the exact record"""
-        # purchase payment journal
-        movetype = kwargs.get('movetype')
-        purchase_journal_id = self.env['account.journal'].search(
-        [('type', '=', 'purchase'),
-            ('code', '=', 'BILL')
-            ], limit=1)
-        sale_journal_id = self.env['account.journal'].search(
-        [('type', '=', 'sale'), ('code', '=', 'INV')], limit=1)
-        journal_id = purchase_journal_id if movetype == 'in_invoice' else sale_journal_id
-        if not journal_id:
-            raise ValidationError(
-                "No journal configured for accounting, kindly contact admin to create one."
-                )
-        invoice_name = kwargs.get('invoice_name') or "-"
-        invoice_required = kwargs.get('invoice_required')
-        account_move = self.env['account.move'].sudo()
-        # Please be careful not to remove this name below, 
-        # name = f"EXP-P/{invoice_name}/{kwargs.get('code')}"
-        prefix = 'P000001' if movetype == 'in_invoice' else 'S000001'
-        suffix = '100' if self.memo_type_key in ['import_process', 'export_process'] else '200'
-        domain = ('move_type', '=', 'in_invoice') if movetype == 'in_invoice' else ('move_type', '=', 'out_invoice')
-        last_invoice = self.env['account.move'].search(
-            [('name', 'ilike', prefix), domain], 
-            order="create_date desc", 
-            limit=1
-            )
-        
-        if last_invoice:
-            lastinv = last_invoice.name.split('-')
-            suffix = int(lastinv[1]) + 1 if len(lastinv) > 1 else suffix
-        prefix_code = f"{prefix}-{suffix}" 
-        name = prefix_code
-        inv = account_move.search([('name', '=', name)], limit=1) # recasting this means you must recast this line above
-        if not inv:
-            partner_id = self.client_id
-            inv = account_move.create({ 
-                'memo_id': self.id,
-                'ref': name, #f'{prefix_code}-{self.code}',
-                'origin': self.code,
-                'partner_id': partner_id.id,
-                'company_id': self.env.user.company_id.id,
-                'currency_id': self.env.user.company_id.currency_id.id,
-                # Do not set default name to account move name, because it
-                'name': name,
-                'move_type': movetype,
-                'invoice_date': fields.Date.today(),
-                'date': fields.Date.today(),
-                'journal_id': journal_id.id,
-                'stage_invoice_name': invoice_name or '',
-                'stage_invoice_required': invoice_required if invoice_required else False,
-            })
-        return inv
+        return self.env['memo.artifact.builder']._create_invoices([(self, kwargs)])[0]
 
     @api.depends('approver_id')
     def compute_user_is_approver(self):
@@ -1776,7 +1644,7 @@ class Memo_Model(models.Model):
                 })
 
     def get_url(self, id):
-        base_url = http.request.env['ir.config_parameter'].sudo().get_param('web.base.url')
+        base_url = self.get_base_url()
         internal_path = "/web#id={}&model=memo.model&view_type=form".format(id)
         internal_url = base_url + internal_path
         return "<a href='{}'>Click</a>".format(internal_url)
@@ -1911,6 +1779,27 @@ class Memo_Model(models.Model):
             raise ValidationError("Please kindly ensure date paid is added")
             
     def forward_memo(self):
+        self.validate_memo_forward()
+        view_id = self.env.ref('company_memo.memo_model_forward_wizard')
+        condition_stages = [self.stage_id.yes_conditional_stage_id.id, self.stage_id.no_conditional_stage_id.id] or []
+        return {
+                'name': 'Forward Memo',
+                'view_type': 'form',
+                'view_id': view_id.id,
+                "view_mode": 'form',
+                'res_model': 'memo.foward',
+                'type': 'ir.actions.act_window',
+                'target': 'new',
+                'context': {
+                    'default_memo_record': self.id,
+                    'default_resp': self.env.uid,
+                    'default_dummy_conditional_stage_ids': [(6, 0, condition_stages)],
+                    'default_has_conditional_stage': True if self.stage_id.memo_has_condition else False,
+                },
+            }
+
+    def validate_memo_forward(self):
+        """checks of the memo data before it is forwarded"""
         self.validate_waybill_details()
         self.validate_po_line()
         self.validate_so_line()
@@ -1947,23 +1836,6 @@ class Memo_Model(models.Model):
                 raise ValidationError("Please add invoice or payment lines")
         elif self.memo_type.memo_key == "material_request" and not self.product_ids:
             raise ValidationError("Please add request line") 
-        view_id = self.env.ref('company_memo.memo_model_forward_wizard')
-        condition_stages = [self.stage_id.yes_conditional_stage_id.id, self.stage_id.no_conditional_stage_id.id] or []
-        return {
-                'name': 'Forward Memo',
-                'view_type': 'form',
-                'view_id': view_id.id,
-                "view_mode": 'form',
-                'res_model': 'memo.foward',
-                'type': 'ir.actions.act_window',
-                'target': 'new',
-                'context': {
-                    'default_memo_record': self.id,
-                    'default_resp': self.env.uid,
-                    'default_dummy_conditional_stage_ids': [(6, 0, condition_stages)],
-                    'default_has_conditional_stage': True if self.stage_id.memo_has_condition else False,
-                },
-            }
 
     """The wizard action passes the employee whom the memo was director to this function."""
     def get_initial_stage(self, memo_type, department_id):
@@ -1971,8 +1843,9 @@ class Memo_Model(models.Model):
             ('memo_type.memo_key', '=', memo_type),
             ('department_id', '=', department_id)
             ], limit=1)
-        if memo_settings and memo_settings.stage_ids:
-            initial_stage_id = memo_settings.stage_ids[0]
+        graph = self.env['memo.stage.graph'].get_config_graph(memo_settings.id)
+        if graph and graph['stage_ids']:
+            initial_stage_id = self.env['memo.stage'].browse(graph['stage_ids'][0])
         else:
             initial_stage_id= self.env.ref('company_memo.memo_initial_stage')
         return initial_stage_id
@@ -1981,28 +1854,21 @@ class Memo_Model(models.Model):
         """
         args: from_website: used to decide if the record is 
         generated from the website or from odoo internal use
+        returns the approver ids and the id of the stage following current_stage_id
+        in the compiled memo config of the memo type and employee department
         """
-        approver_ids = []
-        memo_settings = self.env['memo.config'].sudo().search([
-            ('memo_type', '=', self.memo_type.id),
-            ('department_id', '=', self.employee_id.department_id.id)
-            ], limit=1)
-        memo_setting_stages = memo_settings.mapped('stage_ids').filtered(
-            lambda skp: skp.id != self.stage_to_skip.id
-        )
-        if memo_settings and current_stage_id:
-            mstages = memo_settings.stage_ids # [3,6,8,9]
-            _logger.info(f'Found stages are {memo_setting_stages.ids}')
-            last_stage = mstages[-1] if mstages else False # 'e.g 9'
-            if last_stage and last_stage.id != current_stage_id.id:
-                current_stage_index = memo_setting_stages.ids.index(current_stage_id.id)
-                next_stage_id = memo_setting_stages.ids[current_stage_index + 1] # to get the next stage
-            else:
-                next_stage_id = self.stage_id.id
-            next_stage_record = self.env['memo.stage'].browse([next_stage_id])
-            if next_stage_record:
-                approver_ids = next_stage_record.approver_ids.ids
-            return approver_ids, next_stage_record.id
+        graph = self.env['memo.stage.graph'].get_graph(self.memo_type.id, self.employee_id.department_id.id)
+        if graph and current_stage_id:
+            _logger.debug("Found stages are %s", graph['stage_ids'])
+            next_stage_id = False
+            if graph['final_stage_id'] != current_stage_id.id:
+                next_stage_id = self.env['memo.stage.graph'].next_stage_id(
+                    graph, current_stage_id.id, self.stage_to_skip.id)
+            next_stage_id = next_stage_id or self.stage_id.id
+            approver_ids = list(graph['approver_ids'].get(next_stage_id, ()))
+            if next_stage_id and next_stage_id not in graph['approver_ids']:
+                approver_ids = self.env['memo.stage'].browse(next_stage_id).approver_ids.ids
+            return approver_ids, next_stage_id
         else:
             raise ValidationError(
                 "Please ensure to configure the Memo type for the employee department"
@@ -2013,16 +1879,15 @@ class Memo_Model(models.Model):
             pass
         else:
             # updating the next stage
-            approver_ids = self.get_next_stage_artifact(self.stage_id)[0] 
-            next_stage_id= default_stage or self.get_next_stage_artifact(self.stage_id)[1] 
+            approver_ids, next_stage_id = self.get_next_stage_artifact(self.stage_id)
+            next_stage_id = default_stage or next_stage_id
             self.stage_id = next_stage_id
             self.freeze_po_budget = self.stage_id.freeze_po_budget
-            invoices, documents = self.generate_required_artifacts(self.stage_id, self, self.code)
-            self.sudo().write({
-                'invoice_ids': [(4, iv) for iv in invoices],
-                'attachment_ids': [(4, dc) for dc in documents]
-                })
-            self.generate_sub_stage_artifacts(self.stage_id)
+            if self.env.context.get('memo_defer_artifacts'):
+                # created by the bulk action for all the memos of the stage group at once
+                self.env.cr.cache.setdefault(DEFERRED_ARTIFACTS, []).append((self.id, self.stage_id.id))
+            else:
+                self.generate_stages_artifacts([(self, self.stage_id)])
             # determining the stage to update the already existing state used to hide or display some components
             if self.stage_id:
                 if self.stage_id.is_approved_stage:
@@ -2036,9 +1901,9 @@ class Memo_Model(models.Model):
                         'users_followers': [(4, appr.id) for appr in self.sudo().stage_id.approver_ids],
                         'set_staff': assigned_to.id if assigned_to else self.sudo().stage_id.approver_ids[0].id # FIXME To be reviewed
                         })
-            if self.memo_setting_id and self.memo_setting_id.stage_ids:
-                ms = self.memo_setting_id.stage_ids
-                last_stage = ms[-1]
+            setting_graph = self.env['memo.stage.graph'].get_config_graph(self.memo_setting_id.id)
+            if setting_graph and setting_graph['final_stage_id']:
+                last_stage = self.env['memo.stage'].browse(setting_graph['final_stage_id'])
                 # if id of next stage is the same with the id of the last stage of memo setting stages, 
                 # write stage to done
                 random_memo_approver_ids = [rec.id for rec in self.memo_setting_id.approver_ids if rec]
@@ -2193,9 +2058,8 @@ class Memo_Model(models.Model):
             if so_without_invoice_payment:
                 raise ValidationError("Please kindly create and pay the bills for each Client Invoice lines")
  
-    def mail_sending_direct(self, body_msg): 
-        subject = "Memo Notification"
-        email_from = self.env.user.email
+    def _get_notification_emails(self):
+        """returns (email_to, email_cc) of the notifications of the memo at its current stage"""
         follower_list = [item2.work_email for item2 in self.users_followers if item2.work_email]
         stage_followers_list = [
             appr.work_email for appr in self.stage_id.memo_config_id.approver_ids if appr.work_email
@@ -2207,18 +2071,19 @@ class Memo_Model(models.Model):
             sub_task_list += [ap.work_email for ap in subtask.approver_ids if ap.work_email]
         email_list = follower_list + stage_followers_list + sub_task_list
         approver_emails = [eml.work_email for eml in self.stage_id.approver_ids if eml.work_email] + sub_task_list
-        mail_to = (','.join(approver_emails)) 
-        emails = (','.join(elist for elist in email_list))
-        mail_data = {
-                'email_from': email_from,
-                'subject': subject,
-                'email_to': mail_to or emails,
-                'reply_to': email_from,
-                'email_cc': emails,
-                'body_html': body_msg
-            }
-        mail_id = self.env['mail.mail'].sudo().create(mail_data)
-        self.env['mail.mail'].sudo().send(mail_id)
+        return approver_emails or email_list, email_list
+
+    def mail_sending_direct(self, body_msg): 
+        if self.env.context.get('memo_notification_digest'):
+            # bulk actions send a single digest per recipient once all the memos are processed
+            return
+        subject = "Memo Notification"
+        email_from = self.env.user.email
+        email_to, email_cc = self._get_notification_emails()
+        # sent by the mail queue cron, notifications of the memo within a short window are merged
+        self.env['memo.mail.queue'].enqueue(
+            email_to, subject, body_msg,
+            email_from=email_from, email_cc=email_cc, reply_to=email_from, record=self)
     
     def _get_group_users(self):
         followers = []
@@ -2272,18 +2137,28 @@ class Memo_Model(models.Model):
         return self.approve_memo()
 
     def approve_memo(self): # Always available to Some specific groups
+        self.validate_memo_approval()
+        return self.process_memo_approval()
+
+    def validate_memo_approval(self, is_config_approver=None):
+        """checks before the memo is approved. is_config_approver given, the checks of the
+        user on the stage are skipped (already done for all the memos of the stage)"""
         ### check if supervisor has commented on the memo if it is server access
         self.check_supervisor_comment()
         self.procurement_confirmation()
-        is_config_approver = self.determine_if_user_is_config_approver()
+        check_stage = is_config_approver is None
+        if check_stage:
+            is_config_approver = self.determine_if_user_is_config_approver()
         if self.env.uid == self.employee_id.user_id.id and not is_config_approver:
             raise ValidationError(
                 """You are not Permitted to approve a Payment Memo. 
                 Forward it to the authorized Person""")
-        if self.env.uid not in [r.user_id.id for r in self.stage_id.approver_ids]:
+        if check_stage and self.env.uid not in [r.user_id.id for r in self.stage_id.approver_ids]:
             raise ValidationError(
                 """You are not Permitted to approve this Memo. Contact the authorized Person"""
                 )
+
+    def process_memo_approval(self):
         body = "MEMO APPROVE NOTIFICATION: -Approved By ;\n %s on %s" %(self.env.user.name,fields.Date.today())
         type = "request"
         body_msg = f"""Dear {self.employee_id.name}, <br/>I wish to notify you that a {type} with description, '{self.name}',\
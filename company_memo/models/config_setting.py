@@ -1,5 +1,6 @@
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError 
+from .memo_stage_graph import STAGE_GRAPH_FIELDS
 
 MEMOTYPES = [
         'Payment',
@@ -416,6 +417,26 @@ class MemoStage(models.Model):
             if memo_duplicate and len(memo_duplicate.ids) > 1:
                 raise ValidationError("You have already created a stage with the same sequence")
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super(MemoStage, self).create(vals_list)
+        self.env['memo.stage.graph'].invalidate_graph()
+        return records
+
+    def write(self, vals):
+        res = super(MemoStage, self).write(vals)
+        if STAGE_GRAPH_FIELDS['memo.stage'] & set(vals):
+            self.env['memo.stage.graph'].invalidate_graph()
+        if 'approver_ids' in vals:
+            self.env['memo.access'].refresh_access(
+                self.env['memo.model'].with_context(active_test=False).search([('stage_id', 'in', self.ids)]).ids)
+        return res
+
+    def unlink(self):
+        res = super(MemoStage, self).unlink()
+        self.env['memo.stage.graph'].invalidate_graph()
+        return res
+
 
 class MemoConfig(models.Model):
     _name = "memo.config"
@@ -626,6 +647,26 @@ class MemoConfig(models.Model):
             },
         }
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super(MemoConfig, self).create(vals_list)
+        self.env['memo.stage.graph'].invalidate_graph()
+        return records
+
+    def write(self, vals):
+        res = super(MemoConfig, self).write(vals)
+        if STAGE_GRAPH_FIELDS['memo.config'] & set(vals):
+            self.env['memo.stage.graph'].invalidate_graph()
+        if 'approver_ids' in vals:
+            self.env['memo.access'].refresh_access(
+                self.env['memo.model'].with_context(active_test=False).search([('memo_setting_id', 'in', self.ids)]).ids)
+        return res
+
+    def unlink(self):
+        res = super(MemoConfig, self).unlink()
+        self.env['memo.stage.graph'].invalidate_graph()
+        return res
+
 
 class MemoConfigTag(models.Model):
     _name = "memo.config.tag"
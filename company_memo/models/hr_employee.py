@@ -4,7 +4,17 @@ from odoo.exceptions import ValidationError
 class HrEmployeeBase(models.AbstractModel):
     _inherit = "hr.employee.base"
 
-    administrative_supervisor_id = fields.Many2one('hr.employee', string="Administrative Supervisor")
+    administrative_supervisor_id = fields.Many2one('hr.employee', string="Administrative Supervisor", index=True)
+
+
+class HrEmployee(models.Model):
+    _inherit = "hr.employee"
+
+    def write(self, vals):
+        res = super(HrEmployee, self).write(vals)
+        if 'user_id' in vals or 'administrative_supervisor_id' in vals:
+            self.env['memo.access'].refresh_employee_access(self.ids)
+        return res
 
 
 class HrDepartment(models.Model):
@@ -0,0 +1,188 @@
+from odoo import models, fields, api
+from datetime import timedelta
+import logging
+import threading
+
+_logger = logging.getLogger(__name__)
+
+
+def split_emails(emails):
+    """'a@x.com, B@x.com' or ['a@x.com', ...] => ['a@x.com', 'b@x.com'] without duplicates"""
+    if isinstance(emails, str):
+        emails = emails.split(',')
+    result = []
+    for email in emails or []:
+        email = (email or '').strip().lower()
+        if email and email not in result:
+            result.append(email)
+    return result
+
+
+class MemoMailQueue(models.Model):
+    """Notifications waiting to be sent by the mail queue cron.
+
+    enqueue is called in the transaction of the user action, so the
+    notification only exists once the action is committed. The notifications
+    of the same record, sender and subject enqueued within the coalescing
+    window are merged into a single mail, recipients are deduplicated.
+    The cron sends the due notifications in batches through mail.mail (one
+    smtp connection per batch and mail server) and retries the failed ones
+    with an exponential backoff.
+
+    Configuration parameters:
+        company_memo.mail_queue_window: coalescing window in seconds (60)
+        company_memo.mail_queue_retries: attempts before giving up (5)
+        company_memo.mail_queue_backoff: delay in seconds before the first retry, doubled at each attempt (300)
+    """
+    _name = "memo.mail.queue"
+    _description = "Memo Notification Queue"
+    _order = "scheduled_date, id"
+
+    res_model = fields.Char("Related Model", index=True)
+    res_id = fields.Many2oneReference("Related Record", model_field='res_model')
+    email_from = fields.Char("From")
+    reply_to = fields.Char("Reply To")
+    subject = fields.Char("Subject")
+    email_to = fields.Char("To")
+    email_cc = fields.Char("Cc")
+    body_html = fields.Html("Body", sanitize=False)
+    attachment_ids = fields.Many2many('ir.attachment', 'memo_mail_queue_attachment_rel', 'queue_id', 'attachment_id', string="Attachments")
+    scheduled_date = fields.Datetime("Scheduled Date", index=True, default=fields.Datetime.now)
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('exception', 'Failed'),
+        ], string="Status", default='pending', index=True)
+    attempts = fields.Integer("Attempts")
+    last_error = fields.Text("Last Error")
+    mail_id = fields.Many2one('mail.mail', string="Mail", ondelete='set null')
+
+    def _get_params(self):
+        params = self.env['ir.config_parameter'].sudo()
+        return {
+            'window': int(params.get_param('company_memo.mail_queue_window', 60)),
+            'retries': int(params.get_param('company_memo.mail_queue_retries', 5)),
+            'backoff': int(params.get_param('company_memo.mail_queue_backoff', 300)),
+        }
+
+    @api.model
+    def enqueue(self, email_to, subject, body_html, email_from=False, email_cc=False, reply_to=False,
+                attachment_ids=None, record=None):
+        """Queues a notification, merged with the pending notification of the same record,
+        sender and subject of the coalescing window if any. returns the queue record"""
+        self = self.sudo()
+        email_to, email_cc = split_emails(email_to), split_emails(email_cc)
+        email_cc = [email for email in email_cc if email not in email_to]
+        if not email_to and email_cc:
+            email_to, email_cc = email_cc, []
+        if not email_to:
+            return self
+        params = self._get_params()
+        res_model, res_id = (record._name, record.id) if record else (False, 0)
+        pending = self.search([
+            ('state', '=', 'pending'), ('mail_id', '=', False),
+            ('res_model', '=', res_model), ('res_id', '=', res_id),
+            ('email_from', '=', email_from), ('subject', '=', subject),
+            ('scheduled_date', '>', fields.Datetime.now()),
+        ], limit=1) if record else self
+        if pending:
+            to = split_emails(split_emails(pending.email_to) + email_to)
+            cc = [email for email in split_emails(pending.email_cc) + email_cc if email not in to]
+            values = {
+                'email_to': ','.join(to),
+                'email_cc': ','.join(split_emails(cc)),
+                'attachment_ids': [(4, attachment_id) for attachment_id in attachment_ids or []],
+            }
+            if body_html not in (pending.body_html or ''):
+                values['body_html'] = f"{pending.body_html}<hr/>{body_html}"
+            pending.write(values)
+            return pending
+        queued = self.create({
+            'res_model': res_model,
+            'res_id': res_id,
+            'email_from': email_from,
+            'reply_to': reply_to or email_from,
+            'subject': subject,
+            'email_to': ','.join(email_to),
+            'email_cc': ','.join(email_cc),
+            'body_html': body_html,
+            'attachment_ids': [(6, 0, attachment_ids or [])],
+            'scheduled_date': fields.Datetime.now() + timedelta(seconds=params['window']),
+        })
+        self.env.ref('company_memo.ir_cron_memo_mail_queue')._trigger(at=queued.scheduled_date)
+        return queued
+
+    def _prepare_mail_values(self):
+        return {
+            'email_from': self.email_from,
+            'reply_to': self.reply_to,
+            'subject': self.subject,
+            'email_to': self.email_to,
+            'email_cc': self.email_cc,
+            'body_html': self.body_html,
+            'attachment_ids': [(6, 0, self.attachment_ids.ids)],
+            'model': self.res_model or False,
+            'res_id': self.res_id or False,
+            'auto_delete': True,
+        }
+
+    @api.model
+    def _cron_send(self, batch_size=200):
+        """Sends the due notifications, batch_size at a time. Like mail.mail
+        process_email_queue, the state of each batch is committed once it is sent
+        (except in tests), a failure in a later batch does not resend it"""
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        params = self._get_params()
+        while True:
+            count = self._send_batch(batch_size, params)
+            if auto_commit:
+                self.env.cr.commit()
+            if count < batch_size:
+                break
+
+    @api.model
+    def _send_batch(self, batch_size, params):
+        """sends a batch of due notifications, returns the number of notifications of the batch"""
+        self.flush_model(['state', 'scheduled_date'])
+        # rows locked by another cron run are skipped
+        self.env.cr.execute("""
+            SELECT id FROM memo_mail_queue
+             WHERE state = 'pending' AND scheduled_date <= now() at time zone 'UTC'
+          ORDER BY scheduled_date, id
+             LIMIT %s
+               FOR UPDATE SKIP LOCKED
+        """, [batch_size])
+        queued = self.browse([row[0] for row in self.env.cr.fetchall()])
+        if not queued:
+            return 0
+        new = queued.filtered(lambda q: not q.mail_id)
+        mails = self.env['mail.mail'].sudo().create([q._prepare_mail_values() for q in new])
+        for q, mail in zip(new, mails):
+            q.mail_id = mail
+        retried = (queued - new).mail_id.filtered(lambda m: m.state == 'exception')
+        retried.mark_outgoing()
+        # sent without committing, the rows stay locked until the state of the batch is committed
+        queued.mail_id.send(auto_commit=False, raise_exception=False)
+
+        now = fields.Datetime.now()
+        sent = failed = 0
+        for q in queued:
+            mail = q.mail_id.exists()
+            if not mail or mail.state == 'sent':
+                q.write({'state': 'sent', 'attempts': q.attempts + 1, 'last_error': False})
+                sent += 1
+                continue
+            attempts = q.attempts + 1
+            q.write({
+                'attempts': attempts,
+                'last_error': mail.failure_reason,
+                'state': 'exception' if attempts >= params['retries'] else 'pending',
+                'scheduled_date': now + timedelta(seconds=params['backoff'] * 2 ** (attempts - 1)),
+            })
+            failed += 1
+        _logger.info("Memo mail queue: %s notifications sent, %s failed", sent, failed)
+        return len(queued)
+
+    @api.model
+    def _cron_cleanup(self, days=30):
+        self.search([('state', '=', 'sent'), ('write_date', '<', fields.Datetime.now() - timedelta(days=days))]).unlink()
@@ -0,0 +1,157 @@
+from odoo import models, fields, api
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# (memo, user, reason) of the users allowed to see the memos: the user of the memo employee,
+# of the followers, of the employee administrative supervisor and of the approvers of the memo
+# config and of the current stage
+MEMO_ACCESS_QUERY = """
+    SELECT m.id AS memo_id, e.user_id AS user_id, 'employee' AS reason
+      FROM memo_model m
+      JOIN hr_employee e ON e.id = m.employee_id
+     WHERE e.user_id IS NOT NULL {memo_filter}
+    UNION
+    SELECT m.id, e.user_id, 'follower'
+      FROM memo_model m
+      JOIN {followers_rel} rel ON rel.{followers_memo} = m.id
+      JOIN hr_employee e ON e.id = rel.{followers_employee}
+     WHERE e.user_id IS NOT NULL {memo_filter}
+    UNION
+    SELECT m.id, s.user_id, 'supervisor'
+      FROM memo_model m
+      JOIN hr_employee e ON e.id = m.employee_id
+      JOIN hr_employee s ON s.id = e.administrative_supervisor_id
+     WHERE s.user_id IS NOT NULL {memo_filter}
+    UNION
+    SELECT m.id, e.user_id, 'config_approver'
+      FROM memo_model m
+      JOIN {config_rel} rel ON rel.{config_config} = m.memo_setting_id
+      JOIN hr_employee e ON e.id = rel.{config_employee}
+     WHERE e.user_id IS NOT NULL {memo_filter}
+    UNION
+    SELECT m.id, e.user_id, 'stage_approver'
+      FROM memo_model m
+      JOIN {stage_rel} rel ON rel.{stage_stage} = m.stage_id
+      JOIN hr_employee e ON e.id = rel.{stage_employee}
+     WHERE e.user_id IS NOT NULL {memo_filter}
+"""
+
+
+class MemoAccess(models.Model):
+    """Users allowed to see a memo with the reason of the access.
+
+    The lines are refreshed when the memo employee, followers, config or stage
+    change, and when the approvers of a config or stage or the user and
+    supervisor of an employee change, so the visibility of the memos of a user
+    is a single indexed lookup.
+    """
+    _name = "memo.access"
+    _description = "Memo Access"
+    _rec_name = "memo_id"
+    _log_access = False
+
+    memo_id = fields.Many2one('memo.model', string='Memo', required=True, index=True, ondelete='cascade')
+    user_id = fields.Many2one('res.users', string='User', required=True, ondelete='cascade')
+    reason = fields.Selection([
+        ('employee', 'Employee'),
+        ('follower', 'Follower'),
+        ('supervisor', 'Administrative Supervisor'),
+        ('config_approver', 'Memo Config Approver'),
+        ('stage_approver', 'Stage Approver'),
+        ], string='Reason', required=True)
+
+    _sql_constraints = [
+        ('memo_user_reason_uniq', 'unique(user_id, memo_id, reason)', 'The access of a user to a memo is recorded once per reason'),
+    ]
+
+    def init(self):
+        # first installation: compute the access of the existing memos
+        self.env.cr.execute("SELECT 1 FROM memo_access LIMIT 1")
+        if not self.env.cr.fetchone():
+            self.rebuild_access()
+
+    def _access_query(self, memo_filter=''):
+        Memo = self.env['memo.model']
+        followers = Memo._fields['users_followers']
+        config_approvers = self.env['memo.config']._fields['approver_ids']
+        stage_approvers = self.env['memo.stage']._fields['approver_ids']
+        Memo.flush_model(['employee_id', 'users_followers', 'memo_setting_id', 'stage_id'])
+        self.env['hr.employee'].flush_model(['user_id', 'administrative_supervisor_id'])
+        self.env['memo.config'].flush_model(['approver_ids'])
+        self.env['memo.stage'].flush_model(['approver_ids'])
+        return MEMO_ACCESS_QUERY.format(
+            memo_filter=memo_filter,
+            followers_rel=followers.relation, followers_memo=followers.column1, followers_employee=followers.column2,
+            config_rel=config_approvers.relation, config_config=config_approvers.column1, config_employee=config_approvers.column2,
+            stage_rel=stage_approvers.relation, stage_stage=stage_approvers.column1, stage_employee=stage_approvers.column2,
+        )
+
+    @api.model
+    def refresh_access(self, memo_ids):
+        """Recomputes the access lines of the memos"""
+        memo_ids = [memo_id for memo_id in memo_ids if isinstance(memo_id, int)]
+        if not memo_ids:
+            return
+        query = self._access_query('AND m.id = ANY(%(memo_ids)s)')
+        self.env.cr.execute("DELETE FROM memo_access WHERE memo_id = ANY(%(memo_ids)s)", {'memo_ids': memo_ids})
+        self.env.cr.execute(f"""
+            INSERT INTO memo_access (memo_id, user_id, reason)
+            SELECT memo_id, user_id, reason FROM ({query}) access
+        """, {'memo_ids': memo_ids})
+        self.invalidate_model()
+
+    @api.model
+    def refresh_employee_access(self, employee_ids):
+        """Recomputes the access lines of the memos of the employees, followed by them,
+        of the employees they supervise or of the configs and stages they approve"""
+        if not employee_ids:
+            return
+        Memo = self.env['memo.model']
+        followers = Memo._fields['users_followers']
+        config_approvers = self.env['memo.config']._fields['approver_ids']
+        stage_approvers = self.env['memo.stage']._fields['approver_ids']
+        Memo.flush_model(['employee_id', 'users_followers', 'memo_setting_id', 'stage_id'])
+        self.env.cr.execute(f"""
+            SELECT m.id FROM memo_model m
+             WHERE m.employee_id = ANY(%(employee_ids)s)
+            UNION
+            SELECT rel.{followers.column1} FROM {followers.relation} rel
+             WHERE rel.{followers.column2} = ANY(%(employee_ids)s)
+            UNION
+            SELECT m.id FROM memo_model m
+              JOIN hr_employee e ON e.id = m.employee_id
+             WHERE e.administrative_supervisor_id = ANY(%(employee_ids)s)
+            UNION
+            SELECT m.id FROM memo_model m
+              JOIN {config_approvers.relation} rel ON rel.{config_approvers.column1} = m.memo_setting_id
+             WHERE rel.{config_approvers.column2} = ANY(%(employee_ids)s)
+            UNION
+            SELECT m.id FROM memo_model m
+              JOIN {stage_approvers.relation} rel ON rel.{stage_approvers.column1} = m.stage_id
+             WHERE rel.{stage_approvers.column2} = ANY(%(employee_ids)s)
+        """, {'employee_ids': list(employee_ids)})
+        self.refresh_access([row[0] for row in self.env.cr.fetchall()])
+
+    @api.model
+    def rebuild_access(self):
+        """Recomputes the access lines of all the memos"""
+        query = self._access_query()
+        self.env.cr.execute("DELETE FROM memo_access")
+        self.env.cr.execute(f"""
+            INSERT INTO memo_access (memo_id, user_id, reason)
+            SELECT memo_id, user_id, reason FROM ({query}) access
+        """)
+        self.invalidate_model()
+        _logger.info("Memo access rebuilt with %s lines", self.env.cr.rowcount)
+        return True
+
+    @api.model
+    def _cron_rebuild_access(self):
+        self.rebuild_access()
+
+    @api.model
+    def get_visible_memo_query(self, user_id):
+        """returns (query, params) selecting the ids of the memos visible to the user"""
+        self.flush_model()
+        return "SELECT memo_id FROM memo_access WHERE user_id = %s", [user_id]
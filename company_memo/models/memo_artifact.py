@@ -0,0 +1,222 @@
+from odoo import models, fields, api, tools
+from odoo.exceptions import ValidationError
+
+# journals of the stage invoices: move type => (journal type, journal code)
+ARTIFACT_JOURNALS = {
+    'in_invoice': ('purchase', 'BILL'),
+    'out_invoice': ('sale', 'INV'),
+}
+
+
+class MemoArtifactBuilder(models.AbstractModel):
+    """Invoices and documents required by the memo stages, built in batch.
+
+    The missing artifacts of any number of (memo, stage) are found with a set
+    difference on their (memo, stage, name) keys against the artifacts already
+    linked, then created with a single create per model. The journals of the
+    invoices are kept per company in the registry ormcache, keyed by the
+    version of the memo_artifact_journals cache (see memo.cache.version),
+    bumped when a journal is created, deleted or its type, code or company
+    change.
+    """
+    _name = "memo.artifact.builder"
+    _description = "Memo Stage Artifacts Builder"
+
+    @api.model
+    @tools.ormcache('company_id', 'version')
+    def _get_journal_ids(self, company_id, version):
+        return self._read_journal_ids(company_id)
+
+    @api.model
+    def get_journal_ids(self, company_id):
+        """{move type: journal id} of the company"""
+        version = self.env['memo.cache.version'].get('memo_artifact_journals')
+        if version is None:
+            return self._read_journal_ids(company_id)
+        return self._get_journal_ids(company_id, version)
+
+    @api.model
+    def _read_journal_ids(self, company_id):
+        journals = self.env['account.journal'].sudo().search([
+            ('company_id', '=', company_id),
+            ('type', 'in', [journal_type for journal_type, code in ARTIFACT_JOURNALS.values()]),
+            ('code', 'in', [code for journal_type, code in ARTIFACT_JOURNALS.values()]),
+        ], order='sequence, id')
+        journal_ids = {}
+        for movetype, (journal_type, code) in ARTIFACT_JOURNALS.items():
+            journal = journals.filtered(lambda j: j.type == journal_type and j.code == code)[:1]
+            journal_ids[movetype] = journal.id
+        return journal_ids
+
+    @api.model
+    def invalidate_journals(self):
+        self.env['memo.cache.version'].bump('memo_artifact_journals')
+
+    @api.model
+    def _next_invoice_names(self, memos_movetypes):
+        """names of the new stage invoices, P000001-<n> for bills, S000001-<n> for invoices
+        memos_movetypes: [(memo, movetype)]"""
+        last_suffix, names = {}, []
+        for memo, movetype in memos_movetypes:
+            prefix = 'P000001' if movetype == 'in_invoice' else 'S000001'
+            if movetype not in last_suffix:
+                last_invoice = self.env['account.move'].search(
+                    [('name', 'ilike', prefix), ('move_type', '=', movetype)],
+                    order="create_date desc",
+                    limit=1
+                    )
+                lastinv = last_invoice.name.split('-') if last_invoice else []
+                last_suffix[movetype] = int(lastinv[1]) if len(lastinv) > 1 else None
+            suffix = last_suffix[movetype]
+            if suffix is None:
+                suffix = 100 if memo.memo_type_key in ['import_process', 'export_process'] else 200
+            else:
+                suffix += 1
+            last_suffix[movetype] = suffix
+            names.append(f"{prefix}-{suffix}")
+        return names
+
+    @api.model
+    def _create_invoices(self, invoices):
+        """invoices: [(memo, {'invoice_name', 'invoice_required', 'code', 'movetype'})]
+        returns the account.move of each invoice, an existing move of the same name is reused"""
+        if not invoices:
+            return []
+        company = self.env.user.company_id
+        journal_ids = self.get_journal_ids(company.id)
+        if not all(journal_ids.get(values.get('movetype')) for memo, values in invoices):
+            raise ValidationError(
+                "No journal configured for accounting, kindly contact admin to create one."
+                )
+        account_move = self.env['account.move'].sudo()
+        names = self._next_invoice_names([(memo, values.get('movetype')) for memo, values in invoices])
+        existing = {move.name: move for move in account_move.search([('name', 'in', names)])}
+        vals_list = []
+        for (memo, values), name in zip(invoices, names):
+            if name in existing:
+                continue
+            invoice_name = values.get('invoice_name') or "-"
+            vals_list.append({
+                'memo_id': memo.id,
+                'ref': name,
+                'origin': memo.code,
+                'partner_id': memo.client_id.id,
+                'company_id': company.id,
+                'currency_id': company.currency_id.id,
+                # Do not set default name to account move name, because it
+                'name': name,
+                'move_type': values.get('movetype'),
+                'invoice_date': fields.Date.today(),
+                'date': fields.Date.today(),
+                'journal_id': journal_ids[values.get('movetype')],
+                'stage_invoice_name': invoice_name,
+                'stage_invoice_required': values.get('invoice_required') or False,
+            })
+        created = {move.name: move for move in account_move.create(vals_list)}
+        return [existing.get(name) or created[name] for name in names]
+
+    @api.model
+    def _create_documents(self, documents):
+        """documents: [(memo, {'attachment_name', 'report_binary', 'mimetype', 'document_name', 'compulsory', 'code'})]
+        returns the ir.attachment of each document, an existing attachment of the same
+        document name and code is reused"""
+        if not documents:
+            return []
+        attachment_obj = self.env['ir.attachment']
+        keys = [(values.get('document_name'), values.get('code') or '') for memo, values in documents]
+        codes = list({code for name, code in keys})
+        existing = {}
+        for attachment in attachment_obj.search([
+            ('stage_document_name', 'in', [name for name, code in keys]),
+            ('code', 'in', codes + [False] if '' in codes else codes),
+        ]):
+            existing.setdefault((attachment.stage_document_name, attachment.code or ''), attachment)
+        vals_list, to_create = [], []
+        for (memo, values), key in zip(documents, keys):
+            if key in existing or key in to_create:
+                continue
+            to_create.append(key)
+            vals_list.append({
+                'name': values.get('attachment_name'),
+                'datas': values.get('report_binary'),
+                'store_fname': values.get('attachment_name'),
+                'res_model': memo._name,
+                'res_id': memo.id,
+                'mimetype': values.get('mimetype'),
+                'stage_document_name': values.get('document_name'),
+                'stage_document_required': values.get('compulsory'),
+                'code': values.get('code'),
+                'memo_id': memo.id,
+            })
+        existing.update(zip(to_create, attachment_obj.create(vals_list)))
+        return [existing[key] for key in keys]
+
+    @api.model
+    def generate_artifacts(self, items):
+        """Creates the invoices and documents required by the stages that are not linked yet.
+
+        items: [(memo, stage, obj, code)], obj is the record the artifacts are linked to
+        (the memo or one of its sub stages)
+        returns [(invoice ids, document ids)] of the created artifacts, in the order of items
+        """
+        invoices, documents = [], []
+        for index, (memo, stage, obj, code) in enumerate(items):
+            invoice_lines = stage.required_invoice_line
+            if invoice_lines and not memo.client_id:
+                raise ValidationError("Client / Partner must be selected before invoice validation")
+            # artifacts are keyed by (name, memo, stage), older ones by their name alone
+            linked_invoices = {inv.stage_invoice_name for inv in obj.invoice_ids if inv.state not in ['posted']}
+            for line in invoice_lines:
+                invoice_name = f"{line.name}/{memo.id}/{memo.stage_id.id}"
+                if {line.name, invoice_name} & linked_invoices:
+                    continue
+                linked_invoices.add(invoice_name)
+                invoices.append((index, memo, {
+                    'invoice_name': invoice_name,
+                    'invoice_required': line.compulsory,
+                    'code': code,
+                    'movetype': 'in_invoice' if line.move_type == 'vendor' else 'out_invoice',
+                }))
+            linked_documents = set(obj.attachment_ids.mapped('stage_document_name'))
+            for line in stage.required_document_line:
+                document_name = f"{line.name}-{memo.id}-{stage.id}"
+                if {line.name, document_name} & linked_documents:
+                    continue
+                linked_documents.add(document_name)
+                documents.append((index, memo, {
+                    'attachment_name': line.name,
+                    'report_binary': False,
+                    'mimetype': False,
+                    'document_name': document_name,
+                    'compulsory': line.compulsory,
+                    'code': code,
+                }))
+        result = [([], []) for item in items]
+        moves = self._create_invoices([(memo, values) for index, memo, values in invoices])
+        for (index, memo, values), move in zip(invoices, moves):
+            result[index][0].append(move.id)
+        attachments = self._create_documents([(memo, values) for index, memo, values in documents])
+        for (index, memo, values), attachment in zip(documents, attachments):
+            result[index][1].append(attachment.id)
+        return result
+
+
+class AccountJournal(models.Model):
+    _inherit = "account.journal"
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        journals = super().create(vals_list)
+        self.env['memo.artifact.builder'].invalidate_journals()
+        return journals
+
+    def write(self, vals):
+        res = super().write(vals)
+        if {'type', 'code', 'company_id', 'active'} & set(vals):
+            self.env['memo.artifact.builder'].invalidate_journals()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['memo.artifact.builder'].invalidate_journals()
+        return res
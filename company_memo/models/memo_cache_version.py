@@ -0,0 +1,56 @@
+from odoo import models, api
+
+# cursor cache key of the names of the caches changed by the transaction
+CACHE_VERSION_CHANGES = 'memo_cache_version_changes'
+
+
+class MemoCacheVersion(models.AbstractModel):
+    """Versions of the ormcaches of the memo reference data.
+
+    Each cache has a database sequence, its value is part of the ormcache keys
+    of the cache. A change of the cached data bumps the sequence once the
+    transaction is committed, so every worker stops using the older entries
+    without clearing the registry cache. Until then the transaction that made
+    the change reads through the cache (get returns None).
+    """
+    _name = "memo.cache.version"
+    _description = "Memo Cache Versions"
+
+    def _get_cache_names(self):
+        """names of the versioned caches, extended by the modules caching reference data"""
+        return ['memo_stage_graph', 'memo_artifact_journals']
+
+    def init(self):
+        for name in self._get_cache_names():
+            self.env.cr.execute(f"CREATE SEQUENCE IF NOT EXISTS memo_cache_{name}")
+
+    @api.model
+    def get(self, name):
+        """current version of the cache, None if the transaction changed its data"""
+        if name in self.env.cr.cache.get(CACHE_VERSION_CHANGES, ()):
+            return None
+        self.env.cr.execute(f"SELECT last_value, is_called FROM memo_cache_{name}")
+        last_value, is_called = self.env.cr.fetchone()
+        # the first nextval of a new sequence returns its start value
+        return last_value if is_called else 0
+
+    @api.model
+    def bump(self, name):
+        """bumps the version of the cache once the current transaction is committed"""
+        cr = self.env.cr
+        if CACHE_VERSION_CHANGES not in cr.cache:
+            cr.cache[CACHE_VERSION_CHANGES] = set()
+            registry = self.env.registry
+
+            @cr.postcommit.add
+            def signal_cache_changes():
+                names = cr.cache.pop(CACHE_VERSION_CHANGES, set())
+                with registry.cursor() as signal_cr:
+                    for changed in sorted(names):
+                        signal_cr.execute(f"SELECT nextval('memo_cache_{changed}')")
+
+            @cr.postrollback.add
+            def reset_cache_changes():
+                cr.cache.pop(CACHE_VERSION_CHANGES, None)
+
+        cr.cache[CACHE_VERSION_CHANGES].add(name)
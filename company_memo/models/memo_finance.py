@@ -0,0 +1,122 @@
+import logging
+
+from odoo import models, api
+
+from .memo_profiler import profiled
+
+_logger = logging.getLogger(__name__)
+
+NAIRA_CURRENCY_NAMES = ['NGN', 'Naira', False]
+# keys of the totals computed for each memo / order type
+FINANCE_KEYS = ['budget', 'active', 'confirmed', 'invoiced', 'to_invoice']
+
+
+def empty_finance_totals():
+    return {
+        'so': dict.fromkeys(FINANCE_KEYS, 0.00),
+        'po': dict.fromkeys(FINANCE_KEYS, 0.00),
+    }
+
+
+class MemoFinance(models.AbstractModel):
+    """Set based computation of the sale / purchase order finances of memos.
+
+    Orders are grouped in SQL by memo, currency, state, invoice status and
+    order day, so the amount of python work only depends on the number of
+    distinct groups and not on the number of orders attached to the memos.
+    Each group is converted to the requested currency (NGN or USD) and
+    accumulated per memo in the following totals:
+
+        budget: all the orders
+        active: orders not cancelled
+        confirmed: orders not in draft or cancelled
+        invoiced: orders fully invoiced
+        to_invoice: orders not yet fully invoiced
+    """
+    _name = "memo.finance"
+    _description = "Memo finance aggregation"
+
+    def _get_order_groups(self, memo_ids, order_type):
+        """returns the grouped amount_total of the sale orders (so) or
+        purchase orders (po) linked to memo_ids"""
+        memo_field = self.env['memo.model']._fields['so_ids' if order_type == 'so' else 'po_ids']
+        if order_type == 'so':
+            self.env['sale.order'].flush_model(['amount_total', 'state', 'invoice_status', 'date_order', 'pricelist_id'])
+            self.env['product.pricelist'].flush_model(['currency_id'])
+            query = f"""
+                SELECT rel.{memo_field.column1}, pl.currency_id, ord.state, ord.invoice_status,
+                       ord.date_order::date, SUM(ord.amount_total)
+                  FROM {memo_field.relation} rel
+                  JOIN sale_order ord ON ord.id = rel.{memo_field.column2}
+             LEFT JOIN product_pricelist pl ON pl.id = ord.pricelist_id
+                 WHERE rel.{memo_field.column1} = ANY(%s)
+              GROUP BY 1, 2, 3, 4, 5
+            """
+        else:
+            self.env['purchase.order'].flush_model(['amount_total', 'state', 'invoice_status', 'date_order', 'date_approve', 'currency_id'])
+            query = f"""
+                SELECT rel.{memo_field.column1}, ord.currency_id, ord.state, ord.invoice_status,
+                       COALESCE(ord.date_approve, ord.date_order)::date, SUM(ord.amount_total)
+                  FROM {memo_field.relation} rel
+                  JOIN purchase_order ord ON ord.id = rel.{memo_field.column2}
+                 WHERE rel.{memo_field.column1} = ANY(%s)
+              GROUP BY 1, 2, 3, 4, 5
+            """
+        self.env.cr.execute(query, [list(memo_ids)])
+        return self.env.cr.fetchall()
+
+    def _get_usd_rate_index(self):
+        return self.env.ref('base.USD')._get_rate_index()
+
+    def _convert_amount(self, amount, currency_id, order_date, currency, rate_index):
+        """Converts amount from the order currency to the currency (NGN or USD) to display
+        using the USD rate of the order date (see res.currency._get_rate_index)"""
+        if currency in ['Naira', 'NGN']:
+            if currency_id and (currency_id.name == 'USD' or currency_id.id == 1):
+                return amount * rate_index.get(order_date)
+            return amount
+        if not currency_id or currency_id.name in NAIRA_CURRENCY_NAMES or currency_id.currency_unit_label == 'Naira':
+            return amount / rate_index.get(order_date)
+        return amount
+
+    @api.model
+    @profiled()
+    def compute_totals(self, memos, currency='NGN'):
+        """params: memos (memo.model recordset), currency: 'NGN' or 'USD'
+        returns {memo_id: {'so': {totals}, 'po': {totals}}} for every memo
+        """
+        result = {memo_id: empty_finance_totals() for memo_id in memos.ids}
+        if not result:
+            return result
+        rate_index = self._get_usd_rate_index()
+        currencies = {}
+        for order_type in ['so', 'po']:
+            groups = self._get_order_groups(memos.ids, order_type)
+            currency_ids = {group[1] for group in groups if group[1]}
+            currencies.update({
+                cur.id: cur for cur in self.env['res.currency'].browse(list(currency_ids - set(currencies)))
+            })
+            for memo_id, currency_id, state, invoice_status, order_date, amount in groups:
+                value = float(self._convert_amount(
+                    amount or 0.00, currencies.get(currency_id), order_date, currency, rate_index))
+                totals = result[memo_id][order_type]
+                totals['budget'] += value
+                if state not in ['cancel']:
+                    totals['active'] += value
+                if state not in ['draft', 'cancel']:
+                    totals['confirmed'] += value
+                if invoice_status in ['invoiced']:
+                    totals['invoiced'] += value
+                else:
+                    totals['to_invoice'] += value
+        return result
+
+    @api.model
+    def sum_totals(self, finances, memo_ids=None):
+        """Sums the computed totals of memo_ids (all memos if not given)"""
+        total = empty_finance_totals()
+        for memo_id in (finances if memo_ids is None else memo_ids):
+            for order_type in ['so', 'po']:
+                for key, value in finances[memo_id][order_type].items():
+                    total[order_type][key] += value
+        return total
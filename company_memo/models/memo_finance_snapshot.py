@@ -0,0 +1,194 @@
+import logging
+import threading
+
+from psycopg2.extras import execute_values
+
+from odoo import models, fields, api
+
+from .memo_finance import FINANCE_KEYS, empty_finance_totals
+from .memo_profiler import profiled
+
+_logger = logging.getLogger(__name__)
+
+SNAPSHOT_CURRENCIES = ['NGN', 'USD']
+
+
+class MemoFinanceSnapshot(models.Model):
+    """Materialized memo.finance totals, one row per memo per currency.
+
+    The dashboards read the finances of the memos from this table so
+    their response time does not depend on the number of orders.
+    Rows are refreshed by the "Refresh Memo Finance Snapshot" cron for
+    the memos queued in memo.finance.snapshot.queue whenever one of
+    their sale orders, purchase orders, invoices or a currency rate changes.
+    """
+    _name = "memo.finance.snapshot"
+    _description = "Memo finance snapshot"
+    _rec_name = "memo_id"
+
+    memo_id = fields.Many2one('memo.model', string="Memo", required=True, index=True, ondelete='cascade')
+    currency = fields.Selection([('NGN', 'NGN'), ('USD', 'USD')], string="Currency", required=True)
+    so_budget = fields.Float('SO Budget')
+    so_active = fields.Float('SO not cancelled')
+    so_confirmed = fields.Float('SO Confirmed')
+    so_invoiced = fields.Float('SO Invoiced')
+    so_to_invoice = fields.Float('SO to be Invoiced')
+    po_budget = fields.Float('PO Budget')
+    po_active = fields.Float('PO not cancelled')
+    po_confirmed = fields.Float('PO Confirmed')
+    po_invoiced = fields.Float('PO Invoiced')
+    po_to_invoice = fields.Float('PO to be Invoiced')
+
+    _sql_constraints = [
+        ('memo_currency_uniq', 'unique(memo_id, currency)', 'A memo can only have one finance snapshot per currency'),
+    ]
+
+    @api.model
+    @profiled()
+    def get_totals(self, memos, currency='NGN'):
+        """Same result as memo.finance compute_totals read from the snapshot,
+        memos without snapshot yet (never refreshed) are computed and stored"""
+        currency = 'USD' if currency in ['USD'] else 'NGN'
+        result = {}
+        snapshots = self.search_read(
+            [('memo_id', 'in', memos.ids), ('currency', '=', currency)],
+            ['memo_id'] + [f'{order_type}_{key}' for order_type in ['so', 'po'] for key in FINANCE_KEYS])
+        for snapshot in snapshots:
+            result[snapshot['memo_id'][0]] = {
+                order_type: {key: snapshot[f'{order_type}_{key}'] for key in FINANCE_KEYS}
+                for order_type in ['so', 'po']
+            }
+        missing_memos = memos.filtered(lambda memo: memo.id not in result)
+        if missing_memos:
+            result.update(self.refresh_snapshots(missing_memos.ids)[currency])
+        return result
+
+    @api.model
+    @profiled()
+    def refresh_snapshots(self, memo_ids):
+        """Recomputes and stores the snapshots of memo_ids for all the currencies
+        returns {currency: {memo_id: totals}}"""
+        memos = self.env['memo.model'].sudo().with_context(active_test=False).browse(memo_ids).exists()
+        columns = [f'{order_type}_{key}' for order_type in ['so', 'po'] for key in FINANCE_KEYS]
+        computed, rows = {}, []
+        for currency in SNAPSHOT_CURRENCIES:
+            computed[currency] = self.env['memo.finance'].sudo().compute_totals(memos, currency)
+            for memo_id, totals in computed[currency].items():
+                rows.append(tuple([memo_id, currency] + [totals[order_type][key] for order_type in ['so', 'po'] for key in FINANCE_KEYS]))
+        if rows:
+            # one upsert for all the memos and currencies of the batch
+            execute_values(self.env.cr._obj, f"""
+                INSERT INTO memo_finance_snapshot (memo_id, currency, {', '.join(columns)}, create_date, write_date)
+                VALUES %s
+                ON CONFLICT (memo_id, currency) DO UPDATE SET
+                {', '.join(f'{column} = EXCLUDED.{column}' for column in columns)},
+                write_date = EXCLUDED.write_date
+            """, rows, template=f"({', '.join(['%s'] * (len(columns) + 2))}, now() at time zone 'UTC', now() at time zone 'UTC')",
+                page_size=1000)
+        self.invalidate_model()
+        return {currency: {memo_id: computed[currency].get(memo_id, empty_finance_totals()) for memo_id in memo_ids}
+                for currency in SNAPSHOT_CURRENCIES}
+
+    @api.model
+    def _cron_refresh_finance_snapshot(self, batch_size=500):
+        """Drains the queue of memos whose finances changed by batches of batch_size"""
+        queue = self.env['memo.finance.snapshot.queue']
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        while True:
+            memo_ids = queue._pop_memo_ids(batch_size)
+            if not memo_ids:
+                break
+            self.refresh_snapshots(memo_ids)
+            _logger.info("Refreshed finance snapshot of %s memos", len(memo_ids))
+            if auto_commit:
+                self.env.cr.commit()
+
+
+class MemoFinanceSnapshotQueue(models.Model):
+    """Memos whose finance snapshot must be refreshed"""
+    _name = "memo.finance.snapshot.queue"
+    _description = "Memo finance snapshot queue"
+    _log_access = False
+
+    memo_id = fields.Many2one('memo.model', string="Memo", required=True, ondelete='cascade')
+
+    _sql_constraints = [
+        ('memo_uniq', 'unique(memo_id)', 'A memo is queued only once'),
+    ]
+
+    @api.model
+    def enqueue_memos(self, memo_ids):
+        memo_ids = [memo_id for memo_id in set(memo_ids) if isinstance(memo_id, int)]
+        if memo_ids:
+            self.env.cr.execute("""
+                INSERT INTO memo_finance_snapshot_queue (memo_id)
+                SELECT id FROM memo_model WHERE id = ANY(%s)
+                ON CONFLICT (memo_id) DO NOTHING
+            """, [memo_ids])
+
+    @api.model
+    def enqueue_orders(self, order_type, order_ids):
+        """queues the memos linked to sale orders (so) or purchase orders (po)"""
+        order_ids = [order_id for order_id in order_ids if isinstance(order_id, int)]
+        if not order_ids:
+            return
+        memo_field = self.env['memo.model']._fields['so_ids' if order_type == 'so' else 'po_ids']
+        order_table = 'sale_order' if order_type == 'so' else 'purchase_order'
+        self.env['memo.model'].flush_model(['so_ids', 'po_ids'])
+        self.env['sale.order' if order_type == 'so' else 'purchase.order'].flush_model(['memo_id'])
+        self.env.cr.execute(f"""
+            INSERT INTO memo_finance_snapshot_queue (memo_id)
+            SELECT rel.{memo_field.column1} FROM {memo_field.relation} rel
+             WHERE rel.{memo_field.column2} = ANY(%s)
+             UNION
+            SELECT ord.memo_id FROM {order_table} ord
+             WHERE ord.id = ANY(%s) AND ord.memo_id IS NOT NULL
+            ON CONFLICT (memo_id) DO NOTHING
+        """, [order_ids, order_ids])
+
+    @api.model
+    def enqueue_moves(self, move_ids):
+        """queues the memos of the orders invoiced by the account moves"""
+        move_ids = [move_id for move_id in move_ids if isinstance(move_id, int)]
+        if not move_ids:
+            return
+        self.env['account.move.line'].flush_model(['move_id', 'purchase_line_id'])
+        self.env['sale.order.line'].flush_model(['invoice_lines'])
+        self.env.cr.execute("""
+            SELECT DISTINCT sol.order_id
+              FROM account_move_line aml
+              JOIN sale_order_line_invoice_rel rel ON rel.invoice_line_id = aml.id
+              JOIN sale_order_line sol ON sol.id = rel.order_line_id
+             WHERE aml.move_id = ANY(%s)
+        """, [move_ids])
+        self.enqueue_orders('so', [row[0] for row in self.env.cr.fetchall()])
+        self.env.cr.execute("""
+            SELECT DISTINCT pol.order_id
+              FROM account_move_line aml
+              JOIN purchase_order_line pol ON pol.id = aml.purchase_line_id
+             WHERE aml.move_id = ANY(%s)
+        """, [move_ids])
+        self.enqueue_orders('po', [row[0] for row in self.env.cr.fetchall()])
+
+    @api.model
+    def enqueue_all(self):
+        """queues every memo with orders, e.g when a currency rate changes"""
+        so_field, po_field = self.env['memo.model']._fields['so_ids'], self.env['memo.model']._fields['po_ids']
+        self.env['memo.model'].flush_model(['so_ids', 'po_ids'])
+        self.env.cr.execute(f"""
+            INSERT INTO memo_finance_snapshot_queue (memo_id)
+            SELECT {so_field.column1} FROM {so_field.relation}
+             UNION
+            SELECT {po_field.column1} FROM {po_field.relation}
+            ON CONFLICT (memo_id) DO NOTHING
+        """)
+
+    def _pop_memo_ids(self, limit):
+        self.env.cr.execute("""
+            DELETE FROM memo_finance_snapshot_queue
+             WHERE id IN (
+                SELECT id FROM memo_finance_snapshot_queue ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED
+             )
+            RETURNING memo_id
+        """, [limit])
+        return [row[0] for row in self.env.cr.fetchall()]
@@ -0,0 +1,164 @@
+import base64
+import calendar
+import csv
+import io
+import logging
+from collections import namedtuple
+from datetime import date
+
+from odoo import models, fields, api
+
+from .memo_profiler import profiled
+
+_logger = logging.getLogger(__name__)
+
+MMR_MONTHS = list(calendar.month_abbr)[1:]  # ['Jan', 'Feb', ... 'Dec']
+
+# One MMR line per project type (memo_project_type)
+# months: {'Jan': margin, ...} margin of the files closed in the month
+MMRRow = namedtuple('MMRRow', ['project_type', 'department', 'budget', 'revenue', 'cost', 'margin', 'paid', 'months'])
+
+
+class MemoMMRReport(models.AbstractModel):
+    """Monthly management report (MMR) of the project files.
+
+    For every project type, the margin (confirmed SO revenue - confirmed PO
+    cost) of the files closed during the year, by month of closing date.
+    The amounts of all the files are loaded with a single grouped query over
+    the memos, their sale orders and purchase orders.
+    """
+    _name = "memo.mmr.report"
+    _description = "Memo monthly management report"
+
+    def _get_mmr_groups(self, memo_ids):
+        so_field, po_field = self.env['memo.model']._fields['so_ids'], self.env['memo.model']._fields['po_ids']
+        self.env['memo.model'].flush_model(['memo_project_type', 'closing_date', 'so_ids', 'po_ids'])
+        self.env['sale.order'].flush_model(['amount_total', 'state', 'invoice_status', 'date_order', 'pricelist_id'])
+        self.env['product.pricelist'].flush_model(['currency_id'])
+        self.env['purchase.order'].flush_model(['amount_total', 'state', 'invoice_status', 'date_order', 'date_approve', 'currency_id'])
+        self.env.cr.execute(f"""
+            SELECT memo.memo_project_type, EXTRACT(MONTH FROM memo.closing_date)::int, 'so',
+                   pl.currency_id, ord.state, ord.invoice_status, ord.date_order::date, SUM(ord.amount_total)
+              FROM memo_model memo
+              JOIN {so_field.relation} rel ON rel.{so_field.column1} = memo.id
+              JOIN sale_order ord ON ord.id = rel.{so_field.column2}
+         LEFT JOIN product_pricelist pl ON pl.id = ord.pricelist_id
+             WHERE memo.id = ANY(%s)
+          GROUP BY 1, 2, 4, 5, 6, 7
+         UNION ALL
+            SELECT memo.memo_project_type, EXTRACT(MONTH FROM memo.closing_date)::int, 'po',
+                   ord.currency_id, ord.state, ord.invoice_status,
+                   COALESCE(ord.date_approve, ord.date_order)::date, SUM(ord.amount_total)
+              FROM memo_model memo
+              JOIN {po_field.relation} rel ON rel.{po_field.column1} = memo.id
+              JOIN purchase_order ord ON ord.id = rel.{po_field.column2}
+             WHERE memo.id = ANY(%s)
+          GROUP BY 1, 2, 4, 5, 6, 7
+        """, [memo_ids, memo_ids])
+        return self.env.cr.fetchall()
+
+    @api.model
+    @profiled()
+    def get_rows(self, domain, currency='NGN', year=False):
+        """returns the MMRRow of each project type of the memos in domain
+        closed during the year (current year if not given), sorted by project type"""
+        year = int(year) if year else fields.Date.today().year
+        memos = self.env['memo.model'].search(domain + [
+            ('memo_project_type', 'not in', [False, '']),
+            ('closing_date', '>=', date(year, 1, 1)),
+            ('closing_date', '<', date(year + 1, 1, 1)),
+        ])
+        project_types = sorted(set(memos.mapped('memo_project_type')))
+        values = {
+            project_type: {'budget': 0.00, 'revenue': 0.00, 'cost': 0.00, 'paid': 0.00, 'months': dict.fromkeys(MMR_MONTHS, 0.00)}
+            for project_type in project_types
+        }
+        if not memos:
+            return []
+        memo_finance = self.env['memo.finance']
+        rate_index = memo_finance._get_usd_rate_index()
+        currencies = {}
+        for project_type, month, order_type, currency_id, state, invoice_status, order_date, amount in self._get_mmr_groups(memos.ids):
+            if currency_id and currency_id not in currencies:
+                currencies[currency_id] = self.env['res.currency'].browse(currency_id)
+            amount = float(memo_finance._convert_amount(
+                amount or 0.00, currencies.get(currency_id), order_date, currency, rate_index))
+            confirmed = state not in ['draft', 'cancel']
+            row = values[project_type]
+            if order_type == 'so':
+                row['budget'] += amount
+                row['paid'] += amount if invoice_status in ['invoiced'] else 0.00
+                if confirmed:
+                    row['revenue'] += amount
+                    row['months'][MMR_MONTHS[month - 1]] += amount
+            elif confirmed:
+                row['cost'] += amount
+                row['months'][MMR_MONTHS[month - 1]] -= amount
+        return [MMRRow(
+            project_type=project_type,
+            department=project_type.capitalize(),
+            budget=row['budget'],
+            revenue=row['revenue'],
+            cost=row['cost'],
+            margin=row['revenue'] - row['cost'],
+            paid=row['paid'],
+            months=row['months'],
+        ) for project_type, row in values.items()]
+
+    @api.model
+    def get_headers(self, rows):
+        """Department, the months up to the current month (and any later
+        month with closed files) and Margin, in calendar order"""
+        today_month = fields.Date.today().month
+        months = [
+            month for count, month in enumerate(MMR_MONTHS, 1)
+            if count <= today_month or any(row.months[month] for row in rows)
+        ]
+        return ['Department'] + months + ['Margin']
+
+    @api.model
+    def get_table(self, domain, currency='NGN', year=False):
+        """MMR in the format displayed by the office dashboard:
+        {'headers': [...], 'records': [{project_type: {header: value}}], 'status': bool, 'message': ''}"""
+        rows = self.get_rows(domain, currency, year)
+        if not rows:
+            return {'headers': [], 'records': [], 'status': False, 'message': 'No record found to build MMR'}
+        headers = self.get_headers(rows)
+        records = []
+        for row in rows:
+            line = {'Department': row.department, 'Margin': row.margin}
+            line.update(row.months)
+            records.append({row.project_type: {header: line[header] for header in headers}})
+        return {'headers': headers, 'records': records, 'status': True, 'message': ''}
+
+    @api.model
+    def export_csv(self, domain, currency='NGN', year=False):
+        """returns the MMR as csv content, with the budget, revenue, cost and paid columns"""
+        rows = self.get_rows(domain, currency, year)
+        headers = self.get_headers(rows)
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(headers + ['Budget', 'Revenue', 'Cost', 'Paid'])
+        for row in rows:
+            line = {'Department': row.department, 'Margin': row.margin}
+            line.update(row.months)
+            writer.writerow(
+                [line[header] if header == 'Department' else round(line[header], 2) for header in headers] +
+                [round(row.budget, 2), round(row.revenue, 2), round(row.cost, 2), round(row.paid, 2)])
+        return output.getvalue().encode()
+
+    @api.model
+    def _cron_export_mmr(self, currency='NGN'):
+        """Stores the MMR of the current year as a csv attachment, replacing the previous export"""
+        year = fields.Date.today().year
+        name = f"MMR-{year}-{currency}.csv"
+        content = self.export_csv([('active', '=', True)], currency, year)
+        attachment = self.env['ir.attachment'].sudo()
+        attachment.search([('name', '=', name), ('res_model', '=', self._name)]).unlink()
+        attachment.create({
+            'name': name,
+            'datas': base64.b64encode(content),
+            'mimetype': 'text/csv',
+            'res_model': self._name,
+        })
+        _logger.info(f"MMR exported to {name}")
@@ -0,0 +1,118 @@
+import functools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from odoo import models, api
+
+_logger = logging.getLogger(__name__)
+
+
+class LazyLog(object):
+    """Log argument computed only when the log record is formatted, e.g
+    _logger.debug("memos %s", LazyLog(lambda: memos.mapped('code')))
+    costs nothing while the debug level is disabled"""
+    __slots__ = ['func']
+
+    def __init__(self, func):
+        self.func = func
+
+    def __str__(self):
+        return str(self.func())
+
+    __repr__ = __str__
+
+
+def lazy_debug(logger, msg, *args):
+    """logger.debug where the callable args are only called if the debug level is enabled"""
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(msg, *[arg() if callable(arg) else arg for arg in args])
+
+
+class MemoProfiler(object):
+    """Timing and query count of the spans (routes, compute methods) of the worker"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans = {}
+
+    def record(self, name, duration, queries):
+        with self._lock:
+            span = self._spans.get(name)
+            if span is None:
+                span = self._spans[name] = {'count': 0, 'total_time': 0.00, 'max_time': 0.00, 'queries': 0, 'max_queries': 0}
+            span['count'] += 1
+            span['total_time'] += duration
+            span['max_time'] = max(span['max_time'], duration)
+            span['queries'] += queries
+            span['max_queries'] = max(span['max_queries'], queries)
+
+    def stats(self):
+        with self._lock:
+            return {
+                name: dict(
+                    span,
+                    total_time=round(span['total_time'], 4),
+                    max_time=round(span['max_time'], 4),
+                    avg_time=round(span['total_time'] / span['count'], 4),
+                    avg_queries=round(span['queries'] / span['count'], 2),
+                )
+                for name, span in sorted(self._spans.items())
+            }
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+
+
+memo_profiler = MemoProfiler()
+
+
+def _query_count(cr):
+    return getattr(cr, 'sql_log_count', 0) if cr is not None else 0
+
+
+@contextmanager
+def profile_span(name, cr=None):
+    """records the duration and number of queries executed on cr by the block"""
+    queries, start = _query_count(cr), time.perf_counter()
+    try:
+        yield
+    finally:
+        duration, queries = time.perf_counter() - start, _query_count(cr) - queries
+        memo_profiler.record(name, duration, queries)
+        lazy_debug(_logger, "%s: %.4fs, %s queries", name, duration, queries)
+
+
+def profiled(name=None):
+    """decorator recording a span per call of a model or controller method,
+    the queries are counted on the cursor of the model or of the request"""
+    def decorator(method):
+        span_name = name or method.__qualname__
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            env = getattr(self, 'env', None)
+            if env is None:
+                from odoo.http import request
+                env = request and request.env
+            with profile_span(span_name, env.cr if env is not None else None):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class MemoProfilerReport(models.AbstractModel):
+    _name = "memo.profiler"
+    _description = "Memo and dashboard timing statistics"
+
+    @api.model
+    def get_stats(self):
+        return {'pid': os.getpid(), 'spans': memo_profiler.stats()}
+
+    @api.model
+    def reset(self):
+        memo_profiler.reset()
+        return True
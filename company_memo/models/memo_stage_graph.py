@@ -0,0 +1,98 @@
+from odoo import models, api, tools
+
+# fields whose change alters the compiled configs
+STAGE_GRAPH_FIELDS = {
+    'memo.config': {'stage_ids', 'memo_type', 'department_id', 'approver_ids', 'active'},
+    'memo.stage': {'approver_ids', 'sub_stage_ids', 'sequence', 'active'},
+}
+
+
+class MemoStageGraph(models.AbstractModel):
+    """Stage transitions of the memo configs, compiled once per config.
+
+    A compiled config is a dict of tuples kept in the registry ormcache, keyed
+    by the version of the memo_stage_graph cache (see memo.cache.version):
+        config_id: the memo.config id
+        stage_ids: the ordered stage ids
+        next_stage: {stage_id: next stage_id}, no entry for the final stage
+        previous_stage: {stage_id: previous stage_id}, no entry for the first stage
+        approver_ids: {stage_id: approver employee ids}
+        final_stage_id: the last stage id
+    The version is bumped when a memo config or memo stage is created, deleted
+    or one of the STAGE_GRAPH_FIELDS is written.
+    """
+    _name = "memo.stage.graph"
+    _description = "Memo Stage Transitions"
+
+    @api.model
+    @tools.ormcache('memo_type_id', 'department_id', 'version')
+    def _find_config_id(self, memo_type_id, department_id, version):
+        return self._search_config_id(memo_type_id, department_id)
+
+    @api.model
+    def _search_config_id(self, memo_type_id, department_id):
+        config = self.env['memo.config'].sudo().search([
+            ('memo_type', '=', memo_type_id),
+            ('department_id', '=', department_id)
+            ], limit=1)
+        return config.id
+
+    @api.model
+    @tools.ormcache('config_id', 'version')
+    def _compile_config(self, config_id, version):
+        return self._read_config(config_id)
+
+    @api.model
+    def _read_config(self, config_id):
+        config = self.env['memo.config'].sudo().browse(config_id).exists()
+        stages = config.stage_ids
+        stage_ids = tuple(stages.ids)
+        return {
+            'config_id': config.id,
+            'stage_ids': stage_ids,
+            'next_stage': dict(zip(stage_ids, stage_ids[1:])),
+            'previous_stage': dict(zip(stage_ids[1:], stage_ids)),
+            'approver_ids': {stage.id: tuple(stage.approver_ids.ids) for stage in stages},
+            'final_stage_id': stage_ids[-1] if stage_ids else False,
+        }
+
+    @api.model
+    def get_graph(self, memo_type_id, department_id):
+        """compiled config of the memo type and department, None if not configured"""
+        version = self.env['memo.cache.version'].get('memo_stage_graph')
+        if version is None:
+            config_id = self._search_config_id(memo_type_id or False, department_id or False)
+        else:
+            config_id = self._find_config_id(memo_type_id or False, department_id or False, version)
+        return self.get_config_graph(config_id, version)
+
+    @api.model
+    def get_config_graph(self, config_id, version=False):
+        if not config_id:
+            return None
+        if version is False:
+            version = self.env['memo.cache.version'].get('memo_stage_graph')
+        if version is None:
+            return self._read_config(config_id)
+        return self._compile_config(config_id, version)
+
+    @api.model
+    def next_stage_id(self, graph, stage_id, skip_stage_id=False):
+        """stage following stage_id, the stage to skip (second option of a conditional stage)
+        is jumped over. None on the final stage"""
+        next_stage_id = graph['next_stage'].get(stage_id)
+        if skip_stage_id and next_stage_id == skip_stage_id:
+            next_stage_id = graph['next_stage'].get(skip_stage_id)
+        return next_stage_id
+
+    @api.model
+    def previous_stage_id(self, graph, stage_id, skip_stage_id=False):
+        """stage preceding stage_id, the stage to skip is jumped over. None on the first stage"""
+        previous_stage_id = graph['previous_stage'].get(stage_id)
+        if skip_stage_id and previous_stage_id == skip_stage_id:
+            previous_stage_id = graph['previous_stage'].get(skip_stage_id)
+        return previous_stage_id
+
+    @api.model
+    def invalidate_graph(self):
+        self.env['memo.cache.version'].bump('memo_stage_graph')
@@ -32,8 +32,13 @@ class PurchaseOrder(models.Model):
                     ])
                 if memo:
                     memo.state = status
+    def unlink(self):
+        self.env['memo.finance.snapshot.queue'].enqueue_orders('po', self.ids)
+        return super(PurchaseOrder, self).unlink()
+    
     def write(self, vals):
         res = super(PurchaseOrder, self).write(vals)
+        self.env['memo.finance.snapshot.queue'].enqueue_orders('po', self.ids)
         if self.memo_id.to_unfreezed_budget and self.memo_id.project_memo_id:
             self.memo_id.project_memo_id.update_dashboard_finances()
         else:
@@ -114,4 +119,5 @@ class PurchaseOrder(models.Model):
         for order, partner_vals in zip(orders, partner_vals_list):
             if partner_vals:
                 order.sudo().write(partner_vals)  # Because the purchase user doesn't have write on `res.partner`
+        self.env['memo.finance.snapshot.queue'].enqueue_orders('po', orders.ids)
         return orders
\ No newline at end of file
@@ -0,0 +1,101 @@
+import bisect
+from datetime import datetime, timedelta
+
+from odoo import models, api, _
+from odoo.exceptions import ValidationError
+
+RATE_INDEX_CACHE_KEY = 'memo_currency_rate_index'
+
+
+class CurrencyRateIndex(object):
+    """Rates of one currency for one company sorted by date.
+
+    Used to find the rate of an order date with a bisect lookup instead of
+    filtering all the historical rate_ids of the currency for every order.
+    """
+
+    def __init__(self, rates):
+        """rates: list of (date, inverse_company_rate, is_company_rate),
+        company specific rates take precedence over shared rates of the same day"""
+        rates = sorted(rates, key=lambda r: (r[0], r[2]))
+        self.dates = [r[0] for r in rates]
+        self.rates = [r[1] for r in rates]
+
+    def __bool__(self):
+        return bool(self.rates)
+
+    def __len__(self):
+        return len(self.rates)
+
+    def latest(self):
+        """returns the most recent rate"""
+        if not self.rates:
+            raise ValidationError(_('You must ensure that both currencies (NGN, USD) has at least an update rate ids'))
+        return self.rates[-1]
+
+    def get(self, rate_date, days=2):
+        """returns the most recent rate strictly within `days` of the rate_date
+        e.g 22 sep < 24 sep > 26 sept, if not found, used the current rate"""
+        latest = self.latest()
+        if not rate_date:
+            return latest
+        if isinstance(rate_date, datetime):
+            rate_date = rate_date.date()
+        position = bisect.bisect_left(self.dates, rate_date + timedelta(days=days)) - 1
+        if position >= 0 and self.dates[position] > rate_date - timedelta(days=days):
+            return self.rates[position] or latest
+        return latest
+
+
+class ResCurrency(models.Model):
+    _inherit = "res.currency"
+
+    def _get_rate_index(self, company=None):
+        """returns the CurrencyRateIndex of the currency for the company.
+        The index is built once per transaction and dropped whenever a
+        res.currency.rate is created, written or deleted"""
+        self.ensure_one()
+        company = company or self.env.company
+        cache = self.env['res.currency.rate']._get_rate_index_cache()
+        key = (self.id, company.id)
+        if key not in cache:
+            rates = self.env['res.currency.rate'].sudo().with_company(company).search([
+                ('currency_id', '=', self.id),
+                ('company_id', 'in', [company.id, False]),
+            ])
+            cache[key] = CurrencyRateIndex([
+                (rate.name, rate.inverse_company_rate, bool(rate.company_id)) for rate in rates
+            ])
+        return cache[key]
+
+
+class ResCurrencyRate(models.Model):
+    _inherit = "res.currency.rate"
+
+    def _get_rate_index_cache(self):
+        cr = self.env.cr
+        if RATE_INDEX_CACHE_KEY not in cr.cache:
+            cr.cache[RATE_INDEX_CACHE_KEY] = {}
+            # the index only lives for the current transaction
+            cr.postcommit.add(self._clear_rate_index_cache)
+            cr.postrollback.add(self._clear_rate_index_cache)
+        return cr.cache[RATE_INDEX_CACHE_KEY]
+
+    def _clear_rate_index_cache(self):
+        self.env.cr.cache.pop(RATE_INDEX_CACHE_KEY, None)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self._clear_rate_index_cache()
+        self.env['memo.finance.snapshot.queue'].enqueue_all()
+        return super(ResCurrencyRate, self).create(vals_list)
+
+    def write(self, vals):
+        self._clear_rate_index_cache()
+        self.env['memo.finance.snapshot.queue'].enqueue_all()
+        return super(ResCurrencyRate, self).write(vals)
+
+    def unlink(self):
+        self._clear_rate_index_cache()
+        self.env['memo.finance.snapshot.queue'].enqueue_all()
+        return super(ResCurrencyRate, self).unlink()
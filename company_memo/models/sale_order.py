@@ -30,6 +30,7 @@ class SaleOrder(models.Model):
 
     def write(self, vals):
         res = super(SaleOrder, self).write(vals)
+        self.env['memo.finance.snapshot.queue'].enqueue_orders('so', self.ids)
         if self.memo_id:
             # raise ValidationError('gjhjhgjg')
             self.memo_id.update_dashboard_finances()
@@ -51,7 +52,13 @@ class SaleOrder(models.Model):
                 memo_id = self.env['memo.model'].browse([vals['memo_id']])
                 code = memo_id.code + '-' if memo_id else ''
             vals['name'] = f"{code}{number_code.replace('S', '')}"
-        return super().create(vals_list)
+        orders = super().create(vals_list)
+        self.env['memo.finance.snapshot.queue'].enqueue_orders('so', orders.ids)
+        return orders
+    
+    def unlink(self):
+        self.env['memo.finance.snapshot.queue'].enqueue_orders('so', self.ids)
+        return super(SaleOrder, self).unlink()
   
     def action_populate_all_project_pos(self):
         if self.memo_id:
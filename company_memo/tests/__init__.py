@@ -0,0 +1,6 @@
+from . import test_dashboard_total_benchmark
+
+from . import test_mail_queue
+from . import test_memo_stage_graph
+from . import test_memo_bulk_action
+from . import test_memo_artifact
\ No newline at end of file
@@ -0,0 +1,66 @@
+import logging
+import time
+
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged('-standard', 'memo_benchmark')
+class TestDashboardTotalBenchmark(TransactionCase):
+    """Compares the per record computation of the memo dashboard totals
+    with the batched compute_dashboard_total.
+
+    Not part of the standard test run, use --test-tags memo_benchmark
+    """
+    MEMO_SIZES = [1000, 10000, 50000]
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.partner = cls.env['res.partner'].create({'name': 'Benchmark Client'})
+        cls.product = cls.env['product.product'].create({'name': 'Benchmark Service', 'list_price': 100.0})
+        cls.memo_type = cls.env['memo.type'].create({'name': 'Benchmark', 'memo_key': 'benchmark'})
+        cls.sale_orders = cls.env['sale.order'].create([{
+            'partner_id': cls.partner.id,
+            'order_line': [(0, 0, {'product_id': cls.product.id, 'product_uom_qty': count + 1, 'price_unit': 100.0})],
+        } for count in range(20)])
+        cls.sale_orders[:10].action_confirm()
+        cls.purchase_orders = cls.env['purchase.order'].create([{
+            'partner_id': cls.partner.id,
+            'order_line': [(0, 0, {'product_id': cls.product.id, 'product_qty': count + 1, 'price_unit': 50.0})],
+        } for count in range(20)])
+        cls.purchase_orders[:10].button_confirm()
+
+    def _create_memos(self, size):
+        return self.env['memo.model'].create([{
+            'name': f'Benchmark file {count}',
+            'memo_type': self.memo_type.id,
+            'client_id': self.partner.id,
+            'so_ids': [(6, 0, self.sale_orders[count % 18:count % 18 + 3].ids)],
+            'po_ids': [(6, 0, self.purchase_orders[count % 18:count % 18 + 3].ids)],
+        } for count in range(size)])
+
+    def test_benchmark_compute_dashboard_total(self):
+        for size in self.MEMO_SIZES:
+            memos = self._create_memos(size)
+            memos.invalidate_recordset()
+            start = time.perf_counter()
+            per_record_values = {memo.id: memo._get_dashboard_order_values({}, {}) for memo in memos}
+            per_record_time = time.perf_counter() - start
+
+            memos.invalidate_recordset()
+            start = time.perf_counter()
+            memos.compute_dashboard_total()
+            batched_time = time.perf_counter() - start
+
+            _logger.info(
+                "compute_dashboard_total on %s memos: per record %.2fs, batched %.2fs (x%.1f)",
+                size, per_record_time, batched_time, per_record_time / (batched_time or 1e-6))
+            for memo in memos[:50]:
+                so_values, po_values = per_record_values[memo.id][:2]
+                self.assertAlmostEqual(memo.total_budgeted, so_values[0], places=2)
+                self.assertAlmostEqual(memo.total_cost, po_values[0], places=2)
+                self.assertAlmostEqual(memo.total_paid_revenue, so_values[2], places=2)
+            self.assertLess(batched_time, per_record_time)
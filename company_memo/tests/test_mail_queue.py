@@ -0,0 +1,69 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from odoo import fields
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+
+@tagged('-at_install', 'post_install')
+class TestMemoMailQueue(TransactionCase):
+
+    def setUp(self):
+        super(TestMemoMailQueue, self).setUp()
+        self.queue = self.env['memo.mail.queue']
+        self.partner = self.env['res.partner'].create({'name': 'Queue Partner'})
+
+    def test_01_coalesce_and_deduplicate(self):
+        first = self.queue.enqueue(
+            'Approver@example.com, follower@example.com', 'Memo Notification', '<p>Forwarded</p>',
+            email_from='admin@example.com', email_cc='follower@example.com', record=self.partner)
+        second = self.queue.enqueue(
+            'approver@example.com', 'Memo Notification', '<p>Approved</p>',
+            email_from='admin@example.com', email_cc='other@example.com', record=self.partner)
+        self.assertEqual(first, second)
+        self.assertEqual(first.email_to, 'approver@example.com,follower@example.com')
+        self.assertEqual(first.email_cc, 'other@example.com')
+        self.assertIn('Forwarded', first.body_html)
+        self.assertIn('Approved', first.body_html)
+
+        other = self.queue.enqueue('approver@example.com', 'Other subject', '<p>Other</p>', record=self.partner)
+        self.assertNotEqual(other, first)
+        self.assertFalse(self.queue.enqueue('', 'Memo Notification', '<p>No recipient</p>'))
+
+    def test_02_send_due_notifications(self):
+        queued = self.queue.enqueue('approver@example.com', 'Memo Notification', '<p>Forwarded</p>', record=self.partner)
+        queued.scheduled_date = '2000-01-01 00:00:00'
+        self.queue._cron_send()
+        self.assertEqual(queued.attempts, 1)
+        self.assertEqual(queued.state, 'sent')
+        # auto deleted once sent
+        self.assertFalse(queued.mail_id.exists())
+        self.assertFalse(self.env['mail.mail'].search([('model', '=', 'res.partner'), ('res_id', '=', self.partner.id)]))
+
+    def test_03_retry_failed_notifications(self):
+        self.env['ir.config_parameter'].sudo().set_param('company_memo.mail_queue_retries', 2)
+        queued = self.queue.enqueue('approver@example.com', 'Memo Notification', '<p>Forwarded</p>', record=self.partner)
+        queued.scheduled_date = '2000-01-01 00:00:00'
+
+        def send_failure(mails, auto_commit=False, raise_exception=False):
+            mails.write({'state': 'exception', 'failure_reason': 'SMTP unavailable'})
+
+        with patch.object(type(self.env['mail.mail']), 'send', send_failure):
+            self.queue._cron_send()
+            self.assertEqual(queued.attempts, 1)
+            self.assertEqual(queued.state, 'pending')
+            self.assertEqual(queued.last_error, 'SMTP unavailable')
+            self.assertAlmostEqual(
+                queued.scheduled_date, fields.Datetime.now() + timedelta(seconds=300), delta=timedelta(seconds=30))
+
+            # not due yet
+            self.queue._cron_send()
+            self.assertEqual(queued.attempts, 1)
+
+            queued.scheduled_date = '2000-01-01 00:00:00'
+            self.queue._cron_send()
+            self.assertEqual(queued.attempts, 2)
+            self.assertEqual(queued.state, 'exception')
+            self.assertAlmostEqual(
+                queued.scheduled_date, fields.Datetime.now() + timedelta(seconds=600), delta=timedelta(seconds=30))
@@ -0,0 +1,48 @@
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+
+@tagged('-at_install', 'post_install')
+class TestMemoArtifactBuilder(TransactionCase):
+
+    def setUp(self):
+        super(TestMemoArtifactBuilder, self).setUp()
+        self.builder = self.env['memo.artifact.builder']
+        self.partner = self.env['res.partner'].create({'name': 'Artifact Client'})
+        self.memo_type = self.env['memo.type'].create({'name': 'Artifact', 'memo_key': 'artifact_test'})
+        documents = self.env['memo.stage.document.line'].create([
+            {'name': 'Bill of Lading', 'compulsory': True},
+            {'name': 'Packing List'},
+        ])
+        self.stage = self.env['memo.stage'].create({
+            'name': 'Artifact Stage',
+            'required_document_line': [(6, 0, documents.ids)],
+        })
+        self.memos = self.env['memo.model'].create([{
+            'name': f'Artifact memo {count}',
+            'memo_type': self.memo_type.id,
+            'client_id': self.partner.id,
+            'stage_id': self.stage.id,
+        } for count in range(3)])
+
+    def test_01_documents_batched_and_not_duplicated(self):
+        results = self.builder.generate_artifacts([(memo, self.stage, memo, memo.code) for memo in self.memos])
+        self.assertEqual([len(documents) for invoices, documents in results], [2, 2, 2])
+        for memo, (invoices, documents) in zip(self.memos, results):
+            memo.attachment_ids = [(4, document) for document in documents]
+            self.assertEqual(
+                set(memo.attachment_ids.mapped('stage_document_name')),
+                {f'Bill of Lading-{memo.id}-{self.stage.id}', f'Packing List-{memo.id}-{self.stage.id}'})
+        results = self.builder.generate_artifacts([(memo, self.stage, memo, memo.code) for memo in self.memos])
+        self.assertEqual(results, [([], []), ([], []), ([], [])])
+
+    def test_02_invoice_names_sequential(self):
+        if not self.builder.get_journal_ids(self.env.user.company_id.id)['out_invoice']:
+            self.skipTest("No sale journal INV in the company")
+        invoice_line = self.env['memo.stage.invoice.line'].create({'name': 'Freight', 'move_type': 'customer'})
+        self.stage.required_invoice_line = invoice_line
+        results = self.builder.generate_artifacts([(memo, self.stage, memo, '') for memo in self.memos])
+        moves = self.env['account.move'].browse([invoices[0] for invoices, documents in results])
+        suffixes = [int(name.split('-')[1]) for name in moves.mapped('name')]
+        self.assertEqual(suffixes, list(range(suffixes[0], suffixes[0] + 3)))
+        self.assertEqual(moves.memo_id, self.memos)
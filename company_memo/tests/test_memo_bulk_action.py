@@ -0,0 +1,76 @@
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+
+@tagged('-at_install', 'post_install')
+class TestMemoBulkAction(TransactionCase):
+
+    def setUp(self):
+        super(TestMemoBulkAction, self).setUp()
+        self.department = self.env['hr.department'].create({'name': 'Bulk Department'})
+        self.employee = self.env['hr.employee'].create({'name': 'Bulk Requester', 'department_id': self.department.id})
+        self.approver = self.env['hr.employee'].create({'name': 'Bulk Approver', 'work_email': 'bulk.approver@example.com'})
+        self.memo_type = self.env['memo.type'].create({'name': 'Bulk', 'memo_key': 'bulk_test'})
+        self.stages = self.env['memo.stage'].create([
+            {'name': f'Bulk Stage {count}', 'sequence': count} for count in range(3)
+        ])
+        self.stages[1].approver_ids = self.approver
+        self.config = self.env['memo.config'].create({
+            'memo_type': self.memo_type.id,
+            'department_id': self.department.id,
+            'stage_ids': [(6, 0, self.stages.ids)],
+            'approver_ids': [(6, 0, self.approver.ids)],
+        })
+        self.memos = self.env['memo.model'].create([{
+            'name': f'Bulk memo {count}',
+            'memo_type': self.memo_type.id,
+            'employee_id': self.employee.id,
+            'memo_setting_id': self.config.id,
+            'stage_id': self.stages[0].id,
+        } for count in range(3)])
+
+    def _run(self, action, user=None):
+        wizard = self.env['memo.bulk.action'].with_user(user or self.env.user).with_context(
+            active_model='memo.model', active_ids=self.memos.ids).create({'action': action})
+        wizard.action_process()
+        return wizard
+
+    def test_01_forward_with_digest(self):
+        wizard = self._run('forward')
+        self.assertEqual(wizard.done_count, 3, wizard.line_ids.mapped('message'))
+        self.assertEqual(self.memos.stage_id, self.stages[1])
+        queued = self.env['memo.mail.queue'].search([('email_to', 'ilike', 'bulk.approver@example.com')])
+        self.assertEqual(len(queued), 1)
+        self.assertFalse(queued.res_model)
+        for memo in self.memos:
+            self.assertIn(memo.name, queued.body_html)
+
+    def test_02_approve_reported_per_memo(self):
+        wizard = self._run('approve')
+        self.assertEqual(wizard.failed_count, 3)
+        self.assertTrue(all(wizard.line_ids.mapped('message')))
+        self.assertEqual(self.memos.stage_id, self.stages[0])
+
+    def test_03_approve_with_digest(self):
+        admin = self.env.ref('base.user_admin')
+        admin_employee = admin.employee_id or self.env['hr.employee'].create({'name': 'Bulk Admin', 'user_id': admin.id})
+        self.stages[0].approver_ids = admin_employee
+        self.stages[2].approver_ids = self.approver
+        wizard = self._run('approve', user=admin)
+        self.assertEqual(wizard.done_count, 3, wizard.line_ids.mapped('message'))
+        self.assertEqual(self.memos.mapped('state'), ['Done'] * 3)
+        self.assertEqual(self.memos.stage_id, self.stages[2])
+        queued = self.env['memo.mail.queue'].search([('email_to', 'ilike', 'bulk.approver@example.com')])
+        self.assertEqual(len(queued), 1)
+        self.assertIn('approved', queued.body_html)
+        for memo in self.memos:
+            self.assertIn(memo.name, queued.body_html)
+
+    def test_04_forward_creates_stage_documents(self):
+        self.stages[1].required_document_line = self.env['memo.stage.document.line'].create({'name': 'Bulk Document'})
+        wizard = self._run('forward')
+        self.assertEqual(wizard.done_count, 3, wizard.line_ids.mapped('message'))
+        for memo in self.memos:
+            self.assertEqual(
+                memo.attachment_ids.mapped('stage_document_name'),
+                [f"Bulk Document-{memo.id}-{self.stages[1].id}"])
@@ -0,0 +1,57 @@
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+from odoo.addons.company_memo.models.memo_cache_version import CACHE_VERSION_CHANGES
+
+
+@tagged('-at_install', 'post_install')
+class TestMemoStageGraph(TransactionCase):
+
+    def setUp(self):
+        super(TestMemoStageGraph, self).setUp()
+        self.graph = self.env['memo.stage.graph']
+        self.employee = self.env['hr.employee'].create({'name': 'Graph Approver'})
+        self.department = self.env['hr.department'].create({'name': 'Graph Department'})
+        self.memo_type = self.env['memo.type'].create({'name': 'Graph', 'memo_key': 'graph_test'})
+        self.stages = self.env['memo.stage'].create([
+            {'name': f'Graph Stage {count}', 'sequence': count} for count in range(4)
+        ])
+        self.stages[1].approver_ids = self.employee
+        self.config = self.env['memo.config'].create({
+            'memo_type': self.memo_type.id,
+            'department_id': self.department.id,
+            'stage_ids': [(6, 0, self.stages.ids)],
+            'approver_ids': [(6, 0, self.employee.ids)],
+        })
+
+    def test_01_transitions(self):
+        graph = self.graph.get_graph(self.memo_type.id, self.department.id)
+        stage_ids = self.config.stage_ids.ids
+        self.assertEqual(graph['stage_ids'], tuple(stage_ids))
+        self.assertEqual(graph['final_stage_id'], stage_ids[-1])
+        self.assertEqual(self.graph.next_stage_id(graph, stage_ids[0]), stage_ids[1])
+        self.assertEqual(self.graph.next_stage_id(graph, stage_ids[0], skip_stage_id=stage_ids[1]), stage_ids[2])
+        self.assertIsNone(self.graph.next_stage_id(graph, stage_ids[-1]))
+        self.assertEqual(self.graph.previous_stage_id(graph, stage_ids[2], skip_stage_id=stage_ids[1]), stage_ids[0])
+        self.assertEqual(graph['approver_ids'][self.stages[1].id], tuple(self.employee.ids))
+
+    def test_02_invalidated_on_write(self):
+        self.graph.get_graph(self.memo_type.id, self.department.id)
+        self.config.stage_ids = [(3, self.stages[-1].id)]
+        graph = self.graph.get_graph(self.memo_type.id, self.department.id)
+        self.assertEqual(len(graph['stage_ids']), 3)
+        self.assertNotIn(self.stages[-1].id, graph['next_stage'].values())
+
+    def test_03_versioned_on_graph_fields(self):
+        versions = self.env['memo.cache.version']
+        # as once the setup is committed
+        self.env.cr.cache.pop(CACHE_VERSION_CHANGES, None)
+        version = versions.get('memo_stage_graph')
+        self.assertIsNotNone(version)
+        self.graph.get_graph(self.memo_type.id, self.department.id)
+        self.stages[2].name = 'Graph Stage Renamed'
+        self.assertEqual(versions.get('memo_stage_graph'), version)
+        self.stages[2].approver_ids = self.employee
+        # read through the cache until the change is committed
+        self.assertIsNone(versions.get('memo_stage_graph'))
+        graph = self.graph.get_graph(self.memo_type.id, self.department.id)
+        self.assertEqual(graph['approver_ids'][self.stages[2].id], tuple(self.employee.ids))
@@ -1,4 +1,5 @@
 from . import return_memo_wizard
 from . import memo_config_duplication_wizard
 from . import import_logistic_item
-from . import memo_confirmation
\ No newline at end of file
+from . import memo_confirmation
+from . import memo_bulk_action
\ No newline at end of file
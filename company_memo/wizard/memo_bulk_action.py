@@ -0,0 +1,208 @@
+from odoo import models, fields, api, _
+from odoo.exceptions import ValidationError, UserError, AccessError
+from ..models.company_memo import DEFERRED_ARTIFACTS
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# memo types whose approval opens a dialog to complete, they are approved one at a time
+INTERACTIVE_APPROVAL_TYPES = ['employee_update']
+
+
+class MemoBulkAction(models.TransientModel):
+    """Forwards or approves the selected memos at once.
+
+    The memos are grouped by memo type, department and stage: the checks of
+    the stage (approver of the stage, next stage and its approvers, optional
+    stages) run once per group, only the checks of its data run per memo.
+    The memos of a group are moved in one savepoint and the invoices,
+    documents and sub stages of their new stage are created at once. If the
+    group fails, it is rolled back and each memo is processed in its own
+    savepoint, a memo that fails is rolled back without stopping the others
+    and its error is reported on its line. The notifications are not sent per
+    memo, each recipient gets a single digest of the memos moved.
+    """
+    _name = "memo.bulk.action"
+    _description = "Memo Bulk Forward / Approval"
+
+    action = fields.Selection([
+        ('forward', 'Forward'),
+        ('approve', 'Approve'),
+        ], string="Action", required=True, default='forward')
+    memo_ids = fields.Many2many('memo.model', 'memo_bulk_action_memo_rel', 'wizard_id', 'memo_id', string="Memos")
+    direct_employee_id = fields.Many2one(
+        'hr.employee', 'Direct To',
+        help="Employee the memos are forwarded to, by default the first approver of the next stage of each memo")
+    comments = fields.Text('Comment')
+    line_ids = fields.One2many('memo.bulk.action.line', 'wizard_id', string="Report")
+    done_count = fields.Integer("Processed", compute="_compute_counts")
+    failed_count = fields.Integer("Failed", compute="_compute_counts")
+
+    @api.model
+    def default_get(self, fields):
+        res = super(MemoBulkAction, self).default_get(fields)
+        if self.env.context.get('active_model') == 'memo.model' and self.env.context.get('active_ids'):
+            res['memo_ids'] = [(6, 0, self.env.context['active_ids'])]
+        return res
+
+    @api.depends('line_ids.status')
+    def _compute_counts(self):
+        for rec in self:
+            rec.done_count = len(rec.line_ids.filtered(lambda line: line.status == 'done'))
+            rec.failed_count = len(rec.line_ids.filtered(lambda line: line.status == 'failed'))
+
+    def _group_memos(self):
+        """{(memo type, department, stage, stage to skip): memos}"""
+        groups = {}
+        for memo in self.memo_ids:
+            key = (memo.memo_type.id, memo.employee_id.department_id.id, memo.stage_id.id, memo.stage_to_skip.id)
+            groups.setdefault(key, self.env['memo.model'])
+            groups[key] |= memo
+        return groups
+
+    def _check_forward_group(self, memo):
+        """checks of the stage of the group, returns the employee the memos are directed to"""
+        if memo.stage_id.memo_has_condition:
+            raise ValidationError(_("The stage %s has optional stages, forward its memos one at a time to choose the stage", memo.stage_id.name))
+        approver_ids, next_stage_id = memo.get_next_stage_artifact(memo.stage_id)
+        employee = self.direct_employee_id or self.env['hr.employee'].browse(approver_ids[:1])
+        if not employee:
+            raise ValidationError(_("The next stage has no approver, select the employee to direct the memos to"))
+        return employee
+
+    def _check_approve_group(self, memo):
+        """checks of the stage of the group, returns whether the user approves from the memo configuration"""
+        if memo.memo_type.memo_key in INTERACTIVE_APPROVAL_TYPES:
+            raise ValidationError(_("%s memos must be approved one at a time", memo.memo_type.name))
+        if self.env.uid not in memo.stage_id.approver_ids.user_id.ids:
+            raise ValidationError(_("You are not Permitted to approve this Memo. Contact the authorized Person"))
+        return memo.determine_if_user_is_config_approver()
+
+    def _forward_memo(self, memo, employee):
+        memo.validate_memo_forward()
+        self.env['memo.foward'].create({
+            'memo_record': memo.id,
+            'resp': self.env.uid,
+            'direct_employee_id': employee.id,
+            'description_two': self.comments,
+        }).forward_memo()
+
+    def _approve_memo(self, memo, is_config_approver):
+        memo.validate_memo_approval(is_config_approver)
+        memo.process_memo_approval()
+
+    def _move_memo(self, memo, group_check):
+        if self.action == 'forward':
+            self._forward_memo(memo, group_check)
+        else:
+            self._approve_memo(memo, group_check)
+
+    def _process_group(self, memos, group_check):
+        """moves the memos of the group in one savepoint and creates the artifacts of
+        their new stage at once, returns False or {memo id: error message} of the
+        memos processed one at a time when the group failed"""
+        wizard = self.with_context(memo_defer_artifacts=True)
+        try:
+            with self.env.cr.savepoint():
+                self.env.cr.cache[DEFERRED_ARTIFACTS] = []
+                for memo in memos.with_env(wizard.env):
+                    wizard._move_memo(memo, group_check)
+                memo_stages = self.env.cr.cache.pop(DEFERRED_ARTIFACTS)
+                self.env['memo.model'].generate_stages_artifacts([
+                    (self.env['memo.model'].browse(memo_id), self.env['memo.stage'].browse(stage_id))
+                    for memo_id, stage_id in memo_stages])
+            return False
+        except Exception:
+            _logger.exception("Bulk %s of memos %s failed, processing them one at a time", self.action, memos.ids)
+        finally:
+            self.env.cr.cache.pop(DEFERRED_ARTIFACTS, None)
+        return {memo.id: self._process_memo(memo, group_check) for memo in memos}
+
+    def _process_memo(self, memo, group_check):
+        """processes the memo in a savepoint, returns the error message if it failed"""
+        try:
+            with self.env.cr.savepoint():
+                self._move_memo(memo, group_check)
+        except (UserError, AccessError) as e:
+            return str(e.args[0]) if e.args else str(e)
+        except Exception as e:
+            _logger.exception("Bulk %s of memo %s failed", self.action, memo.id)
+            return str(e)
+        return False
+
+    def _send_digest(self, memos):
+        """one notification per recipient listing the memos moved"""
+        recipient_memos = {}
+        for memo in memos:
+            email_to, email_cc = memo._get_notification_emails()
+            for email in set(email_to) | set(email_cc):
+                recipient_memos.setdefault(email, self.env['memo.model'])
+                recipient_memos[email] |= memo
+        action = 'forwarded' if self.action == 'forward' else 'approved'
+        email_from = self.env.user.email
+        for email, recipient_memo_ids in recipient_memos.items():
+            memo_lines = "".join(
+                f"<li>{memo.code or ''} {memo.name} ({memo.stage_id.name or '-'}): {memo.get_url(memo.id)}</li>"
+                for memo in recipient_memo_ids)
+            body_msg = f"""Dear sir / Madam, \n <br/>
+            I wish to notify you that the following {len(recipient_memo_ids)} memo(s) were {action}
+            and sent to you for review / approval: \n <br/>
+            <ul>{memo_lines}</ul>
+            {self.comments or ''} <br/>
+            Yours Faithfully.{self.env.user.name}"""
+            self.env['memo.mail.queue'].enqueue(
+                email, "Memo Notification", body_msg, email_from=email_from, reply_to=email_from)
+
+    def action_process(self):
+        self.ensure_one()
+        self.line_ids.unlink()
+        wizard = self.with_context(memo_notification_digest=True)
+        lines, done = [], self.env['memo.model']
+        for memos in wizard._group_memos().values():
+            memos = memos.with_context(memo_notification_digest=True)
+            try:
+                if self.action == 'forward':
+                    group_check = wizard._check_forward_group(memos[0])
+                else:
+                    group_check = wizard._check_approve_group(memos[0])
+            except (UserError, AccessError) as e:
+                lines += [{
+                    'memo_id': memo.id, 'status': 'failed', 'message': e.args[0], 'stage_id': memo.stage_id.id,
+                } for memo in memos]
+                continue
+            errors = wizard._process_group(memos, group_check) or {}
+            for memo in memos:
+                error = errors.get(memo.id)
+                if not error:
+                    done |= memo
+                lines.append({
+                    'memo_id': memo.id,
+                    'status': 'failed' if error else 'done',
+                    'message': error or False,
+                    'stage_id': memo.stage_id.id,
+                })
+        self.env['memo.bulk.action.line'].create([dict(line, wizard_id=self.id) for line in lines])
+        self._send_digest(done)
+        _logger.info("Bulk %s of %s memos: %s processed, %s failed", self.action, len(self.memo_ids), len(done), len(self.memo_ids) - len(done))
+        return {
+            'name': _('Bulk Memo Report'),
+            'view_mode': 'form',
+            'res_model': self._name,
+            'res_id': self.id,
+            'type': 'ir.actions.act_window',
+            'target': 'new',
+        }
+
+
+class MemoBulkActionLine(models.TransientModel):
+    _name = "memo.bulk.action.line"
+    _description = "Memo Bulk Action Report Line"
+
+    wizard_id = fields.Many2one('memo.bulk.action', string="Wizard", ondelete='cascade')
+    memo_id = fields.Many2one('memo.model', string="Memo")
+    stage_id = fields.Many2one('memo.stage', string="Stage")
+    status = fields.Selection([
+        ('done', 'Processed'),
+        ('failed', 'Failed'),
+        ], string="Status")
+    message = fields.Text("Message")
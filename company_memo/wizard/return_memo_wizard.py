@@ -27,17 +27,12 @@ class Send_Memo_back(models.Model):
         return "<a href={}> Click<a/>. ".format(base_url)
     
     def get_previous_stage(self, memo_record):
-        stages = memo_record.memo_setting_id.mapped('stage_ids').filtered(
-            lambda skp: skp.id != memo_record.stage_to_skip.id
-        ).ids
-        # stages = memo_record.memo_setting_id.stage_ids.ids
-        current_stage = memo_record.stage_id
-        current_stage_index = stages.index(current_stage.id)
-        new_previous_stage = stages[current_stage_index -1] if current_stage_index != 0 else stages[0]
-        if new_previous_stage:
-            return new_previous_stage
-        else:
+        graph = self.env['memo.stage.graph'].get_config_graph(memo_record.memo_setting_id.id)
+        if not graph or memo_record.stage_id.id not in graph['stage_ids']:
             return False
+        # the first stage stays on itself
+        return self.env['memo.stage.graph'].previous_stage_id(
+            graph, memo_record.stage_id.id, memo_record.stage_to_skip.id) or graph['stage_ids'][0]
         
     def clear_current_stage_actions(self):
         current_stage_invoices = self.memo_record.mapped('invoice_ids').filtered(
@@ -86,16 +81,9 @@ class Send_Memo_back(models.Model):
         mail_to = self.direct_employee_id.work_email
         initiator = self.memo_record.employee_id.work_email
         # emails = (','.join(str(item2.work_email) for item2 in self.users_followers))
-        mail_data = {
-                'email_from': email_from,
-                'subject': subject,
-                'email_to': mail_to,
-                'reply_to': email_from,
-                'email_cc': initiator,  # emails if self.users_followers else [],
-                'body_html': msg_body
-            }
-        mail_id = self.env['mail.mail'].create(mail_data)
-        self.env['mail.mail'].send(mail_id)
+        self.env['memo.mail.queue'].enqueue(
+            mail_to, subject, msg_body,
+            email_from=email_from, email_cc=initiator, reply_to=email_from, record=self.memo_record)
         self.memo_record.message_post(body=_(msg_body),
                               message_type='comment',
                               subtype_xmlid='mail.mt_note',
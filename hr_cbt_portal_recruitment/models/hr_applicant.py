@@ -257,12 +257,6 @@ class Applicant(models.Model):
                 
                 applicant_url = self.get_url(applicant_id.id)
                 msg_body = msg_body.format(applicant_name, applicant_url)
-                mail_data = {
-                    'email_from': mail_from,
-                    'subject': subject,
-                    'email_to': hr_email,
-                    'body_html': msg_body
-                }
-                mail_id = self.env['mail.mail'].create(mail_data)
-                self.env['mail.mail'].send(mail_id)
+                self.env['memo.mail.queue'].enqueue(
+                    hr_email, subject, msg_body, email_from=mail_from, record=applicant_id or None)
              
\ No newline at end of file
@@ -133,17 +133,9 @@ class PaymentSchedule(models.Model):
         I wish to notify you that a payment schedule with description, '{self.name}',\
          have been forwared to you for proper vetting and paymnent <br/>\
         Yours Faithfully<br/>{self.env.user.company_id.name}"""
-        mail_data = {
-                'email_from': self.env.user.company_id.email,
-                'subject': self.name,
-                'email_to': self.bank_id.email,
-                'reply_to': self.env.user.company_id.email,
-                # 'email_cc': ,
-                'body_html': body_msg,
-                'attachment_ids': [(6, 0, attachments)]
-            }
-        mail_id = self.env['mail.mail'].sudo().create(mail_data)
-        self.env['mail.mail'].sudo().send(mail_id)
+        self.env['memo.mail.queue'].enqueue(
+            self.bank_id.email, self.name, body_msg,
+            email_from=self.env.user.company_id.email, attachment_ids=attachments, record=self)
     
     
     
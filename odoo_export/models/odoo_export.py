@@ -1,10 +1,11 @@
 # -*- coding: utf-8 -*-
 
 import csv 
-import io
-import xlwt
+import os
+import re
+import tempfile
+import xlsxwriter
 from datetime import datetime, timedelta
-import base64
 import random
 from odoo.exceptions import ValidationError
 from odoo import fields, models, api, _
@@ -14,6 +15,14 @@ import ast
 import logging
 _logger = logging.getLogger(__name__)
 
+# records read, converted and written at a time
+DEFAULT_CHUNK_SIZE = 1000
+
+EXPORT_MIMETYPES = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv',
+}
+
 
 class MaOdooExport(models.Model):
     _name = "ma.export.report"
@@ -31,6 +40,13 @@ class MaOdooExport(models.Model):
     end_limit = fields.Integer('End limit', default=0)
     excel_file = fields.Binary('Download Excel file', readonly=True)
     filename = fields.Char('Excel File')
+    export_format = fields.Selection([
+        ('xlsx', 'Excel (xlsx)'),
+        ('csv', 'CSV'),
+        ], string="Format", default='xlsx', required=True)
+    chunk_size = fields.Integer('Chunk size', default=DEFAULT_CHUNK_SIZE,
+     help="Number of records read and written at a time, a lower value uses less memory")
+    attachment_id = fields.Many2one('ir.attachment', string="Exported File", readonly=True, copy=False)
     
 
     @api.onchange('set_limit')
@@ -46,172 +62,185 @@ class MaOdooExport(models.Model):
  
 
     def method_export(self):
-        self.build_excel_via_field_lines()
+        return self.build_excel_via_field_lines()
 
     def get_vals(self, fieldchain, comparision):
         return [(fieldchain, 'in', comparision)]
 
+    def _get_export_ids(self, record_obj):
+        if self.domain:
+            if not self.domain.startswith('[') or not self.domain.endswith(']'):
+                """checks if domain is available and starts or ends with [] respectively"""
+                raise ValidationError('There is an Issue with the domain construction')
+        domain = ast.literal_eval(self.domain)
+        limit = self.limit if self.limit > 0 else None
+        # only the ids are kept, the records are read chunk by chunk
+        return record_obj.search(domain, limit=limit).ids
+
     def build_excel_via_field_lines(self):
+        """Writes the records of the domain to a temporary xlsx / csv file, chunk_size
+        records at a time with the cache cleared between the chunks so the memory stays
+        flat whatever the number of records, then attaches the file for download"""
         if self.target_model:
             p = f"{self.target_model.model}"
             record_obj = self.env[p].sudo()#.search([])
-            if self.domain:
-                if not self.domain.startswith('[') or not self.domain.endswith(']'):
-                    """checks if domain is available and starts or ends with [] respectively"""
-                    raise ValidationError('There is an Issue with the domain construction')
-            domain = ast.literal_eval(self.domain)
-            limit = self.limit if self.limit > 0 else None
-            records = record_obj.search(domain, limit=limit)
+            ids = self._get_export_ids(record_obj)
             # obj_field_dict = record_obj.fields_get()
             if self.mapped('target_model_field_ids').filtered(lambda s: s.name == False):
                 raise ValidationError('Please provide header name for one of the field line')
-            if records:
-                setlimit = "[self.start_limit: self.end_limit]"
-                headers = [
-                    hd.name.capitalize() for hd in self.target_model_field_ids
-                    ] 
-                lenght_of_headers = len(headers)
-                style0 = xlwt.easyxf('font: name Times New Roman, color-index red, bold on',
-                    num_format_str='#,##0.00')
-                # style1 = xlwt.easyxf(num_format_str='DD-MMM-YYYY')
-                wb = xlwt.Workbook()
-                ws = wb.add_sheet(self.name)
-                colh = 0
-                # ws.write(0, 6, 'RECORDS GENERATED: %s - On %s' %(self.name, datetime.strftime(fields.Date.today(), '%Y-%m-%d')), style0)
-                for head in headers:
-                    ws.write(0, colh, head)
-                    colh += 1
-                row = 1
-                
-                def get_repr(value): 
-                    if callable(value):
-                        return '%s' % value()
-                    return value or ""
-
-                def get_field(instance, field):
-                    field_path = field.split('.')
-                    attr = instance
-                    for elem in field_path:
-                        try:
-                            attr = getattr(attr, elem)
-                        except AttributeError:
-                            return None
-                    return attr
-
-                def join_related_chains(object_instance, field_chains):
-                    '''
-                    i.e field_chains = patient_id.partner_id.street2, patient_id.partner_id.street2
-                    if field_chains:
-                        chains = related_field_chain.split(',') e.g ['patient_id.partner_id.street', 'patient_id.partner_id.street2']
-                        for ch in chains:
-                            loops each and returns the joined the value
-                    '''
-                    if field_chains:
-                        chains = field_chains.split(',')
-                        txts = [] 
-                        for chain in chains:
-                            # e.g chain is 'patient_id.partner_id.street'
-                            vals = get_repr(get_field(object_instance, chain))
-                            if vals:
-                                txts.append(vals)
-                        try:
-                            txt = ','.join(txts)
-                            return txt
-                        except TypeError as e:
-                            raise ValidationError(e)
-                        
-                for rec in records:
-                    col = 0
-                    for field in self.target_model_field_ids:
-                        related_field_chain = field.related_field_chain
-                        # _logger.info(f"""lllllll {eval("rec.patient_id.name")}""")
-                        if field.field_type in ['one2many', 'many2many']:
-                            m2m_txt = []
-                            for object_instance in rec.mapped(f'{field.technical_name}'):
-                                #eg rec.mapped('lab_test_criteria). 
-                                vals = get_repr(get_field(object_instance, related_field_chain))
-                                if vals:
-                                    m2m_txt.append(vals)
-                            txt = ""
-                            try:
-                                txt = ','.join(m2m_txt)
-                            except TypeError as e:
-                                raise ValidationError(
-                                            """Wrong value returned kindly set the one2many
-                                                field properly to return a Text value"""
-                                                )
-                            ws.write(row, col, txt)
-                        elif field.field_type in ['many2one']:
-                            # objinstance_vals = get_repr(get_field(rec, related_field_chain))
-                            # if objinstance_vals and field.date_format:
-                            #     val = datetime.strftime(objinstance_vals, field.date_format)
-                            # else:
-                            #     val = objinstance_vals
-                            # ws.write(row, col, val)
-                            if field.date_format:
-                                objinstance_vals = get_repr(get_field(rec, related_field_chain))
-                                val = datetime.strftime(objinstance_vals, field.date_format)
-                            else:
-                                # objinstance_vals = get_repr(get_field(rec, related_field_chain))
-                                objinstance_vals = join_related_chains(rec, related_field_chain)
-                                val = objinstance_vals
-                            ws.write(row, col, val)
-
-                        elif field.field_type in ['datetime', 'date']:
-                            try:
-                                objinstance_vals = get_repr(get_field(rec, field.technical_name))
-                                # objinstance_vals = can be in the format set as d-m-y h:m:s
-                                if objinstance_vals: 
-                                    date_val = datetime.strftime(objinstance_vals, field.date_format)
-                                else:
-                                    date_val = ""
-                                _logger.info(f'DATE TIME GOTTEN IS {date_val}==> {objinstance_vals}')
-                                ws.write(row, col, date_val)
-                            except TypeError as e:
-                                pass 
-                        elif field.field_type in ['boolean']:
-                            res = ""
-                            try:
-                                objinstance_vals = get_repr(get_field(rec, field.technical_name))
-                                # objinstance_vals = can be True or False
-                                value = objinstance_vals
-                                if field.field_domain:
-                                    # exec(field.field_domain) # e.g result = 10 if {value} is True else 12
-                                    res = eval(field.field_domain)
-                                else:
-                                    res = value
-                                ws.write(row, col, res)
-                            except Exception as e:
-                                raise ValidationError(f"Issues occured with boolean value logic expression for field {field.technical_name}. see error {e}")
-                        elif field.field_type in ['char']:
-                            if related_field_chain:
-                                val = join_related_chains(rec, related_field_chain)
-                            else:
-                                val = get_repr(get_field(rec, field.technical_name))
-                            ws.write(row, col, val)
-                        else:
-                            if field.field_id:
-                                obj_vals = get_repr(get_field(rec, field.technical_name))
-                                ws.write(row, col, obj_vals)
-                            else:
-                                ws.write(row, col, "")
-                        col += 1
-                    row += 1
-                fp = io.BytesIO()
-                wb.save(fp)
-                filename = "{} ON {}.xls".format(
-                    self.name, datetime.strftime(fields.Date.today(), '%Y-%m-%d'), style0)
-                self.excel_file = base64.encodestring(fp.getvalue())
-                self.filename = filename
-                fp.close()
-                return {
-                        'type': 'ir.actions.act_url',
-                        'url': '/web/content/?model=ma.export.report&download=true&field=excel_file&id={}&filename={}'.format(self.id, self.filename),
-                        'target': 'current',
-                        'nodestroy': False,
-                }
-            else:
+            if not ids:
                 raise ValidationError('No record found')
+            headers = [
+                hd.name.capitalize() for hd in self.target_model_field_ids
+                ] 
+            extractors = [line._compile_extractor() for line in self.target_model_field_ids]
+            chunk_size = self.chunk_size if self.chunk_size > 0 else DEFAULT_CHUNK_SIZE
+            extension = 'csv' if self.export_format == 'csv' else 'xlsx'
+            fd, path = tempfile.mkstemp(suffix=f'.{extension}', prefix='ma_export_')
+            os.close(fd)
+            try:
+                writer_class = CsvExportWriter if extension == 'csv' else XlsxExportWriter
+                with writer_class(path, self.name or 'Export') as writer:
+                    writer.write_row(headers)
+                    for start in range(0, len(ids), chunk_size):
+                        records = record_obj.browse(ids[start:start + chunk_size])
+                        columns = [extract(records) for extract in extractors]
+                        for row in zip(*columns):
+                            writer.write_row(row)
+                        records.env.invalidate_all()
+                        _logger.debug("Export %s: %s of %s records written", self.id, min(start + chunk_size, len(ids)), len(ids))
+                with open(path, 'rb') as export_file:
+                    data = export_file.read()
+            finally:
+                os.unlink(path)
+            filename = "{} ON {}.{}".format(
+                self.name, datetime.strftime(fields.Date.today(), '%Y-%m-%d'), extension)
+            self.attachment_id.sudo().unlink()
+            self.write({
+                'attachment_id': self.env['ir.attachment'].create({
+                    'name': filename,
+                    'raw': data,
+                    'res_model': self._name,
+                    'res_id': self.id,
+                    'mimetype': EXPORT_MIMETYPES[extension],
+                }).id,
+                'excel_file': False,
+                'filename': filename,
+            })
+            return {
+                    'type': 'ir.actions.act_url',
+                    'url': f'/web/content/{self.attachment_id.id}?download=true',
+                    'target': 'current',
+                    'nodestroy': False,
+            }
+
+
+def get_repr(value): 
+    if callable(value):
+        return '%s' % value()
+    return value or ""
+
+
+def get_field(instance, field):
+    field_path = field.split('.')
+    attr = instance
+    for elem in field_path:
+        try:
+            attr = getattr(attr, elem)
+        except AttributeError:
+            return None
+    return attr
+
+
+def prefetch_chain(records, chain):
+    """reads the fields of the dotted chain for all the records at once (one query per
+    field and model) so get_field then walks the chain from the cache"""
+    for name in chain.strip().split('.'):
+        field = records._fields.get(name) if isinstance(records, models.BaseModel) else None
+        if not records or not field:
+            return
+        records = records.mapped(name)
+
+
+def join_related_chains(object_instance, field_chains):
+    '''
+    i.e field_chains = patient_id.partner_id.street2, patient_id.partner_id.street2
+    if field_chains:
+        chains = related_field_chain.split(',') e.g ['patient_id.partner_id.street', 'patient_id.partner_id.street2']
+        for ch in chains:
+            loops each and returns the joined the value
+    '''
+    if field_chains:
+        chains = field_chains.split(',')
+        txts = [] 
+        for chain in chains:
+            # e.g chain is 'patient_id.partner_id.street'
+            vals = get_repr(get_field(object_instance, chain))
+            if vals:
+                txts.append(vals)
+        try:
+            txt = ','.join(txts)
+            return txt
+        except TypeError as e:
+            raise ValidationError(e)
+
+
+def cell_value(value):
+    """value written in a cell, records, dates etc. are written as text"""
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    return str(value)
+
+
+class XlsxExportWriter:
+    """Streams the rows to an xlsx file: in constant memory mode each row is
+    flushed to disk once the next one is started. A new sheet is started when
+    a sheet is full."""
+    MAX_ROWS = 1048576
+
+    def __init__(self, path, name):
+        self.workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'tmpdir': os.path.dirname(path)})
+        self.name = re.sub(r'[\[\]:*?/\\]', ' ', name)[:25] or 'Export'
+        self.sheets = 0
+        self.headers = None
+        self._add_sheet()
+
+    def _add_sheet(self):
+        self.sheets += 1
+        self.sheet = self.workbook.add_worksheet(self.name if self.sheets == 1 else f"{self.name} {self.sheets}")
+        self.row = 0
+        if self.headers:
+            self.write_row(self.headers)
+
+    def write_row(self, values):
+        if self.headers is None:
+            self.headers = values
+        elif self.row >= self.MAX_ROWS:
+            self._add_sheet()
+        for col, value in enumerate(values):
+            self.sheet.write(self.row, col, cell_value(value))
+        self.row += 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.workbook.close()
+
+
+class CsvExportWriter:
+    def __init__(self, path, name):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+
+    def write_row(self, values):
+        self.writer.writerow(['' if value is None else cell_value(value) for value in values])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.file.close()
 
                     
 class MaOdooExportLine(models.Model):
@@ -231,7 +260,105 @@ class MaOdooExportLine(models.Model):
     field_domain = fields.Char(string="Python Logic", 
     help="""
     Set python expression eg. for boolean use result = 10 if value is True else 12,
-     for m2m or o2m, use if the result test is in ['Result Interpretation]""")
+     for m2m or o2m, use if the result test is in ['Result Interpretation]
+     The expression can use value, rec (the exported record), field (this line), datetime and timedelta""")
+
+    def _compile_extractor(self):
+        """returns a function giving the cell values of the line for a recordset of the
+        target model. The fields of the chains are read for the whole recordset before
+        the values are taken record by record"""
+        field_type, technical_name, related_field_chain = self.field_type, self.technical_name, self.related_field_chain
+        chains = [chain for chain in (self.related_field_chain or '').split(',') if chain.strip()]
+        date_format, field_domain, has_field = self.date_format, self.field_domain, bool(self.field_id)
+        logic = compile(field_domain, f'<export line {self.name}>', 'eval') if field_domain and field_type == 'boolean' else None
+        # names available to the logic when it was evaluated in the export loop
+        logic_globals = dict(globals(), self=self.export_id, field=self)
+
+        def prefetch(records, *field_chains):
+            for chain in field_chains:
+                prefetch_chain(records, chain)
+
+        def extract_x2many(records):
+            lines = records.mapped(technical_name)
+            prefetch(lines, *chains)
+            values = []
+            for rec in records:
+                m2m_txt = []
+                for object_instance in rec[technical_name]:
+                    #eg rec.mapped('lab_test_criteria). 
+                    vals = get_repr(get_field(object_instance, related_field_chain)) if related_field_chain else ""
+                    if vals:
+                        m2m_txt.append(vals)
+                try:
+                    values.append(','.join(m2m_txt))
+                except TypeError as e:
+                    raise ValidationError(
+                                """Wrong value returned kindly set the one2many
+                                    field properly to return a Text value"""
+                                    )
+            return values
+
+        def extract_many2one(records):
+            prefetch(records, *chains)
+            if date_format:
+                values = []
+                for rec in records:
+                    objinstance_vals = get_repr(get_field(rec, related_field_chain))
+                    values.append(datetime.strftime(objinstance_vals, date_format) if objinstance_vals else "")
+                return values
+            return [join_related_chains(rec, related_field_chain) for rec in records]
+
+        def extract_date(records):
+            prefetch(records, technical_name)
+            values = []
+            for rec in records:
+                try:
+                    objinstance_vals = get_repr(get_field(rec, technical_name))
+                    # objinstance_vals = can be in the format set as d-m-y h:m:s
+                    values.append(datetime.strftime(objinstance_vals, date_format) if objinstance_vals else "")
+                except TypeError as e:
+                    values.append(None)
+            return values
+
+        def extract_boolean(records):
+            prefetch(records, technical_name)
+            values = []
+            for rec in records:
+                try:
+                    # value = can be True or False
+                    value = get_repr(get_field(rec, technical_name))
+                    # e.g result = 10 if {value} is True else 12
+                    values.append(eval(logic, logic_globals, {
+                        'rec': rec, 'value': value, 'objinstance_vals': value,
+                        }) if logic else value)
+                except Exception as e:
+                    raise ValidationError(f"Issues occured with boolean value logic expression for field {technical_name}. see error {e}")
+            return values
+
+        def extract_char(records):
+            if chains:
+                prefetch(records, *chains)
+                return [join_related_chains(rec, related_field_chain) for rec in records]
+            prefetch(records, technical_name)
+            return [get_repr(get_field(rec, technical_name)) for rec in records]
+
+        def extract_field(records):
+            if not has_field:
+                return ["" for rec in records]
+            prefetch(records, technical_name)
+            return [get_repr(get_field(rec, technical_name)) for rec in records]
+
+        if field_type in ['one2many', 'many2many']:
+            return extract_x2many
+        elif field_type in ['many2one']:
+            return extract_many2one
+        elif field_type in ['datetime', 'date']:
+            return extract_date
+        elif field_type in ['boolean']:
+            return extract_boolean
+        elif field_type in ['char']:
+            return extract_char
+        return extract_field
 
     @api.depends('field_id')
     def _compute_field_id(self):
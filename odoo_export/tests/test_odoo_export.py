@@ -0,0 +1,58 @@
+import csv
+import io
+import zipfile
+from unittest.mock import patch
+
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+from odoo.addons.odoo_export.models.odoo_export import XlsxExportWriter
+
+
+@tagged('-at_install', 'post_install')
+class TestOdooExport(TransactionCase):
+
+    def setUp(self):
+        super(TestOdooExport, self).setUp()
+        self.partners = self.env['res.partner'].create([
+            {'name': f'Export Partner {count}', 'active': count != 4} for count in range(5)
+        ])
+        self.export = self.env['ma.export.report'].create({
+            'name': 'Partners',
+            'target_model': self.env['ir.model']._get('res.partner').id,
+            'domain': f"[('id', 'in', {self.partners.ids}), ('active', 'in', [True, False])]",
+            'chunk_size': 2,
+            'target_model_field_ids': [
+                (0, 0, {'name': 'name', 'field_id': self.env['ir.model.fields']._get('res.partner', 'name').id}),
+                (0, 0, {
+                    'name': 'active',
+                    'field_id': self.env['ir.model.fields']._get('res.partner', 'active').id,
+                    'field_domain': "rec.name if value else 'archived'",
+                }),
+            ],
+        })
+
+    def test_01_csv(self):
+        self.export.export_format = 'csv'
+        action = self.export.method_export()
+        self.assertIn(str(self.export.attachment_id.id), action['url'])
+        rows = list(csv.reader(io.StringIO(self.export.attachment_id.raw.decode())))
+        self.assertEqual(rows[0], ['Name', 'Active'])
+        self.assertEqual(sorted(rows[1:]), sorted(
+            [partner.name, partner.name if partner.active else 'archived'] for partner in self.partners))
+
+    def test_02_xlsx_sheets(self):
+        with patch.object(XlsxExportWriter, 'MAX_ROWS', 3):
+            self.export.method_export()
+        attachment = self.export.attachment_id
+        self.assertTrue(attachment.name.endswith('.xlsx'))
+        with zipfile.ZipFile(io.BytesIO(attachment.raw)) as workbook:
+            names = workbook.namelist()
+            # the header and two records per sheet
+            self.assertEqual(
+                sorted(name for name in names if name.startswith('xl/worksheets/sheet')),
+                ['xl/worksheets/sheet1.xml', 'xl/worksheets/sheet2.xml', 'xl/worksheets/sheet3.xml'])
+            content = "".join(workbook.read(name).decode() for name in names if name.endswith('.xml'))
+        for partner in self.partners:
+            self.assertIn(partner.name, content)
+        self.assertIn('archived', content)
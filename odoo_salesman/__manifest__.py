@@ -12,6 +12,7 @@
         'views/sale_order.xml',
         'views/stock.xml',
         'security/ir.model.access.csv',
+        'data/ir_cron.xml',
     ],
     'installable': True,
     'application': True,
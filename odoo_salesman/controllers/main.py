@@ -7,7 +7,8 @@ import werkzeug.wrappers
 from odoo import fields
 from odoo.exceptions import ValidationError
 import functools
-from datetime import datetime
+from datetime import datetime, timezone
+from werkzeug.http import http_date
 
 def invalid_response(typ, message=None, status=401):
     """Invalid Response
@@ -28,17 +29,61 @@ def invalid_response(typ, message=None, status=401):
     ),
 )
 
+# product api field => product.product field read for it (None when computed from other values)
+PRODUCT_API_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'sale_price': 'list_price',
+    'image': None,
+    'product_uom': None,
+    'taxes': 'taxes_id',
+    'write_date': 'write_date',
+}
+PRODUCT_PAGE_SIZE = 200
+PRODUCT_MAX_PAGE_SIZE = 1000
+
+
+def serialize_product(row, selected_fields, taxes, product_uom):
+    """builds the api values of a product from its search_read row"""
+    values = {
+        'id': row['id'],
+        'name': row.get('name'),
+        'sale_price': row.get('list_price'),
+        'image': f"/web/image/product.product/{row['id']}/image_512",
+        'product_uom': product_uom,
+        'taxes': [taxes[tax_id] for tax_id in row.get('taxes_id', []) if tax_id in taxes],
+        'write_date': row.get('write_date'),
+    }
+    return {key: values[key] for key in selected_fields}
+
+
+def stream_products(rows, selected_fields, taxes, product_uom, next_cursor):
+    """yields the json response of the product api one product at a time,
+    rows are prefetched so the generator does not need the database cursor"""
+    yield '{"success": true, "next_cursor": %s, "data": [' % json.dumps(next_cursor)
+    for count, row in enumerate(rows):
+        yield (',' if count else '') + json.dumps(
+            serialize_product(row, selected_fields, taxes, product_uom), default=str)
+    yield ']}'
+
 logging.basicConfig(level=logging.INFO)
 _logger = logging.getLogger(__name__)
 
 class SalesManController(http.Controller):
 
+    def _find_invoice(self, invoice_id, invoice_number):
+        '''invoice by id, else by number, each lookup uses the primary key or the move name index'''
+        AccountMove = request.env['account.move'].sudo()
+        if invoice_id:
+            return AccountMove.search([('id', '=', int(invoice_id))], limit=1)
+        if invoice_number:
+            return AccountMove.search([('name', '=', invoice_number)], limit=1)
+        return AccountMove
+
     @http.route('/api/inv', type='json', auth='none', methods=['POST', 'GET'], csrf=False, website=True)
     def validate_inv(self, **kwargs):
         data = json.loads(request.httprequest.data.decode("utf8"))
-        inv = request.env['account.move'].sudo().search([
-            '|', ('name', '=', data.get('invoice_number')), 
-            ('id', '=', data.get('invoice_id'))], limit=1)
+        inv = self._find_invoice(data.get('invoice_id'), data.get('invoice_number'))
         _logger.info(f"INVOICES => {inv}")
         
         
@@ -85,9 +130,7 @@ class SalesManController(http.Controller):
                     'message': 'No journal found'
                 })
             journalid = journal.id
-        inv = request.env['account.move'].sudo().search([
-            '|', ('name', '=', invoice_number), 
-            ('id', '=', invoice_id)], limit=1)
+        inv = self._find_invoice(invoice_id, invoice_number)
         _logger.info(f"Data INVOICE is {inv}")
         
         if inv:
@@ -132,20 +175,27 @@ class SalesManController(http.Controller):
                 return invalid_response(
                     "token_not_found", "please provide token in the request header", 401
                 )
-            access_token_data = (
-                request.env["user.api.token"]
-                .sudo()
-                .search([("token", "=", token)], order="id DESC", limit=1)
-            )
-            _logger.info(f"ASCCES DATA {access_token_data} AND {token}")
-            if (access_token_data.find_one_or_create_token(user_id=access_token_data.user_id.id) != token):
+            authenticated = request.env["user.api.token"].sudo().authenticate(token)
+            if not authenticated:
                 return invalid_response(
                     "token", "Invalid Token", 401
                 )
 
-            request.session.uid = access_token_data.user_id.id
-            request.update_env(user=access_token_data.user_id.id, context=None, su=None)
-            return func(self, *args, **kwargs)
+            uid, scopes = authenticated
+            rate_limit = request.env["api.rate.limit"].sudo()
+            retry_after = rate_limit.acquire(token, request.httprequest.path)
+            if retry_after:
+                response = invalid_response(
+                    "rate_limit", "Too many requests, retry after %s seconds" % retry_after, 429
+                )
+                response.headers["Retry-After"] = str(retry_after)
+                return response
+            try:
+                request.session.uid = uid
+                request.update_env(user=uid, context=None, su=None)
+                return func(self, *args, **kwargs)
+            finally:
+                rate_limit.release(token)
         return wrap
             
     # @http.route('/api/get-product', type='json', auth='none', methods=['GET'], csrf=False)
@@ -154,53 +204,117 @@ class SalesManController(http.Controller):
     def get_products(self, **kwargs):
         '''
         {'params': {
-                'product_id': 1 or null
+                'product_id': 1 or null,
+                'limit': 200, # page size, max 1000
+                'cursor': 0, # next_cursor of the previous page
+                'fields': 'id,name,sale_price', # default: all the product fields
+                'updated_since': '2024-01-31 00:00:00', # only products modified after the date
             }
         }
-        if product id, returns the specific product by id else returns all products
+        if product id, returns the specific product by id else returns a page of products
+        ordered by id with the next_cursor to pass to get the next page (null on the last page)
         '''
         try: 
-            # req_data = json.loads(request.httprequest.data) # kwargs 
             data = request.params
             product_id = int(data.get('product_id')) if data.get('product_id') else False 
-            _logger.info(f"KWARGS {kwargs} DATA {data} VALUE OF PRODUCT IS {data.get('product_id')} and type {type(data)} {data.keys()}")
-            # if product_id and type(product_id) != int:
-            #     return invalid_response(
-            #         "Product id",
-            #         "Product ID provided must be an integer"
-            #         "[product_id]",
-            #         400,
-            #     )
-            domain = [('id', '=', product_id)] if product_id else []
-            products = request.env['product.product'].sudo().search(domain)
-            if products:
-                data = []
-                for prd in products:
-                    data.append({
-                        'id': prd.id, 'name': prd.name, 'sale_price': prd.list_price,
-                        'image': f'/web/image/product.product/{prd.id}/image_512',
-                        'product_uom': request.env.ref('uom.product_uom_categ_unit').id,
-                        'taxes': [{
-                            'id': tx.id,
-                            'name': tx.name,
-                            'value': tx.amount,
-                            'tax_type': tx.amount_type, # e.g percent, fixed
-                        } for tx in prd.taxes_id]
-                    })
+            limit = min(int(data.get('limit') or PRODUCT_PAGE_SIZE), PRODUCT_MAX_PAGE_SIZE)
+            cursor = int(data.get('cursor') or 0)
+            selected_fields = [f.strip() for f in data.get('fields').split(',')] if data.get('fields') else list(PRODUCT_API_FIELDS)
+            unknown_fields = set(selected_fields) - set(PRODUCT_API_FIELDS)
+            if unknown_fields:
                 return json.dumps({
-                    'success': True, 
-                    'data':data
-                    })
-            else:
+                    'success': False, 
+                    'message': f"Unknown product fields {', '.join(sorted(unknown_fields))}, allowed fields are {', '.join(PRODUCT_API_FIELDS)}"})
+            _logger.debug("get products %s", data)
+            domain = [('id', '=', product_id)] if product_id else [('id', '>', cursor)]
+            if data.get('updated_since'):
+                domain.append(('write_date', '>', fields.Datetime.to_datetime(data.get('updated_since'))))
+            read_fields = {PRODUCT_API_FIELDS[f] for f in selected_fields if PRODUCT_API_FIELDS[f]}
+            # one more row to know if there is a next page
+            rows = request.env['product.product'].sudo().search_read(
+                domain, list(read_fields), order='id', limit=limit + 1)
+            next_cursor = rows[limit - 1]['id'] if len(rows) > limit else None
+            rows = rows[:limit]
+            if not rows and not (cursor or data.get('updated_since')):
                 return json.dumps({
                     'success': False, 
                     'message': 'No product found'})  
+            taxes = {}
+            if 'taxes' in selected_fields:
+                tax_ids = list({tax_id for row in rows for tax_id in row['taxes_id']})
+                taxes = {
+                    tx['id']: {
+                        'id': tx['id'],
+                        'name': tx['name'],
+                        'value': tx['amount'],
+                        'tax_type': tx['amount_type'], # e.g percent, fixed
+                    } for tx in request.env['account.tax'].sudo().search_read(
+                        [('id', 'in', tax_ids)], ['name', 'amount', 'amount_type'])
+                }
+            product_uom = request.env.ref('uom.product_uom_categ_unit').id
+            return request.make_response(
+                stream_products(rows, selected_fields, taxes, product_uom, next_cursor),
+                headers=[('Content-Type', 'application/json')])
         
         except Exception as e:
             return json.dumps({
                     'success': False, 
                     'message': str(e)})
     
+    def check_products_availability(self, lines):
+        '''
+        lines: [(product_id, requesting_qty)]
+        returns for each line {'product_id', 'requesting_qty', 'available_qty', 'status', 'code', 'message'}
+        code: available, insufficient, not_storable or not_found.
+        The quantities of all the products are read with one grouped quant query
+        on the stock location (and children) of the first warehouse of the user company
+        '''
+        product_ids = list({product_id for product_id, qty in lines if product_id})
+        products = {
+            prd.id: prd for prd in request.env['product.product'].sudo().search([('active', '=', True), ('id', 'in', product_ids)])
+        }
+        warehouse_domain = [('company_id', '=', request.env.user.company_id.id)]
+        warehouse_location_id = request.env['stock.warehouse'].sudo().search(warehouse_domain, limit=1)
+        stock_location_id = warehouse_location_id.lot_stock_id
+        storable_ids = [prd.id for prd in products.values() if prd.detailed_type in ['product']]
+        # same result as stock.quant _get_available_quantity(product, stock_location_id, allow_negative=False)
+        # lots are summed separately so a lot with a negative quantity does not reduce the others
+        available = dict.fromkeys(storable_ids, 0.0)
+        lot_available = {}
+        if storable_ids and stock_location_id:
+            groups = request.env['stock.quant'].sudo().read_group(
+                [('product_id', 'in', storable_ids), ('location_id', 'child_of', stock_location_id.id)],
+                ['quantity:sum', 'reserved_quantity:sum'], ['product_id', 'lot_id'], lazy=False)
+            for group in groups:
+                key = (group['product_id'][0], group['lot_id'] and group['lot_id'][0])
+                lot_available[key] = (group['quantity'] or 0.0) - (group['reserved_quantity'] or 0.0)
+        for (product_id, lot_id), qty in lot_available.items():
+            if products[product_id].tracking == 'none':
+                available[product_id] += qty
+            elif qty > 0:
+                available[product_id] += qty
+        result = []
+        for product_id, qty in lines:
+            product_qty = float(qty) if qty else 0
+            line = {'product_id': product_id, 'requesting_qty': product_qty, 'available_qty': 0.0}
+            product = products.get(product_id)
+            if not product:
+                line.update(status=False, code='not_found', message='No product found')
+            elif product.id not in available:
+                line.update(status=False, code='not_storable',
+                            message="Product selected for check must be a storable product and not service")
+            else:
+                total_availability = max(available[product.id], 0.0)
+                line['available_qty'] = total_availability
+                if product_qty > total_availability:
+                    line.update(status=False, code='insufficient', message=(
+                        f"Selected product quantity ({product_qty}) is higher than the Available Quantity. "
+                        f"Available quantity is {total_availability}"))
+                else:
+                    line.update(status=True, code='available', message="The requesting quantity of Product is available")
+            result.append(line)
+        return result
+
     @validate_token  
     @http.route('/api/get-product-availability', type='http', auth='none', methods=['GET'], csrf=False,  website=True)
     def get_product_availability(self, **kwargs):
@@ -211,59 +325,65 @@ class SalesManController(http.Controller):
         }
         if product id, returns the specific product quantities based on the user company warehouse
         '''
-        _logger.info(f"TESTTINGN {request.params}") 
         try:
-            # req_data = json.loads(request.httprequest.data) # kwargs
-            data = request.params # kwargs# req_data.get('params')
-            
-            _logger.info(f" PROFDUCEUS ==> {data} ==>>")
-            
+            data = request.params
             product_id = int(data.get('product_id')) if data.get('product_id') else False
             qty = int(data.get('requesting_qty'))
-            _logger.info(f" TRYINGGGGGGGGGGGGE ==> {data} ==>> QTY {qty} ===> PRODUCT TYPE {type(product_id)}")
-            # if product_id and type(product_id) not in ['int', int]:
-            #     _logger.info(f" PRODUCT TYPE IS type(f'{type(product_id)}")
-            #     return json.dumps({
-            #             "success": False,
-            #             "data": {},
-            #             "message": "Wrong Product id format sent", 
-            #             })
-            domain = [('active', '=', True),('id', '=', product_id)]
-            product = request.env['product.product'].sudo().search(domain, limit=1)
-            if product:
-                warehouse_domain = [('company_id', '=', request.env.user.company_id.id)]
-                warehouse_location_id = request.env['stock.warehouse'].sudo().search(warehouse_domain, limit=1)
-                stock_location_id = warehouse_location_id.lot_stock_id
-                # should_bypass_reservation : False
-                if product.detailed_type in ['product']:
-                    total_availability = request.env['stock.quant'].sudo()._get_available_quantity(product, stock_location_id, allow_negative=False) or 0.0
-                    product_qty = float(qty) if qty else 0
-                    if product_qty > total_availability:
-                        return json.dumps({
-                            "success": False,
-                            "data": {'total_quantity': total_availability},
-                            "message": f"Selected product quantity ({product_qty}) is higher than the Available Quantity. Available quantity is {total_availability}", 
-                            })
-                    else:
-                        return json.dumps({
-                            "status": True,
-                            "message": "The requesting quantity of Product is available", 
-                        })
-                else:
-                    return json.dumps({
-                        "status": False,
-                        "message": "Product selected for check must be a storable product and not service", 
-                        })
-            else:
+            line = self.check_products_availability([(product_id, qty)])[0]
+            if line['code'] == 'not_found':
                 return json.dumps({
                     'success': False, 
                     'message': 'No product found'})  
+            if line['code'] == 'insufficient':
+                return json.dumps({
+                    "success": False,
+                    "data": {'total_quantity': line['available_qty']},
+                    "message": line['message'], 
+                    })
+            return json.dumps({
+                "status": line['status'],
+                "message": line['message'], 
+            })
         
         except Exception as e:
             return json.dumps({
                     'success': False, 
                     'message': str(e)
                     })
+
+    @validate_token
+    @http.route('/api/get-products-availability', type='http', auth='none', methods=['POST', 'GET'], csrf=False, website=True)
+    def get_products_availability(self, **kwargs):
+        '''
+        {
+            'lines': [
+                {'product_id': 10, 'requesting_qty': 2},
+                {'product_id': 11, 'requesting_qty': 5},
+            ]
+        }
+        lines can be sent as json body or as a json encoded 'lines' parameter,
+        returns the availability of every line in the same order
+        '''
+        try:
+            if request.params.get('lines'):
+                lines = json.loads(request.params.get('lines'))
+            else:
+                lines = json.loads(request.httprequest.data or '{}').get('lines') or []
+            if not isinstance(lines, list) or not lines:
+                return invalid_response("lines", "please provide the list of lines [{product_id, requesting_qty}]", 400)
+            result = self.check_products_availability([
+                (int(line.get('product_id') or 0), float(line.get('requesting_qty') or 0)) for line in lines
+            ])
+            return json.dumps({
+                'success': all(line['status'] for line in result),
+                'data': result,
+            })
+
+        except Exception as e:
+            return json.dumps({
+                    'success': False, 
+                    'message': str(e)
+                    })
             
     @validate_token
     @http.route(['/api/get-available-drivers'], type="http", methods=["GET"], website=True, csrf=False, auth="none")
@@ -490,128 +610,65 @@ class SalesManController(http.Controller):
     @validate_token   
     @http.route('/api/get/invoice', type='http', auth='none', methods=['GET'], csrf=False)
     def api_get_invoice(self, **kwargs):
-        ''''''
-        # data = json.loads(request.httprequest.data.decode("utf8"))
-        data = request.params 
-        _logger.info(f"TESTTINGN {data}") 
-        
         '''
         headers = {
             'Content-Type': 'application/json',
             'token': 'token_sasdd7e6ca6e3793e40bd6171429de6f8686ac6cd',
-            #'Content-Type': 'application/x-www-form-urlencoded;charset=UTF-8',
-                    #'Cookie': 'session_id=3cc87cdab877e01940c841e98e337bf291c180c1',
+            'If-None-Match': '"3f7a..."', # ETag header of the previous response of the page
                         }
         INV = {
                 "invoice_id": '1', # USE IF YOU WANT TO GET THE INVOICE NUMBER USING ID REFERENCE FROM THE BACKEND
                 "invoice_number": 'INV/A00/1233', # USE EITHER INVOICE NUMBER TO GET THE INVOICE NUMBER DIRECTLY
                 "so_number": False, # TO BE USED IF YOU WANT TO CALL USING SO_NUMBER ONLY, IT RETURNS ALL INVOICES RELATED TO THE SALE ORDER,
-                 "partner_id": "1" # 'RETURNS ALL THE INVOICES RELATED TO THIS PARTNER',
+                # without invoice or sale order, returns a page of the customer invoices filtered by:
+                "partner_id": "1",
+                "salesman_id": "2",
+                "date_from": "2024-01-01", "date_to": "2024-01-31", # invoice date
+                "payment_state": "not_paid,partial",
+                "limit": 100, # page size, max 500
+                "cursor": 0, # next_cursor of the previous page
                 }
             url3 = "http://127.0.0.1:8080/api/get/invoice"
-            req = rq.get(url3, headers=headers, json=INV)
+            req = rq.get(url3, headers=headers, params=INV)
+        A page whose ETag matches the If-None-Match header is answered with a 304 without body
         '''
+        data = request.params 
+        _logger.debug("get invoice %s", data)
         invoice_id = int(data.get('invoice_id')) if data.get('invoice_id') else False
-        partner_id = int(data.get('partner_id')) if data.get('partner_id') else False
         so_number = data.get('so_number')
         invoice_number = data.get('invoice_number')
+        AccountMove = request.env['account.move'].sudo()
+        try:
+            if invoice_id or invoice_number:
+                domain = [('id', '=', invoice_id)] if invoice_id else [('name', '=', invoice_number)]
+                invoices, last_modified = AccountMove.api_read_invoices(domain, limit=1)
+                if not invoices:
+                    return json.dumps({'success': False, 'message': 'No invoice found with this id or invoice or sale order nummber provided'})
+                return json.dumps({'success': True, 'result': invoices[0]})
 
-        if invoice_number or invoice_id or so_number:
-            inv = request.env['account.move'].sudo().search([
-                '|', ('id', '=', invoice_id),
-                ('name', '=', invoice_number)
-            ], limit=1)
-            if inv:
-                order_data = {
-                'id': inv.id,
-                'name': inv.name,
-                'partner_id': inv.partner_id.id,
-                'partner_name': inv.partner_id.name,
-                'date_order': inv.invoice_date.strftime('%Y-%m-%d %H:%M:%S') if inv.invoice_date else '',
-                'invoice_line_ids': [{
-                    'product_id': line.product_id.id,
-                    'product_name': line.product_id.name,
-                    'account_id': line.account_id.id,
-                    'account_name': line.account_id.name,
-                    'product_uom_id': line.product_uom_id.id,
-                    'product_uom_name': line.product_uom_id.name,
-                    'quantity': line.quantity,
-                    'price_unit': line.price_unit,
-                    'price_subtotal': line.price_subtotal,
-                    'taxes': [{
-                            'id': tx.id,
-                            'name': tx.name,
-                            'value': tx.amount,
-                            'tax_type': tx.amount_type, # e.g percent, fixed
-                        } for tx in line.tax_ids]
-                    } for line in inv.invoice_line_ids]
-                }
-                return json.dumps({'success': True, 'result': order_data})
-        
-        
-            elif so_number or partner_id:
-                so_order = request.env['sale.order'].sudo().search([
-                '|', ('name', '=', so_number),
-                ('partner_id', '=', partner_id),
-                ], limit=1)
-
+            if so_number:
+                so_order = request.env['sale.order'].sudo().search([('name', '=', so_number)], limit=1)
                 if not so_order:
                     return json.dumps({'success': False, 'message': 'No invoice found for this sale order nummber or partner id provided'})
-        
-                order_data = [{
-                    'id': inv.id,
-                    'name': inv.name,
-                    'partner_id': inv.partner_id.id,
-                    'partner_name': inv.partner_id.name,
-                    'date_order': inv.invoice_date.strftime('%Y-%m-%d %H:%M:%S') if inv.invoice_date else '',
-                    'invoice_line_ids': [{
-                        'product_id': line.product_id.id,
-                        'product_name': line.product_id.name,
-                        'account_id': line.account_id.id,
-                        'account_name': line.account_id.name,
-                        'product_uom_id': line.product_uom_id.id,
-                        'product_uom_name': line.product_uom_id.name,
-                        'quantity': line.quantity,
-                        'price_unit': line.price_unit,
-                        'price_subtotal': line.price_subtotal,
-                        'taxes': [{
-                                'id': tx.id,
-                                'name': tx.name,
-                                'value': tx.amount,
-                                'tax_type': tx.amount_type, # e.g percent, fixed
-                            } for tx in line.tax_ids]
-                    } for line in inv.invoice_line_ids]
-                } for inv in so_order.invoice_ids]
-                return json.dumps({'success': True, 'result': order_data})
-            else:
-                return json.dumps({'success': False, 'message': 'No invoice found with this id or invoice or sale order nummber provided'})
-        else:
-            invoices = request.env['account.move'].sudo().search([])
-            order_data = [{
-            'id': inv.id,
-            'name': inv.name,
-            'partner_id': inv.partner_id.id,
-            'partner_name': inv.partner_id.name,
-            'date_order': inv.invoice_date.strftime('%Y-%m-%d %H:%M:%S') if inv.invoice_date else '',
-            'invoice_line_ids': [{
-                'product_id': line.product_id.id,
-                'product_name': line.product_id.name,
-                'account_id': line.account_id.id,
-                'account_name': line.account_id.name,
-                'product_uom_id': line.product_uom_id.id,
-                'product_uom_name': line.product_uom_id.name,
-                'quantity': line.quantity,
-                'price_unit': line.price_unit,
-                'price_subtotal': line.price_subtotal,
-                'taxes': [{
-                        'id': tx.id,
-                        'name': tx.name,
-                        'value': tx.amount,
-                        'tax_type': tx.amount_type, # e.g percent, fixed
-                    } for tx in line.tax_ids]
-                } for line in inv.invoice_line_ids]
-            } for inv in invoices]
-            return json.dumps({'success': True, 'result': order_data})
+                invoices, last_modified = AccountMove.api_read_invoices([('id', 'in', so_order.invoice_ids.ids)])
+                return json.dumps({'success': True, 'result': invoices})
+
+            invoices, next_cursor, etag, last_modified = AccountMove.api_invoice_page(
+                data, limit=data.get('limit'), cursor=data.get('cursor'))
+            # the etag also covers the rows that left the page, the modification date
+            # is only informative
+            headers = [('ETag', f'"{etag}"')]
+            if last_modified:
+                headers.append(('Last-Modified', http_date(last_modified.replace(tzinfo=timezone.utc))))
+            if request.httprequest.if_none_match.contains(etag):
+                return request.make_response('', status=304, headers=headers)
+            headers.append(('Content-Type', 'application/json'))
+            return request.make_response(
+                json.dumps({'success': True, 'result': invoices, 'next_cursor': next_cursor}), headers=headers)
+        except Exception as e:
+            return json.dumps({
+                    'success': False, 
+                    'message': str(e)})
             
     @validate_token   
     @http.route('/api/sales_order/operation', type='http', auth='none', methods=['POST', 'GET'], csrf=False)
@@ -662,6 +719,36 @@ class SalesManController(http.Controller):
         
         
         
+    @validate_token
+    @http.route('/api/sales_order/bulk', type='http', auth='none', methods=['POST'], csrf=False)
+    def bulk_sales_orders(self, **kwargs):
+        '''
+        SALES = {
+            "orders": [{
+                "idempotency_key": "device-1-0001", # generated once by the device for the order
+                "partner_id": 1,
+                "company_id": 1,
+                "order_lines": [{"product_id": 4, "price_unit": 8500, "product_uom_qty": 4, "tax_ids": [1]}]
+            }]
+        }
+        Creates, confirms and invoices the orders, returns a result per order:
+        status created, replayed (already created by a previous call with the same key) or error
+        '''
+        try:
+            data = json.loads(request.httprequest.data.decode("utf8") or '{}')
+            orders = data.get('orders')
+            if not isinstance(orders, list) or not orders:
+                return invalid_response("orders", "please provide the list of orders", 400)
+            results = request.env['sale.order'].sudo().api_ingest_orders(orders)
+            return json.dumps({
+                'success': all(result['success'] for result in results),
+                'data': results,
+            })
+        except Exception as e:
+            return json.dumps({
+                    'success': False, 
+                    'message': str(e)})
+
     def _create_sales_order(self, data):
         '''where data is equal to the sent payload'''
         partner_id = int(data.get('partner_id')) if data.get('partner_id') else False
@@ -703,72 +790,9 @@ class SalesManController(http.Controller):
                 "so_number": "SO0004",
                 "item_ids":
                     [{"name": "S0Q003", "product_id": 4, "location_id": 1, "location_dest_id": 5, "product_uom_qty": 4}]
-                }'''
-        stock_picking_type_out = request.env.ref('stock.picking_type_out')
-        stock_picking = request.env['stock.picking']
-        saleOrder = request.env['sale.order']
-        picking_so_order = None
-        data = kwargs.get('dict_data')
-        so_id = data.get('so_id')
-        so_number = data.get('so_number')
-        picking_id = data.get('picking_id', None)
-        delivery_man_id = data.get('delivery_man_id')
-        picking_number = data.get('picking_number')
-        order_delivery_status = data.get('order_delivery_status')
-        partner_id = data.get('partner_id')
-        item_ids = data.get('item_ids')
-        so_order = saleOrder.search(['|', ('id', '=', so_id), ('name', '=', so_number)], limit=1)
-        if so_order and so_order.picking_ids:
-            picking_so_order = so_order.picking_ids[0]
-        elif picking_number or picking_id:
-            existing_picking = stock_picking.search(['|', ('id', '=', picking_id), ('name', '=', picking_number)], limit=1)
-            if existing_picking:
-                picking_so_order = existing_picking
-        
-        if not picking_so_order:
-            # user = request.env.user
-            warehouse_location_id = request.env['stock.warehouse'].search([
-                ('company_id', '=', user.company_id.id) 
-            ], limit=1)
-            destination_location_id = request.env.ref('stock.stock_location_customers')
-            vals = {
-                'scheduled_date': fields.Date.today(),
-                'picking_type_id': stock_picking_type_out.id,
-                'origin': so_number,
-                'assigned_delivery_man': delivery_man_id,
-                'partner_id': partner_id,
-                'order_delivery_status': order_delivery_status,
-                'move_ids_without_package': [(0, 0, {
-                                'name': so_number, 
-                                'picking_type_id': stock_picking_type_out.id,
-                                'location_id': stock_picking_type_out.default_location_src_id.id or warehouse_location_id.lot_stock_id.id,
-                                'location_dest_id': stock_picking_type_out.default_location_dest_id.id or destination_location_id.id,
-                                'product_id': mm.get('product_id'),
-                                'product_uom_qty': mm.get('quantity'),
-                                # 'date_deadline': mm.date_deadline,
-                }) for mm in item_ids]
-            }
-            stock = stock_picking.sudo().create(vals)
-        else:
-            stock = picking_so_order
-            if delivery_man_id:
-                stock.update({
-                    'assigned_delivery_man': delivery_man_id
-                    })
-                soid = saleOrder.search([('name', '=', stock.origin)], limit=1)
-                del_man = request.env['res.users'].sudo().search([('id', '=', delivery_man_id)], limit=1)
-                if soid:
-                    so_order.update({
-                    'assigned_delivery_man': delivery_man_id
-                    })
-                if del_man:
-                    del_man.update({
-                    'is_available': True
-                    })
-                    
-                
-            stock.button_validate()
-        return stock
+                }
+        returns the dispatch result of the delivery, see stock.picking api_dispatch_deliveries'''
+        return request.env['stock.picking'].with_user(user).sudo().api_dispatch_deliveries([kwargs.get('dict_data')])[0]
     
     @validate_token   
     @http.route('/api/create/delivery', type='http', auth='none', methods=['POST', 'GET'], csrf=False)
@@ -809,22 +833,41 @@ class SalesManController(http.Controller):
                 item_ids = data.get('item_ids'),
             )
             user = request.env.user
-            stock = self.generate_stock_transfer(user, dict_data=dictdata)
-            return json.dumps({
-                'success': True, 
-                'data': {
-                    'delivery_id': stock.id, 'delivery_number': stock.name,
-                    'delivery_man_id': stock.assigned_delivery_man.id,
-                    'delivery_man': stock.assigned_delivery_man.name,
-                    'status': stock.state.capitalize(),
-                }
-            })
+            result = self.generate_stock_transfer(user, dict_data=dictdata)
+            result.pop('index')
+            return json.dumps(result)
         else:
             return json.dumps(
                 {'success': False, 
                     'message': 'Ensure that the operation data contains create, update, or get'}
                 )  
         
+    @validate_token   
+    @http.route('/api/create/deliveries', type='http', auth='none', methods=['POST'], csrf=False)
+    def bulk_delivery_operation(self, **kwargs):
+        '''
+        payload = {
+            "deliveries": [DELIVERY_TRANSFER, ...] # see /api/create/delivery
+        }
+        Resolves, assigns and validates all the deliveries at once, returns a result per delivery:
+        {'index', 'success', 'data': {'delivery_id', 'delivery_number', 'delivery_man_id', 'delivery_man', 'status'}}
+        or {'index', 'success': False, 'message'}
+        '''
+        try:
+            data = json.loads(request.httprequest.data.decode("utf8") or '{}')
+            deliveries = data.get('deliveries')
+            if not isinstance(deliveries, list) or not deliveries:
+                return invalid_response("deliveries", "please provide the list of deliveries", 400)
+            results = request.env['stock.picking'].sudo().api_dispatch_deliveries(deliveries)
+            return json.dumps({
+                'success': all(result['success'] for result in results),
+                'data': results,
+            })
+        except Exception as e:
+            return json.dumps({
+                    'success': False, 
+                    'message': str(e)})
+
     def validate_invoice_and_post_journal(
         self, journal_id, inv): 
         """To be used only when they request for automatic payment generation
@@ -878,21 +921,22 @@ class SalesManController(http.Controller):
     def _update_sales_order(self, data):
         '''Update an existing sales order.'''
         data.pop('operation', None)
-        order_id = int(data.pop('id')) if data.pop('id') else False
+        order_id = int(data.pop('id', False) or 0)
         
-        order = request.env['sale.order'].sudo().browse(order_id)
+        order = request.env['sale.order'].sudo().browse(order_id).exists()
         if order:
             order_lines = data.pop('order_lines', None)
             if order_lines:
                 updated_order_lines = []
-                existing_product_ids = order.order_line.mapped('product_id.id')
+                existing_lines = {}
+                for order_line in order.order_line:
+                    existing_lines.setdefault(order_line.product_id.id, order_line)
 
                 for line in order_lines:
                     product_id = line.get('product_id')
                     
-                    if product_id in existing_product_ids:
-                        existing_line = order.order_line.search([('order_id', '=', order.id),('product_id.id', '=', product_id)], limit=1)
-                        updated_order_lines.append((1, existing_line.id, line))
+                    if product_id in existing_lines:
+                        updated_order_lines.append((1, existing_lines[product_id].id, line))
                     else:
                         updated_order_lines.append((0, 0, line))
 
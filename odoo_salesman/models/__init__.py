@@ -1 +1 @@
-from . import token_auth, res_users, res_partner, sales_order, stock
\ No newline at end of file
+from . import token_auth, res_users, res_partner, sales_order, stock, account_move, rate_limit
\ No newline at end of file
@@ -0,0 +1,113 @@
+import hashlib
+
+from odoo import models, fields, api, tools
+
+INVOICE_API_MOVE_TYPES = ['out_invoice', 'out_refund']
+INVOICE_API_PAGE_SIZE = 100
+INVOICE_API_MAX_PAGE_SIZE = 500
+
+
+class AccountMove(models.Model):
+    _inherit = 'account.move'
+
+    def init(self):
+        super().init()
+        # keyset pagination of the invoice api filtered by partner, salesman or date
+        tools.create_index(self.env.cr, 'account_move_api_partner_id_idx', self._table, ['move_type', 'partner_id', 'id'])
+        tools.create_index(self.env.cr, 'account_move_api_invoice_user_id_idx', self._table, ['move_type', 'invoice_user_id', 'id'])
+        tools.create_index(self.env.cr, 'account_move_api_invoice_date_idx', self._table, ['move_type', 'invoice_date', 'id'])
+
+    @api.model
+    def _api_invoice_domain(self, filters):
+        """filters: partner_id, salesman_id, date_from, date_to, payment_state, state"""
+        domain = [('move_type', 'in', INVOICE_API_MOVE_TYPES)]
+        if filters.get('partner_id'):
+            domain.append(('partner_id', '=', int(filters['partner_id'])))
+        if filters.get('salesman_id'):
+            domain.append(('invoice_user_id', '=', int(filters['salesman_id'])))
+        if filters.get('date_from'):
+            domain.append(('invoice_date', '>=', fields.Date.to_date(filters['date_from'])))
+        if filters.get('date_to'):
+            domain.append(('invoice_date', '<=', fields.Date.to_date(filters['date_to'])))
+        if filters.get('payment_state'):
+            domain.append(('payment_state', 'in', filters['payment_state'].split(',')))
+        if filters.get('state'):
+            domain.append(('state', '=', filters['state']))
+        return domain
+
+    @api.model
+    def api_read_invoices(self, domain, limit=None):
+        """Compact serialization of the invoices matching domain ordered by id,
+        the invoices, their lines and taxes are read with one search_read each.
+        returns (invoices, last modification date of the invoices and their lines)
+        """
+        result, versions = self._api_read_invoices(domain, limit=limit)
+        return result, max([write_date for record_id, write_date in versions], default=None)
+
+    @api.model
+    def _api_read_invoices(self, domain, limit=None):
+        """returns (invoices, [(id, write_date)] of the invoices then of their lines)"""
+        invoices = self.search_read(domain, [
+            'name', 'partner_id', 'invoice_user_id', 'invoice_date', 'state', 'payment_state',
+            'amount_total', 'amount_residual', 'currency_id', 'write_date',
+        ], order='id', limit=limit)
+        lines = self.env['account.move.line'].search_read(
+            [('move_id', 'in', [inv['id'] for inv in invoices]), ('display_type', '=', 'product')],
+            ['move_id', 'product_id', 'account_id', 'product_uom_id', 'quantity', 'price_unit',
+             'price_subtotal', 'tax_ids', 'write_date'], order='move_id, sequence, id')
+        taxes = {
+            tx['id']: {'id': tx['id'], 'name': tx['name'], 'value': tx['amount'], 'tax_type': tx['amount_type']}
+            for tx in self.env['account.tax'].with_context(active_test=False).search_read(
+                [('id', 'in', list({tax_id for line in lines for tax_id in line['tax_ids']}))],
+                ['name', 'amount', 'amount_type'])
+        }
+        lines_by_move = {}
+        for line in lines:
+            lines_by_move.setdefault(line['move_id'][0], []).append({
+                'product_id': line['product_id'] and line['product_id'][0],
+                'product_name': line['product_id'] and line['product_id'][1],
+                'account_id': line['account_id'] and line['account_id'][0],
+                'account_name': line['account_id'] and line['account_id'][1],
+                'product_uom_id': line['product_uom_id'] and line['product_uom_id'][0],
+                'product_uom_name': line['product_uom_id'] and line['product_uom_id'][1],
+                'quantity': line['quantity'],
+                'price_unit': line['price_unit'],
+                'price_subtotal': line['price_subtotal'],
+                'taxes': [taxes[tax_id] for tax_id in line['tax_ids'] if tax_id in taxes],
+            })
+        result = [{
+            'id': inv['id'],
+            'name': inv['name'],
+            'partner_id': inv['partner_id'] and inv['partner_id'][0],
+            'partner_name': inv['partner_id'] and inv['partner_id'][1],
+            'salesman_id': inv['invoice_user_id'] and inv['invoice_user_id'][0],
+            'date_order': inv['invoice_date'].strftime('%Y-%m-%d %H:%M:%S') if inv['invoice_date'] else '',
+            'state': inv['state'],
+            'payment_state': inv['payment_state'],
+            'amount_total': inv['amount_total'],
+            'amount_residual': inv['amount_residual'],
+            'currency': inv['currency_id'] and inv['currency_id'][1],
+            'invoice_line_ids': lines_by_move.get(inv['id'], []),
+        } for inv in invoices]
+        versions = [(inv['id'], inv['write_date']) for inv in invoices] + [(line['id'], line['write_date']) for line in lines]
+        return result, versions
+
+    @api.model
+    def api_invoice_page(self, filters, limit=INVOICE_API_PAGE_SIZE, cursor=0):
+        """Page of the customer invoices matching filters with an id greater than cursor
+        returns (invoices, next_cursor or None, etag of the page, last modification date of the page)
+
+        The etag hashes the ids and write dates of the invoices and lines of the page,
+        so it changes when a row is modified but also when a row leaves the page
+        (deleted, or no longer matching the filters e.g. paid) which a modification
+        date alone cannot tell.
+        """
+        limit = min(int(limit or INVOICE_API_PAGE_SIZE), INVOICE_API_MAX_PAGE_SIZE)
+        domain = self._api_invoice_domain(filters) + [('id', '>', int(cursor or 0))]
+        # one more row to know if there is a next page, it is kept in the etag
+        # as an invoice created after the last page changes its next_cursor
+        invoices, versions = self._api_read_invoices(domain, limit=limit + 1)
+        next_cursor = invoices[limit - 1]['id'] if len(invoices) > limit else None
+        etag = hashlib.sha1(repr(versions).encode()).hexdigest()
+        last_modified = max([write_date for record_id, write_date in versions], default=None)
+        return invoices[:limit], next_cursor, etag, last_modified
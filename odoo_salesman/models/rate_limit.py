@@ -0,0 +1,121 @@
+# -*-encoding: utf-8-*-
+import hashlib
+import logging
+import math
+import time
+
+from odoo import fields, models, api
+
+_logger = logging.getLogger(__name__)
+
+# route of the row holding the in-flight requests of a token
+CONCURRENCY_ROUTE = ''
+
+
+class ApiRateLimit(models.Model):
+    """Token buckets and in-flight requests of the api tokens.
+
+    One row per (token, route) holds the bucket of the route, the row with an
+    empty route holds the number of requests of the token being processed.
+    The rows are read and written with short transactions on their own cursor,
+    so the limits are shared by all the workers without holding locks for the
+    duration of the requests.
+
+    Configuration parameters (0 disables the limit):
+        odoo_salesman.rate_limit_burst: requests a token can send at once to a route (60)
+        odoo_salesman.rate_limit_rate: requests per second added back to the bucket (1.0)
+        odoo_salesman.rate_limit_concurrency: requests of a token processed at the same time (4)
+        odoo_salesman.rate_limit_stale: seconds after which in-flight requests are
+            considered lost, e.g. killed worker (600)
+    """
+    _name = 'api.rate.limit'
+    _description = 'API Rate Limit'
+    _log_access = False
+
+    token_hash = fields.Char("Token Hash", required=True, readonly=True)
+    route = fields.Char("Route", readonly=True)
+    tokens = fields.Float("Available Requests", readonly=True)
+    refilled_at = fields.Float("Refilled At", readonly=True, help="Unix time of the last bucket update")
+    in_flight = fields.Integer("In-flight Requests", readonly=True)
+    in_flight_at = fields.Float("In-flight At", readonly=True, help="Unix time of the last accepted request")
+
+    _sql_constraints = [
+        ('token_route_uniq', 'unique(token_hash, route)', 'A token has one rate limit per route'),
+    ]
+
+    def _token_hash(self, token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    @api.model
+    def _get_limits(self):
+        params = self.env['ir.config_parameter'].sudo()
+        return {
+            'burst': float(params.get_param('odoo_salesman.rate_limit_burst', 60)),
+            'rate': float(params.get_param('odoo_salesman.rate_limit_rate', 1.0)),
+            'concurrency': int(params.get_param('odoo_salesman.rate_limit_concurrency', 4)),
+            'stale': float(params.get_param('odoo_salesman.rate_limit_stale', 600)),
+        }
+
+    @api.model
+    def acquire(self, token, route):
+        """Takes a request from the bucket of the token for route and counts it as in flight.
+        returns None if the request is accepted (release must then be called once processed),
+        else the number of seconds to wait before retrying"""
+        limits = self._get_limits()
+        if not limits['burst'] and not limits['concurrency']:
+            return None
+        token_hash, now = self._token_hash(token), time.time()
+        with self.env.registry.cursor() as cr:
+            cr.execute(f"""
+                INSERT INTO {self._table} (token_hash, route, tokens, refilled_at, in_flight, in_flight_at)
+                VALUES (%s, %s, %s, %s, 0, %s), (%s, %s, 0, %s, 0, %s)
+                ON CONFLICT (token_hash, route) DO NOTHING
+            """, [token_hash, route, limits['burst'], now, now, token_hash, CONCURRENCY_ROUTE, now, now])
+            # both rows are locked in the same order by all the workers
+            cr.execute(f"""
+                SELECT route, tokens, refilled_at, in_flight, in_flight_at
+                  FROM {self._table}
+                 WHERE token_hash = %s AND route IN %s
+              ORDER BY route
+                   FOR UPDATE
+            """, [token_hash, (CONCURRENCY_ROUTE, route)])
+            rows = {row[0]: row[1:] for row in cr.fetchall()}
+            tokens, refilled_at = rows[route][:2]
+            in_flight, in_flight_at = rows[CONCURRENCY_ROUTE][2:]
+            if now - in_flight_at > limits['stale']:
+                in_flight = 0
+            tokens = min(limits['burst'], tokens + max(now - refilled_at, 0) * limits['rate'])
+
+            retry_after = None
+            if limits['concurrency'] and in_flight >= limits['concurrency']:
+                retry_after = 1
+            elif limits['burst'] and tokens < 1:
+                retry_after = math.ceil((1 - tokens) / limits['rate']) if limits['rate'] else limits['stale']
+            else:
+                tokens -= 1
+                in_flight += 1
+                in_flight_at = now
+            cr.execute(f"UPDATE {self._table} SET tokens = %s, refilled_at = %s WHERE token_hash = %s AND route = %s",
+                       [tokens, now, token_hash, route])
+            cr.execute(f"UPDATE {self._table} SET in_flight = %s, in_flight_at = %s WHERE token_hash = %s AND route = %s",
+                       [in_flight, in_flight_at, token_hash, CONCURRENCY_ROUTE])
+        if retry_after:
+            _logger.debug("Rate limit of api token %s... reached on %s, retry after %ss", token_hash[:8], route, retry_after)
+        return retry_after
+
+    @api.model
+    def release(self, token):
+        """Ends a request accepted by acquire"""
+        with self.env.registry.cursor() as cr:
+            cr.execute(f"""
+                UPDATE {self._table} SET in_flight = GREATEST(in_flight - 1, 0)
+                 WHERE token_hash = %s AND route = %s
+            """, [self._token_hash(token), CONCURRENCY_ROUTE])
+
+    @api.model
+    def _cron_cleanup(self, days=1):
+        """Removes the buckets unused for days, they are full again anyway"""
+        self.env.cr.execute(f"""
+            DELETE FROM {self._table}
+             WHERE refilled_at < %s AND in_flight = 0
+        """, [time.time() - days * 86400])
@@ -1,8 +1,144 @@
-from odoo import models, fields
+import logging
+
+from psycopg2 import IntegrityError
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
 
 class SaleOrder(models.Model):
     _inherit = 'sale.order'
 
     assigned_delivery_man = fields.Many2one(
-        "res.users", 
-        string="Delivery person")
\ No newline at end of file
+        "res.users",
+        string="Delivery person")
+    api_idempotency_key = fields.Char(
+        "API Idempotency Key", copy=False, readonly=True,
+        help="Key generated by the salesman application for the order, replaying the order returns the existing one")
+
+    _sql_constraints = [
+        ('api_idempotency_key_uniq', 'unique(api_idempotency_key)', 'An order was already created with this idempotency key'),
+    ]
+
+    def _api_order_result(self, key, status):
+        """result of an ingested order: the order and its first invoice"""
+        invoice = self.invoice_ids[:1]
+        return {
+            'idempotency_key': key,
+            'success': True,
+            'status': status,
+            'data': {
+                'so_id': self.id, 'so_number': self.name,
+                'invoice_id': invoice.id, 'invoice_number': invoice.name,
+            },
+        }
+
+    def _api_error(self, key, message):
+        return {'idempotency_key': key, 'success': False, 'status': 'error', 'message': message}
+
+    @api.model
+    def _api_prepare_orders(self, orders):
+        """Validates the orders payload, partners, products and taxes are checked with one search each
+        returns ({payload index: order vals}, {payload index: error result})"""
+        errors, valid = {}, {}
+        keys_seen = set()
+        for index, order in enumerate(orders):
+            key = order.get('idempotency_key')
+            if not key:
+                errors[index] = self._api_error(key, 'idempotency_key is required')
+            elif key in keys_seen:
+                errors[index] = self._api_error(key, 'duplicated idempotency_key in the payload')
+            elif not order.get('partner_id') or not order.get('order_lines'):
+                errors[index] = self._api_error(key, 'missing parameter such as partnerid, or orderlines not provided')
+            else:
+                valid[index] = order
+            keys_seen.add(key)
+
+        lines = [line for order in valid.values() for line in order['order_lines']]
+        partner_ids = set(self.env['res.partner'].search(
+            [('id', 'in', [int(order['partner_id']) for order in valid.values()])]).ids)
+        product_ids = set(self.env['product.product'].search(
+            [('sale_ok', '=', True), ('id', 'in', [int(line.get('product_id') or 0) for line in lines])]).ids)
+        tax_ids = set(self.env['account.tax'].search(
+            [('id', 'in', [int(tax_id) for line in lines for tax_id in line.get('tax_ids') or []])]).ids)
+
+        vals = {}
+        for index, order in valid.items():
+            missing = []
+            if int(order['partner_id']) not in partner_ids:
+                missing.append(f"partner {order['partner_id']}")
+            order_lines = []
+            for line in order['order_lines']:
+                line = dict(line)
+                if int(line.get('product_id') or 0) not in product_ids:
+                    missing.append(f"product {line.get('product_id')}")
+                line_tax_ids = [int(tax_id) for tax_id in line.pop('tax_ids', None) or []]
+                if set(line_tax_ids) - tax_ids:
+                    missing.append(f"taxes {sorted(set(line_tax_ids) - tax_ids)}")
+                elif line_tax_ids:
+                    line['tax_id'] = [(6, 0, line_tax_ids)]
+                order_lines.append((0, 0, line))
+            if missing:
+                errors[index] = self._api_error(order['idempotency_key'], f"Not found: {', '.join(missing)}")
+                continue
+            vals[index] = {
+                'partner_id': int(order['partner_id']),
+                'company_id': int(order.get('company_id') or self.env.company.id),
+                'api_idempotency_key': order['idempotency_key'],
+                'order_line': order_lines,
+            }
+        return vals, errors
+
+    def _api_confirm_and_invoice(self):
+        self.action_confirm()
+        self._create_invoices(grouped=True)
+
+    @api.model
+    def api_ingest_orders(self, orders):
+        """Creates, confirms and invoices the orders sent by the salesman application.
+
+        orders: [{'idempotency_key', 'partner_id', 'company_id', 'order_lines': [{'product_id',
+        'product_uom_qty', 'price_unit', 'tax_ids'}]}]
+        Orders whose idempotency key already exists are not created again but returned
+        with the 'replayed' status, so the same payload can safely be sent several times.
+        The new orders are created with a single create, if it fails each order is created
+        on its own so one invalid order does not reject the others.
+        returns one result per order, in the order of the payload
+        """
+        vals, results = self._api_prepare_orders(orders)
+        index_by_key = {order_vals['api_idempotency_key']: index for index, order_vals in vals.items()}
+        for order in self.search([('api_idempotency_key', 'in', list(index_by_key))]):
+            index = index_by_key.pop(order.api_idempotency_key)
+            results[index] = order._api_order_result(order.api_idempotency_key, 'replayed')
+            del vals[index]
+
+        if vals:
+            try:
+                with self.env.cr.savepoint():
+                    created = self.create(list(vals.values()))
+                    created._api_confirm_and_invoice()
+                for order in created:
+                    results[index_by_key[order.api_idempotency_key]] = order._api_order_result(order.api_idempotency_key, 'created')
+            except Exception as batch_error:
+                _logger.info("Bulk order creation failed (%s), creating the orders one by one", batch_error)
+                for index, order_vals in vals.items():
+                    results[index] = self._api_ingest_order(order_vals)
+        return [results[index] for index in range(len(orders))]
+
+    @api.model
+    def _api_ingest_order(self, vals):
+        key = vals['api_idempotency_key']
+        try:
+            with self.env.cr.savepoint():
+                order = self.create(vals)
+                order._api_confirm_and_invoice()
+            return order._api_order_result(key, 'created')
+        except IntegrityError:
+            # created meanwhile by a concurrent replay of the same order
+            order = self.search([('api_idempotency_key', '=', key)], limit=1)
+            if order:
+                return order._api_order_result(key, 'replayed')
+            return self._api_error(key, 'The order is being created by another request, retry later')
+        except Exception as e:
+            return self._api_error(key, str(e))
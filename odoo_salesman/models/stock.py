@@ -1,4 +1,9 @@
-from odoo import models, fields
+import logging
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
 
 class stockpicking(models.Model):
     _inherit = 'stock.picking'
@@ -13,5 +18,131 @@ class stockpicking(models.Model):
         string="Delivery Status",
         default="not_enabled"
         )
-    
-     
\ No newline at end of file
+
+    def _api_delivery_result(self, index):
+        return {
+            'index': index,
+            'success': True,
+            'data': {
+                'delivery_id': self.id, 'delivery_number': self.name,
+                'delivery_man_id': self.assigned_delivery_man.id,
+                'delivery_man': self.assigned_delivery_man.name,
+                'status': self.state.capitalize(),
+            },
+        }
+
+    @api.model
+    def _api_resolve_deliveries(self, deliveries):
+        """Resolves the sale orders, pickings and delivery persons referenced by the deliveries
+        with one search each.
+        returns ({payload index: existing picking}, {payload index: delivery to create}, drivers, {payload index: error})
+        """
+        def to_ids(key):
+            return [int(delivery[key]) for delivery in deliveries if delivery.get(key)]
+
+        def to_names(key):
+            return [delivery[key] for delivery in deliveries if delivery.get(key)]
+
+        orders = self.env['sale.order'].search(
+            ['|', ('id', 'in', to_ids('so_id')), ('name', 'in', to_names('so_number'))])
+        pickings = self.search(
+            ['|', ('id', 'in', to_ids('picking_id')), ('name', 'in', to_names('picking_number'))])
+        drivers = self.env['res.users'].search([('id', 'in', to_ids('delivery_man_id'))])
+        orders_by_id, orders_by_name = {so.id: so for so in orders}, {so.name: so for so in orders}
+        pickings_by_id, pickings_by_name = {pick.id: pick for pick in pickings}, {pick.name: pick for pick in pickings}
+
+        existing, to_create, errors = {}, {}, {}
+        for index, delivery in enumerate(deliveries):
+            driver_id = int(delivery['delivery_man_id']) if delivery.get('delivery_man_id') else False
+            if driver_id and driver_id not in drivers.ids:
+                errors[index] = {'index': index, 'success': False, 'message': f'No delivery person found with id {driver_id}'}
+                continue
+            so_order = (delivery.get('so_id') and orders_by_id.get(int(delivery['so_id']))) or orders_by_name.get(delivery.get('so_number'))
+            picking = so_order and so_order.picking_ids[:1]
+            if not picking:
+                picking = (delivery.get('picking_id') and pickings_by_id.get(int(delivery['picking_id']))) or pickings_by_name.get(delivery.get('picking_number'))
+            if picking:
+                existing[index] = picking
+            elif delivery.get('item_ids'):
+                to_create[index] = delivery
+            else:
+                errors[index] = {'index': index, 'success': False, 'message': 'No delivery found and no items provided to create it'}
+        return existing, to_create, drivers, errors
+
+    @api.model
+    def _api_create_deliveries(self, deliveries):
+        """deliveries: {payload index: delivery}, creates the outgoing pickings with a single create"""
+        picking_type_out = self.env.ref('stock.picking_type_out')
+        warehouse = self.env['stock.warehouse'].search([('company_id', '=', self.env.user.company_id.id)], limit=1)
+        location_id = picking_type_out.default_location_src_id.id or warehouse.lot_stock_id.id
+        location_dest_id = picking_type_out.default_location_dest_id.id or self.env.ref('stock.stock_location_customers').id
+        vals_list = [{
+            'scheduled_date': fields.Date.today(),
+            'picking_type_id': picking_type_out.id,
+            'origin': delivery.get('so_number'),
+            'assigned_delivery_man': int(delivery['delivery_man_id']) if delivery.get('delivery_man_id') else False,
+            'partner_id': delivery.get('partner_id'),
+            'order_delivery_status': delivery.get('order_delivery_status') or 'not_enabled',
+            'move_ids_without_package': [(0, 0, {
+                'name': delivery.get('so_number') or '/',
+                'picking_type_id': picking_type_out.id,
+                'location_id': location_id,
+                'location_dest_id': location_dest_id,
+                'product_id': item.get('product_id'),
+                'product_uom_qty': item.get('quantity', item.get('product_uom_qty')),
+            }) for item in delivery['item_ids']],
+        } for delivery in deliveries.values()]
+        return dict(zip(deliveries, self.create(vals_list)))
+
+    def _api_validate(self):
+        """Validates the pickings at once, if it fails each picking is validated on its own
+        returns {picking id: error message}"""
+        try:
+            with self.env.cr.savepoint():
+                self.button_validate()
+            return {}
+        except Exception as batch_error:
+            _logger.info("Bulk picking validation failed (%s), validating the pickings one by one", batch_error)
+        errors = {}
+        for picking in self:
+            try:
+                with self.env.cr.savepoint():
+                    picking.button_validate()
+            except Exception as e:
+                errors[picking.id] = str(e)
+        return errors
+
+    @api.model
+    def api_dispatch_deliveries(self, deliveries):
+        """Dispatches the deliveries sent by the salesman application.
+
+        deliveries: [{'so_id', 'so_number', 'picking_id', 'picking_number', 'partner_id',
+        'delivery_man_id', 'order_delivery_status', 'item_ids': [{'product_id', 'quantity'}]}]
+        The delivery of a sale order (or the picking given) is assigned to the delivery person,
+        with its sale order, and validated. Without an existing delivery, a new outgoing
+        picking is created from the items.
+        The orders, pickings and delivery persons are resolved with one query each and the
+        assignments and validations are written in bulk.
+        returns one result per delivery, in the order of the payload
+        """
+        existing, to_create, drivers, results = self._api_resolve_deliveries(deliveries)
+        created = self._api_create_deliveries(to_create) if to_create else {}
+
+        pickings_by_driver = {}
+        for index, picking in existing.items():
+            driver_id = int(deliveries[index]['delivery_man_id']) if deliveries[index].get('delivery_man_id') else False
+            if driver_id:
+                pickings_by_driver[driver_id] = pickings_by_driver.get(driver_id, self.browse()) | picking
+        orders = self.env['sale.order'].search([('name', 'in', [pick.origin for pick in existing.values() if pick.origin])])
+        for driver_id, pickings in pickings_by_driver.items():
+            pickings.write({'assigned_delivery_man': driver_id})
+            orders.filtered(lambda so: so.name in pickings.mapped('origin')).write({'assigned_delivery_man': driver_id})
+        drivers.filtered(lambda usr: usr.id in pickings_by_driver).write({'is_available': True})
+
+        validation_errors = self.browse(list({pick.id for pick in existing.values()}))._api_validate()
+        for index, picking in list(existing.items()) + list(created.items()):
+            if picking.id in validation_errors:
+                results[index] = {'index': index, 'success': False, 'message': validation_errors[picking.id]}
+            else:
+                results[index] = picking._api_delivery_result(index)
+        return [results[index] for index in range(len(deliveries))]
@@ -1,8 +1,13 @@
 # -*-encoding: utf-8-*-
 import hashlib
 import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import timezone
 
-from odoo import fields, models, api, _
+from odoo import fields, models, api, tools, _
+from odoo.tools import consteq
 
 
 def nonce(length=40, prefix="token"):
@@ -10,6 +15,69 @@ def nonce(length=40, prefix="token"):
     return "{}_{}".format(prefix, str(hashlib.sha1(rbytes).hexdigest()))
 
 
+# database sequence bumped after the commit of a token change, read once per cursor
+TOKEN_CACHE_SEQUENCE = 'odoo_salesman_token_cache_signaling'
+TOKEN_CACHE_VERSION = 'odoo_salesman_token_cache_version'
+TOKEN_CACHE_CHANGED = 'odoo_salesman_token_cache_changed'
+
+
+class ApiTokenCache(object):
+    """In process cache of the authenticated api tokens: sha256(token) => (token, uid, scopes, expiry).
+
+    Entries live at most ttl seconds (and never after the token expiry date). A
+    token created, written or deleted clears the cache of the current worker and
+    bumps a database sequence once committed, the other workers clear theirs
+    when they read the new sequence value at their next request.
+    """
+
+    def __init__(self, max_size=1024, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.version = None
+        self._lock = threading.RLock()
+        self._data = OrderedDict()
+
+    def check_version(self, version):
+        """clears the cache when the tokens were changed since it was filled"""
+        with self._lock:
+            if version != self.version:
+                self._data.clear()
+                self.version = version
+
+    def _key(self, token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token):
+        """returns (uid, scopes) of the token if cached and not expired"""
+        key = self._key(token)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            cached_token, uid, scopes, expiry = entry
+            if expiry < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+        return (uid, scopes) if consteq(cached_token, token) else None
+
+    def set(self, token, uid, scopes, expiry=None):
+        expiry = min(time.time() + self.ttl, expiry or float('inf'))
+        with self._lock:
+            key = self._key(token)
+            self._data[key] = (token, uid, scopes, expiry)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+token_cache = ApiTokenCache()
+
+
 class Token(models.Model):
     _name = "user.api.token"
     _description = 'User API Token'
@@ -17,6 +85,98 @@ class Token(models.Model):
     token = fields.Char("Access Token", required=False)
     user_id = fields.Many2one("res.users", string="User", required=False)
     scope = fields.Char("Scope")
+    expiry_date = fields.Datetime("Expiry Date", help="The token is refused after this date, never expires if not set")
+
+    _sql_constraints = [
+        ('token_uniq', 'unique(token)', 'The access token must be unique'),
+    ]
+
+    def _auto_init(self):
+        if tools.table_exists(self.env.cr, self._table):
+            # tokens shared by several users must be regenerated before the unique index is created,
+            # the most recent record keeps the token
+            self.env.cr.execute(f"""
+                SELECT id FROM {self._table} t
+                 WHERE token IS NOT NULL
+                   AND id < (SELECT MAX(id) FROM {self._table} WHERE token = t.token)
+            """)
+            for (token_id,) in self.env.cr.fetchall():
+                self.env.cr.execute(f"UPDATE {self._table} SET token = %s WHERE id = %s", [nonce(), token_id])
+        return super(Token, self)._auto_init()
+
+    def init(self):
+        self.env.cr.execute(f"CREATE SEQUENCE IF NOT EXISTS {TOKEN_CACHE_SEQUENCE}")
+
+    def _check_token_cache(self):
+        cr = self.env.cr
+        if TOKEN_CACHE_VERSION not in cr.cache:
+            cr.execute(f"SELECT last_value, is_called FROM {TOKEN_CACHE_SEQUENCE}")
+            last_value, is_called = cr.fetchone()
+            cr.cache[TOKEN_CACHE_VERSION] = last_value if is_called else 0
+        token_cache.check_version(cr.cache[TOKEN_CACHE_VERSION])
+
+    def _signal_token_changes(self):
+        """clears the token cache of every worker once the current transaction is committed"""
+        token_cache.clear()
+        cr = self.env.cr
+        if not cr.cache.get(TOKEN_CACHE_CHANGED):
+            cr.cache[TOKEN_CACHE_CHANGED] = True
+            registry = self.env.registry
+
+            @cr.postcommit.add
+            def signal_token_changes():
+                cr.cache.pop(TOKEN_CACHE_CHANGED, None)
+                with registry.cursor() as signal_cr:
+                    signal_cr.execute(f"SELECT nextval('{TOKEN_CACHE_SEQUENCE}')")
+                token_cache.clear()
+
+            @cr.postrollback.add
+            def reset_token_signal():
+                cr.cache.pop(TOKEN_CACHE_CHANGED, None)
+                token_cache.clear()
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self._signal_token_changes()
+        return super(Token, self).create(vals_list)
+
+    def write(self, vals):
+        self._signal_token_changes()
+        return super(Token, self).write(vals)
+
+    def unlink(self):
+        self._signal_token_changes()
+        return super(Token, self).unlink()
+
+    @api.model
+    def authenticate(self, token):
+        """returns (uid, scopes) of the user of the token, None if the token is unknown,
+        expired or not the last token of its user (see find_one_or_create_token).
+        The result is cached for the token_cache ttl"""
+        if not token:
+            return None
+        params = self.env['ir.config_parameter'].sudo()
+        token_cache.ttl = int(params.get_param('odoo_salesman.token_cache_ttl', 60))
+        token_cache.max_size = int(params.get_param('odoo_salesman.token_cache_size', 1024))
+        self._check_token_cache()
+        cached = token_cache.get(token)
+        if cached:
+            return cached
+        self.flush_model(['token', 'user_id', 'scope', 'expiry_date'])
+        self.env.cr.execute(f"""
+            SELECT t.token, t.user_id, t.scope, t.expiry_date
+              FROM {self._table} t
+             WHERE t.token = %s AND t.user_id IS NOT NULL
+               AND t.id = (SELECT MAX(id) FROM {self._table} WHERE user_id = t.user_id)
+               AND (t.expiry_date IS NULL OR t.expiry_date > now() at time zone 'UTC')
+        """, [token])
+        row = self.env.cr.fetchone()
+        if not row or not consteq(row[0], token):
+            return None
+        stored_token, uid, scope, expiry_date = row
+        scopes = tuple((scope or '').split())
+        token_cache.set(stored_token, uid, scopes, expiry_date and expiry_date.replace(tzinfo=timezone.utc).timestamp())
+        return uid, scopes
 
     def find_one_or_create_token(self, user_id=None, create=False):
         """Returns user api token.
@@ -75,10 +235,11 @@ class Users(models.Model):
     @api.model_create_multi
     def create(self, vals):
         res = super().create(vals)
-        user_token = self.env['user.api.token'].create({
-            'user_id': res.id,
-            'token': 'token_sasdd7e6ca6e3793e40bd6171429de6f8686ac6cd',
-        })
+        self.env['user.api.token'].create([{
+            'user_id': user.id,
+            'scope': 'userinfo',
+            'token': nonce(),
+        } for user in res])
         return res
         
         
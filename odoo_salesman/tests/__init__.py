@@ -1 +1,7 @@
-from . import test_sales_order_side
\ No newline at end of file
+from . import test_sales_order_side
+from . import test_product_api
+from . import test_token_auth_benchmark
+from . import test_sales_order_bulk
+from . import test_invoice_api
+from . import test_delivery_dispatch
+from . import test_rate_limit
\ No newline at end of file
@@ -0,0 +1,31 @@
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+
+@tagged('-at_install', 'post_install')
+class TestDeliveryDispatch(TransactionCase):
+
+    def setUp(self):
+        super(TestDeliveryDispatch, self).setUp()
+        self.partner = self.env['res.partner'].create({'name': 'Dispatch Partner'})
+        self.product = self.env['product.product'].create({'name': 'Dispatch Product', 'detailed_type': 'consu'})
+        self.driver = self.env['res.users'].create({
+            'name': 'Dispatch Driver', 'login': 'dispatch_driver', 'is_delivery_person': True,
+        })
+
+    def test_dispatch_deliveries(self):
+        picking = self.env['stock.picking'].api_dispatch_deliveries([{
+            'partner_id': self.partner.id, 'so_number': 'SO-DISPATCH', 'delivery_man_id': self.driver.id,
+            'item_ids': [{'product_id': self.product.id, 'quantity': 2}],
+        }])[0]
+        self.assertTrue(picking['success'])
+        self.assertEqual(picking['data']['delivery_man_id'], self.driver.id)
+
+        results = self.env['stock.picking'].api_dispatch_deliveries([
+            {'picking_number': picking['data']['delivery_number'], 'delivery_man_id': self.driver.id},
+            {'picking_id': picking['data']['delivery_id'], 'delivery_man_id': -1},
+            {'so_number': 'SO-MISSING'},
+        ])
+        self.assertEqual([result['success'] for result in results], [True, False, False])
+        self.assertEqual(results[0]['data']['delivery_id'], picking['data']['delivery_id'])
+        self.assertTrue(self.driver.is_available)
@@ -0,0 +1,52 @@
+from urllib.parse import urlencode
+
+from odoo.tests import HttpCase, tagged
+
+
+@tagged('-at_install', 'post_install')
+class TestInvoiceApi(HttpCase):
+
+    def setUp(self):
+        super(TestInvoiceApi, self).setUp()
+        self.token = self.env['user.api.token'].create({
+            'user_id': self.env.ref('base.user_admin').id,
+            'token': 'token_test_invoice_api',
+        }).token
+        self.partner = self.env['res.partner'].create({'name': 'Invoice Api Partner'})
+        product = self.env['product.product'].create({'name': 'Invoice Api Product', 'list_price': 50.0})
+        self.invoices = self.env['account.move'].create([{
+            'move_type': 'out_invoice',
+            'partner_id': self.partner.id,
+            'invoice_date': '2024-01-%02d' % (count + 1),
+            'invoice_line_ids': [(0, 0, {'product_id': product.id, 'quantity': 1, 'price_unit': 50.0})],
+        } for count in range(3)])
+
+    def get_invoices(self, headers=None, **params):
+        return self.url_open(f'/api/get/invoice?{urlencode(params)}', headers=dict(headers or {}, token=self.token))
+
+    def test_01_keyset_pagination(self):
+        cursor, invoice_ids = 0, []
+        while True:
+            result = self.get_invoices(partner_id=self.partner.id, limit=2, cursor=cursor).json()
+            self.assertTrue(result['success'])
+            invoice_ids += [inv['id'] for inv in result['result']]
+            self.assertTrue(all(len(inv['invoice_line_ids']) == 1 for inv in result['result']))
+            cursor = result['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(invoice_ids, self.invoices.ids)
+
+        result = self.get_invoices(partner_id=self.partner.id, date_from='2024-01-02', date_to='2024-01-02').json()
+        self.assertEqual([inv['id'] for inv in result['result']], self.invoices[1].ids)
+
+    def test_02_if_none_match(self):
+        response = self.get_invoices(partner_id=self.partner.id, payment_state='not_paid')
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+        response = self.get_invoices(headers={'If-None-Match': etag}, partner_id=self.partner.id, payment_state='not_paid')
+        self.assertEqual(response.status_code, 304)
+        # an invoice leaving the page changes the etag even if no remaining row was modified
+        self.invoices[-1].unlink()
+        response = self.get_invoices(headers={'If-None-Match': etag}, partner_id=self.partner.id, payment_state='not_paid')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([inv['id'] for inv in response.json()['result']], self.invoices[:2].ids)
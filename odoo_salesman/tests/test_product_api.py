@@ -0,0 +1,53 @@
+from urllib.parse import urlencode
+
+from odoo.tests import HttpCase, tagged
+
+
+@tagged('-at_install', 'post_install')
+class TestProductApi(HttpCase):
+
+    def setUp(self):
+        super(TestProductApi, self).setUp()
+        self.token = self.env['user.api.token'].create({
+            'user_id': self.env.ref('base.user_admin').id,
+            'token': 'token_test_product_api',
+        }).token
+        self.products = self.env['product.product'].create([
+            {'name': f'Api Product {count}', 'list_price': 10.0 * count} for count in range(5)
+        ])
+
+    def get_products(self, **params):
+        response = self.url_open(f'/api/get-product?{urlencode(params)}', headers={'token': self.token})
+        return response.json()
+
+    def test_01_keyset_pagination(self):
+        cursor = self.products[0].id - 1
+        product_ids = []
+        while cursor:
+            result = self.get_products(cursor=cursor, limit=2, fields='id,name')
+            self.assertTrue(result['success'])
+            product_ids += [row['id'] for row in result['data']]
+            self.assertTrue(all(set(row) == {'id', 'name'} for row in result['data']))
+            cursor = result['next_cursor']
+        self.assertEqual(product_ids, self.products.ids)
+
+    def test_02_updated_since_and_unknown_field(self):
+        result = self.get_products(updated_since='2999-01-01 00:00:00')
+        self.assertTrue(result['success'])
+        self.assertEqual(result['data'], [])
+        result = self.get_products(fields='id,standard_price')
+        self.assertFalse(result['success'])
+
+    def test_03_bulk_availability(self):
+        warehouse = self.env['stock.warehouse'].search([('company_id', '=', self.env.ref('base.user_admin').company_id.id)], limit=1)
+        storable = self.env['product.product'].create({'name': 'Api Storable', 'detailed_type': 'product'})
+        self.env['stock.quant']._update_available_quantity(storable, warehouse.lot_stock_id, 10)
+        response = self.url_open(
+            '/api/get-products-availability',
+            data='{"lines": [{"product_id": %s, "requesting_qty": 4}, {"product_id": %s, "requesting_qty": 11}, '
+                 '{"product_id": %s, "requesting_qty": 1}]}' % (storable.id, storable.id, self.products[0].id),
+            headers={'token': self.token, 'Content-Type': 'application/json'})
+        result = response.json()
+        self.assertFalse(result['success'])
+        self.assertEqual([line['code'] for line in result['data']], ['available', 'insufficient', 'not_storable'])
+        self.assertEqual(result['data'][1]['available_qty'], 10)
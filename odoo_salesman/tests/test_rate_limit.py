@@ -0,0 +1,36 @@
+from odoo.tests import HttpCase, tagged
+
+from ..models.token_auth import nonce
+
+
+@tagged('-at_install', 'post_install')
+class TestApiRateLimit(HttpCase):
+    # acquire and release commit on their own registry cursor, in an HttpCase
+    # it is the test cursor so the rows are rolled back with the test
+
+    def setUp(self):
+        super(TestApiRateLimit, self).setUp()
+        params = self.env['ir.config_parameter'].sudo()
+        params.set_param('odoo_salesman.rate_limit_burst', 2)
+        params.set_param('odoo_salesman.rate_limit_rate', 0.001)
+        params.set_param('odoo_salesman.rate_limit_concurrency', 2)
+        self.rate_limit = self.env['api.rate.limit']
+        self.token = nonce()
+
+    def test_01_token_bucket(self):
+        self.assertIsNone(self.rate_limit.acquire(self.token, '/api/get-product'))
+        self.rate_limit.release(self.token)
+        self.assertIsNone(self.rate_limit.acquire(self.token, '/api/get-product'))
+        self.rate_limit.release(self.token)
+        retry_after = self.rate_limit.acquire(self.token, '/api/get-product')
+        self.assertTrue(retry_after and retry_after > 1)
+        # the buckets are per route
+        self.assertIsNone(self.rate_limit.acquire(self.token, '/api/get/invoice'))
+        self.rate_limit.release(self.token)
+
+    def test_02_concurrency(self):
+        self.assertIsNone(self.rate_limit.acquire(self.token, '/api/get-product'))
+        self.assertIsNone(self.rate_limit.acquire(self.token, '/api/get/invoice'))
+        self.assertEqual(self.rate_limit.acquire(self.token, '/api/get-branch'), 1)
+        self.rate_limit.release(self.token)
+        self.assertIsNone(self.rate_limit.acquire(self.token, '/api/get-branch'))
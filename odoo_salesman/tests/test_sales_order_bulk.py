@@ -0,0 +1,29 @@
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+
+@tagged('-at_install', 'post_install')
+class TestSalesOrderBulk(TransactionCase):
+
+    def setUp(self):
+        super(TestSalesOrderBulk, self).setUp()
+        self.partner = self.env['res.partner'].create({'name': 'Bulk Partner'})
+        self.product = self.env['product.product'].create({'name': 'Bulk Product', 'list_price': 100.0})
+
+    def _order(self, key, product_id=None):
+        return {
+            'idempotency_key': key,
+            'partner_id': self.partner.id,
+            'order_lines': [{'product_id': product_id or self.product.id, 'product_uom_qty': 2, 'price_unit': 100.0}],
+        }
+
+    def test_ingest_orders_is_idempotent(self):
+        orders = [self._order('device-1'), self._order('device-2'), self._order('device-3', product_id=-1)]
+        results = self.env['sale.order'].api_ingest_orders(orders)
+        self.assertEqual([result['status'] for result in results], ['created', 'created', 'error'])
+        self.assertTrue(results[0]['data']['invoice_id'])
+
+        replayed = self.env['sale.order'].api_ingest_orders(orders[:2] + [self._order('device-1')])
+        self.assertEqual([result['status'] for result in replayed], ['replayed', 'replayed', 'error'])
+        self.assertEqual(replayed[0]['data']['so_id'], results[0]['data']['so_id'])
+        self.assertEqual(self.env['sale.order'].search_count([('partner_id', '=', self.partner.id)]), 2)
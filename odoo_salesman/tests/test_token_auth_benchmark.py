@@ -0,0 +1,71 @@
+import logging
+import time
+
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+from odoo.addons.odoo_salesman.models.token_auth import token_cache
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged('-standard', 'salesman_benchmark')
+class TestTokenAuthBenchmark(TransactionCase):
+    """Compares the per request overhead of the former token validation
+    (two user.api.token searches) with the cached authenticate.
+
+    Not part of the standard test run, use --test-tags salesman_benchmark
+    """
+    REQUESTS = 5000
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = cls.env.ref('base.user_admin')
+        cls.token = cls.env['user.api.token'].create({
+            'user_id': cls.user.id,
+            'token': 'token_benchmark_auth',
+        }).token
+
+    def _search_validation(self, token):
+        access_token_data = self.env["user.api.token"].sudo().search([("token", "=", token)], order="id DESC", limit=1)
+        return access_token_data.find_one_or_create_token(user_id=access_token_data.user_id.id) == token
+
+    def _measure(self, validate):
+        queries, start = self.env.cr.sql_log_count, time.perf_counter()
+        for _count in range(self.REQUESTS):
+            self.assertTrue(validate(self.token))
+        return time.perf_counter() - start, self.env.cr.sql_log_count - queries
+
+    def test_benchmark_token_authentication(self):
+        token_model = self.env['user.api.token'].sudo()
+        search_time, search_queries = self._measure(self._search_validation)
+        token_cache.clear()
+        cached_time, cached_queries = self._measure(token_model.authenticate)
+        _logger.info(
+            "token authentication of %s requests: searches %.4fs (%s queries), cached %.4fs (%s queries), %.1f us per request",
+            self.REQUESTS, search_time, search_queries, cached_time, cached_queries,
+            cached_time * 1e6 / self.REQUESTS)
+        # the token cache version, read once per cursor, and the token
+        self.assertLessEqual(cached_queries, 2)
+
+
+@tagged('-at_install', 'post_install')
+class TestTokenAuth(TransactionCase):
+
+    def setUp(self):
+        super(TestTokenAuth, self).setUp()
+        token_cache.clear()
+        self.user = self.env.ref('base.user_admin')
+        self.token = self.env['user.api.token'].create({'user_id': self.user.id, 'token': 'token_test_auth'})
+
+    def test_authenticate(self):
+        token_model = self.env['user.api.token'].sudo()
+        self.assertEqual(token_model.authenticate('token_test_auth')[0], self.user.id)
+        self.assertIsNone(token_model.authenticate('token_unknown'))
+        # a newer token of the user replaces the previous one, even when cached
+        self.env['user.api.token'].create({'user_id': self.user.id, 'token': 'token_test_auth_new'})
+        self.assertIsNone(token_model.authenticate('token_test_auth'))
+        self.assertEqual(token_model.authenticate('token_test_auth_new')[0], self.user.id)
+        self.env['user.api.token'].search([('token', '=', 'token_test_auth_new')]).write({'expiry_date': '2000-01-01 00:00:00'})
+        self.assertIsNone(token_model.authenticate('token_test_auth_new'))
@@ -1,2 +1,2 @@
 from . import controller
-# from . import model
+from . import model
\ No newline at end of file
@@ -6,7 +6,7 @@ import random
 from multiprocessing.spawn import prepare
 import urllib.parse
 from odoo import http, fields
-from odoo.exceptions import ValidationError
+from odoo.exceptions import AccessError, ValidationError
 from odoo.tools import consteq, plaintext2html
 from odoo.http import request
 from datetime import date, datetime, timedelta
@@ -18,10 +18,19 @@ import odoo
 import odoo.addons.web.controllers.home as main
 from odoo.addons.web.controllers.utils import ensure_db, _get_login_redirect_url, is_user_internal
 from odoo.tools.translate import _
+from odoo.addons.company_memo.models.memo_profiler import lazy_debug, profile_span, profiled
 
 _logger = logging.getLogger(__name__)
 # Shared parameters for all login/signup flows
 
+# cached dashboard endpoints and the method building their payload
+DASHBOARD_PAYLOADS = {
+    'refresh_data': 'refresh_data_payload',
+    'display_mmr': 'display_mmr_payload',
+    'file_admin': 'file_admin_payload',
+    'frame_agreement': 'frame_agreement_payload',
+}
+
 
 class MainOfficeDashboard(http.Controller):
     
@@ -36,9 +45,10 @@ class MainOfficeDashboard(http.Controller):
     @http.route([
         "/my-dashboard"
         ], type='http', auth='user', website=True, website_published=True)
+    @profiled()
     def myDashboard(self):
         vals = self.office_dashboard()
-        _logger.info(vals)
+        _logger.debug("dashboard values %s", vals)
         return request.render("office_dashboard.office_dashboard_template_id", qcontext=vals)
                
     def office_dashboard(
@@ -50,7 +60,7 @@ class MainOfficeDashboard(http.Controller):
         domain = [('active', '=', True), ('memo_project_type', 'in', ['warehouse', 'procurement', 'agency', 'cfwd', 'transport', 'travel'])]
         project_file_type = []
         currency_name = kwargs.get('currency_name') or 'NGN'
-        _logger.info(f'what is currency {currency_name}')
+        _logger.debug("what is currency %s", currency_name)
         if search_request:
             domain += [
                 '|', ('code', '=ilike', search_request),
@@ -111,7 +121,7 @@ class MainOfficeDashboard(http.Controller):
         # draft_lead_memo_ids = request.env["memo.model"].sudo().search(draft_lead_memo)
         # domain += [('state', 'not in', ['submit'])]
         memo_invoice_ids = request.env["memo.model"].sudo().search(domain)
-        _logger.info(f"MY DOMAIN IS WHAT {domain}")
+        _logger.debug("MY DOMAIN IS WHAT %s", domain)
         task_not_done, additional_po_process = 0, 0
         
         project_x_data = []
@@ -157,7 +167,10 @@ class MainOfficeDashboard(http.Controller):
         wip_grouped_dicts = {}
         pos_to_be_paid_ids = []
         if memo_invoice_ids:
-            _logger.info(f'what is inc {memo_invoice_ids[0:2]}')
+            lazy_debug(_logger, "what is inc %s", lambda: memo_invoice_ids[0:2])
+            finances_ngn, finances_usd = self.get_memo_finances(memo_invoice_ids, 'NGN'), self.get_memo_finances(memo_invoice_ids, 'USD')
+            so_finances = finances_usd if currency_name in ['USD'] else finances_ngn
+            po_finances = finances_ngn if currency_name in ['NGN'] else finances_usd
             
             #### adding doughnut_filter_project_type_data
             project_items = list(set([mm.memo_type.memo_key for mm in memo_invoice_ids])) if kwargs.get('project_file_type') else list(set([mm.memo_project_type for mm in memo_invoice_ids]))
@@ -228,7 +241,7 @@ class MainOfficeDashboard(http.Controller):
                     'margin': 0, 
                 }
                 
-            _logger.info(f'FINAL WIP DATA ARE == {wip_project_dicts}')
+            _logger.debug("FINAL WIP DATA ARE == %s", wip_project_dicts)
             customer_project_items = list(set([mm.client_id.id for mm in memo_invoice_ids]))
             customer_project_items_name = list(set([mm.client_id.name for mm in memo_invoice_ids]))
             for cupdate in customer_project_items:
@@ -255,11 +268,11 @@ class MainOfficeDashboard(http.Controller):
                 if mo.stage_id.stage_type in ['closed']:# or mo.stage_id.id == last_stage_id[-1].id: # determine if the file is at closed stage
                     closed_file_ids.append(mo.id)
                     if mo.memo_project_type == 'agency':
-                        _logger.info(f"CLOSED AGENECY {mo.id}")
+                        _logger.debug("CLOSED AGENECY %s", mo.id)
                 # OPENED FILES
                 else:
                     if mo.memo_project_type == 'agency':
-                        _logger.info(f"OPENED AGENECY {mo.id}")
+                        _logger.debug("OPENED AGENECY %s", mo.id)
                     opened_file_ids.append(mo.id) # determine if the file is not at closed stage
                     #### WIP OPENED FILES
                     record_items = wip_grouped_dicts.get(f'{mtype}').get('record_ids')
@@ -270,7 +283,7 @@ class MainOfficeDashboard(http.Controller):
                     # 'record_ids': [], 
                     'record_ids': record_items   
                     })
-                    _logger.info(f"SITER {type(record_items)} ==> {record_items} --> {wip_grouped_dicts}-====>  {wip_grouped_dicts.get(f'{mtype}')}")
+                    _logger.debug("SITER %s --> %s", record_items, wip_grouped_dicts.get(mtype))
                     
                     if record_items and type(record_items) == list:
                         its = record_items + [mo.id]
@@ -278,11 +291,10 @@ class MainOfficeDashboard(http.Controller):
                             'record_ids': its
                         })
                     # WIP CALCULATIONS
-                    wip_revenue_total, wip_confirmed_revenue_total, wip_paid_revenue = self.compute_so_naira_dollar_value(mo.so_ids, 'USD') if currency_name in ['USD'] else \
-                    self.compute_so_naira_dollar_value(mo.so_ids, 'NGN')
-                    _logger.info(f'UPDATE MTYPE WIP DATA ARE == {wip_project_dicts.get(mtype)}')
+                    wip_revenue_total, wip_confirmed_revenue_total, wip_paid_revenue = self.so_finance_values(so_finances[mo.id])
+                    _logger.debug("UPDATE MTYPE WIP DATA ARE == %s", wip_project_dicts.get(mtype))
                     
-                    wip_po_computes = self.compute_po_naira_dollar_value(mo.po_ids, 'NGN') if currency_name in ['NGN'] else self.compute_po_naira_dollar_value(po_budget_ids, 'USD')
+                    wip_po_computes = self.po_finance_values(po_finances[mo.id])
                     wip_cost_total = wip_po_computes[0]
                     wip_margin = wip_revenue_total - wip_cost_total # difference in revenue and cost wip
                     
@@ -310,7 +322,7 @@ class MainOfficeDashboard(http.Controller):
                     'margin': wip_booked_project_dicts.get(mtype).get('margin') + wip_booked_margin,
                     })
                     # WIP_DATA.append(wip_project_dicts);
-                    _logger.info(f'UPDATE WIP DATA ARE == {wip_project_dicts}')
+                    _logger.debug("UPDATE WIP DATA ARE == %s", wip_project_dicts)
                     
                     # GRAND TOTAL
                     wip_booked_grand_total_dicts.update({
@@ -328,7 +340,7 @@ class MainOfficeDashboard(http.Controller):
                     'margin': wip_paid_project_dicts.get(mtype).get('margin') + wip_paid_margin,
                     })
                     # WIP_DATA.append(wip_project_dicts);
-                    _logger.info(f'UPDATE WIP PAID DATA ARE == {wip_paid_project_dicts}')
+                    _logger.debug("UPDATE WIP PAID DATA ARE == %s", wip_paid_project_dicts)
                     # GRAND TOTAL
                     wip_paid_grand_total_dicts.update({
                         'wip_revenue': wip_paid_grand_total_dicts.get('wip_revenue') + wip_paid_revenue,
@@ -368,7 +380,7 @@ class MainOfficeDashboard(http.Controller):
                         
                     if task_date_difference > 30:
                         past_one_month_ids.append(mo.id)
-                    _logger.info(f"files not close {mo.id} stage tye {mo.stage_id.stage_type}")
+                    lazy_debug(_logger, "files not close %s stage type %s", mo.id, lambda: mo.stage_id.stage_type)
                     if mo.stage_id.stage_type not in ['normal','', False, 'invoice_check', 'validate_invoice', 'close']:
                         # any stage aside normal and closed
                         # if mo.state not in ['submit','refuse']: what was there before it was changed
@@ -376,7 +388,7 @@ class MainOfficeDashboard(http.Controller):
                         lambda st: st.invoice_status in ['invoiced'] or st.state in ['sale'])
                         if closed_so_ids:
                             invoice_unclose_ids += [mo.id]
-                        _logger.info(f"List of invoices not unclosed {mo.id}")
+                        _logger.debug("List of invoices not unclosed %s", mo.id)
                     if mo.stage_id.stage_type in ['validate_invoice']:
                         # if mo.po_ids and not mo.so_ids: what was the before
                         to_be_invoiced_ids.append(mo.id) # to be invoiced
@@ -423,8 +435,7 @@ class MainOfficeDashboard(http.Controller):
                 rec_revenue_months = list(set([r.date_order.strftime('%b') for r in mo.mapped('so_ids').filtered(lambda so: so.state not in ['draft', 'cancel'])]))
                 revenue_total, budget_total, usd_revenue_total, usd_budget_total = 0, 0, 0, 0
                 
-                budget_rev_total, invoice_rev_total, invoice_paid_rev = self.compute_so_naira_dollar_value(mo.so_ids, 'USD') if currency_name in ['USD'] else \
-                    self.compute_so_naira_dollar_value(mo.so_ids, 'NGN')
+                budget_rev_total, invoice_rev_total, invoice_paid_rev = self.so_finance_values(so_finances[mo.id])
                 budget_total = budget_rev_total
                 revenue_total = invoice_rev_total
                 
@@ -462,7 +473,7 @@ class MainOfficeDashboard(http.Controller):
                     })
                 ##########################################group_customer_info ################
                 
-                grouped_customer_info.append(self.grouped_customer_info(mo))
+                grouped_customer_info.append(self.grouped_customer_info(mo, finances_ngn[mo.id], finances_usd[mo.id]))
                 #######################################
                 
                 # COMPUTES TOTAL OF TASKS NOT COMPLETED FOR THE RECORDS
@@ -472,7 +483,7 @@ class MainOfficeDashboard(http.Controller):
                 
                 '''Total Budget revenue: Get all the PO_IDS total amount'''
                 if po_budget_ids:
-                    po_computes = self.compute_po_naira_dollar_value(po_budget_ids, 'NGN') if currency_name in ['NGN'] else self.compute_po_naira_dollar_value(po_budget_ids, 'USD')
+                    po_computes = self.po_finance_values(po_finances[mo.id])
                     '''return total_po_costs, total_invoiced_cost, total_paid_cost'''
                     total_budget_cost += po_computes[0]
                     total_invoice_cost += po_computes[1]
@@ -501,8 +512,8 @@ class MainOfficeDashboard(http.Controller):
         count_ongoing_memo = request.env["memo.model"].sudo().search(ongoing_domain)  
         count_ongoing_memo1, count_ongoing_memo2 = self.count_ongoing_memo(count_ongoing_memo)
         get_sales_by_month1, get_sales_by_month2 = self.get_sales_by_month(kwargs)
-        _logger.info(f'To be Invoiced ===> {to_be_invoiced_ids} , {len(to_be_invoiced_ids)}, {str(to_be_invoiced_ids)}')
-        _logger.info(f'MAIN WIP DATA ARE == {wip_project_dicts}')
+        _logger.debug("To be Invoiced ===> %s, %s", to_be_invoiced_ids, len(to_be_invoiced_ids))
+        _logger.debug("MAIN WIP DATA ARE == %s", wip_project_dicts)
         vals = {
             "output_opened_files": {'count': len(opened_file_ids), 'records': str(opened_file_ids)},
             "to_be_invoiced": {'count': len(to_be_invoiced_ids), 'records': str(to_be_invoiced_ids)},
@@ -529,7 +540,8 @@ class MainOfficeDashboard(http.Controller):
             "total_paid_invoiced_revenue": round(total_paid_invoiced_revenue, 2),
             "total_revenue_balance": round(total_revenue_balance, 2),
             "memo_filters": self.get_memo_filters(domain),
-            "frame_agreement_ids": request.env['memo.frame.agreement'].search([('active', '=', True)]),
+            # plain dicts: the payload is kept in the dashboard cache after the request env is gone
+            "frame_agreement_ids": request.env['memo.frame.agreement'].search_read([('active', '=', True)], ['code', 'name']),
             'calendar_event': self.get_calender_event(),
             "group_project_table": grouped_customer_info, #self.grouped_customer_info(self.search_domain(kwargs=kwargs)),
             "line_doughnut_filter":  json.dumps({
@@ -567,7 +579,7 @@ class MainOfficeDashboard(http.Controller):
             "additional_po_process": 0, #additional_po_process,
             "count_past_week_memo": 0, #count_past_week_memo,
             "memo_completed_past_one_month": 0, #len(completed_memo_past_one_month),
-            "memo_types": request.env['memo.type'].search([('active', '=', True)]),
+            "memo_types": request.env['memo.type'].search_read([('active', '=', True)], ['name']),
             "request_item": {
                 'new_request':  0,
                 'project_pipeline': 20,
@@ -585,7 +597,7 @@ class MainOfficeDashboard(http.Controller):
         }
         # frame_agree_agreement = self.dynamic_frame_agreement(self.search_domain(kwargs=kwargs), kwargs)
         # vals.update(frame_agree_agreement)
-        _logger.info('zenzenbe ===>', vals)
+        _logger.debug("zenzenbe ===> %s", vals)
         return vals
     
     def get_memo_with_frame_agreement(self, fr_id):
@@ -600,28 +612,27 @@ class MainOfficeDashboard(http.Controller):
         domain = [('id', 'in', memo_ids)] if memo_ids else False
         return domain 
      
+    def get_memo_date_range(self, month=False, year=False):
+        '''returns the (start, end) datetimes of the month / year filter,
+        month: e.g 'Jan', year: e.g '2024', month without year is for the current year'''
+        if not month and not year:
+            return False
+        if month and month not in calendar.month_abbr[1:]:
+            return False
+        year = int(year) if year else fields.Date.today().year
+        if month:
+            start = datetime(year, list(calendar.month_abbr).index(month), 1)
+            return start, start + relativedelta(months=1)
+        return datetime(year, 1, 1), datetime(year + 1, 1, 1)
+     
     def get_memo_with_month_year(self, month=False, year=False):
-        memo_months = request.env['memo.model'].search([])
-        memo_ids = []
-        curr_year = fields.Date.today()
-        if month and not year:
-
-            memo_ids = [r.id for r in memo_months if r.date and r.date.strftime('%Y') == curr_year.year and r.date.strftime('%b') == month]
-            _logger.info(f"MONTH AND CURRENT of {month} and YEAR {year} == > {memo_ids}")
-
-        elif year and not month:
-            # year = year else fields.Date.today().year
-            memo_ids = [r.id for r in memo_months if r.date and r.date.strftime('%Y') == year] 
-            _logger.info(f"YEAR WITHOUT MONTH {month} and YEAR {type(year)} == >  {memo_ids}")
-        elif year and month:
-            memo_ids = [r.id for r in memo_months if r.date and r.date.strftime('%b') == month and r.date.strftime('%Y') == year]
-            _logger.info(f"MONTH AND YEAR MEMO {month} and YEAR {year}  ===> {memo_ids}")
-        else:
-            memo_ids = []
-        domain = [('id', 'in', memo_ids)]
-        return domain 
+        date_range = self.get_memo_date_range(month, year)
+        if not date_range:
+            return [('id', 'in', [])]
+        return [('date', '>=', date_range[0]), ('date', '<', date_range[1])]
     
     @http.route(['/get-data-info/<string:items>'], type='http', auth='user', website=True)
+    @profiled()
     def get_data_info(self, items):
         """items : '[8,88,90,70]' """
         # domain="%5B%28%27id%27%2C%20%27in%27%2C%20%5B1%2C%203%2C%204%2C%205%5D%29%5D"
@@ -652,29 +663,32 @@ class MainOfficeDashboard(http.Controller):
         returns memo_dicts.customer_ids(lists of name,), 
         yeat_ids: list of years, projects: object 
         of existing projects, company_ids'''
-        # domain=[('active', '=', True)]
-        # if project_file_type:
-        #     domain + [('memo_type', 'in', project_file_type)]
-        memos = request.env['memo.model'].search(domain)
-        _logger.info(f"List of all {[me.id for me in memos]}")
+        memo = request.env['memo.model'].with_context(tz='UTC')
+        project_groups = memo.read_group(domain, ['memo_type'], ['memo_type'])
+        customer_groups = memo.read_group(domain, ['client_id'], ['client_id'])
+        year_ids, month_ids = set(), set()
+        for group in memo.read_group(domain, ['date'], ['date:month']):
+            date_range = group.get('__range', {}).get('date:month')
+            if date_range:
+                month_start = fields.Datetime.to_datetime(date_range['from'])
+                year_ids.add(month_start.year)
+                month_ids.add(month_start.strftime('%b'))
         memo_dicts = {
                 'project_ids': [{
-                    'id': me.id,
-                    'name': me.name,
-                } for me in set(memos.mapped('memo_type'))],
+                    'id': group['memo_type'][0],
+                    'name': group['memo_type'][1],
+                } for group in project_groups if group['memo_type']],
                 'customer_ids': [{
-                    'id': me.id,
-                    'name': me.name,
-                } for me in set(memos.mapped('client_id'))],
-                # 'customer_ids': list(set([me.client_id.name for me in memos])),
-                'year_ids': list(set([me.date.year for me in memos])),
-                'month_ids': list(set([me.date.strftime('%b') for me in memos])),
+                    'id': group['client_id'][0],
+                    'name': group['client_id'][1],
+                } for group in customer_groups if group['client_id']],
+                'year_ids': list(year_ids),
+                'month_ids': list(month_ids),
                 'company_ids': [{
                     'id': me.id,
                     'name': me.name,
                 } for me in request.env['res.company'].search([])],
             }
-        _logger.info(f"MEME MO {memo_dicts}")
         return memo_dicts
      
     def count_ongoing_memo(self, count_ongoing_memo):
@@ -714,20 +728,41 @@ class MainOfficeDashboard(http.Controller):
                 domain += [('date', '>=', df), ('date', '<=', dt)]
         return domain
     
-    def grouped_customer_info(self, memo, last_index=10):
+    def grouped_customer_info(self, memo, ngn_totals=None, usd_totals=None, last_index=10):
+        '''ngn_totals, usd_totals: memo totals from get_memo_finances,
+        computed for the memo if not given'''
         # records, count = [], 1
-        rev_total = self.compute_revenue_total(memo)
+        if ngn_totals is None or usd_totals is None:
+            ngn_totals = self.get_memo_finances(memo, 'NGN')[memo.id]
+            usd_totals = self.get_memo_finances(memo, 'USD')[memo.id]
         val = {
             'count': 0,
             'project_name': f"{memo.code or ''} - {memo.name or ''}",
             'customer_name': memo.client_id.name or '',
-            'ng_revenue_total': rev_total[0],
-            'usd_revenue_total':rev_total[1],
-            'ng_budget_total': self.compute_budget_total(memo), 
-            'usd_budget_total': self.compute_usd_budget_total(memo),
+            'ng_revenue_total': self.so_finance_values(ngn_totals)[0],
+            'usd_revenue_total': self.so_finance_values(usd_totals)[0],
+            'ng_budget_total': self.po_finance_values(ngn_totals)[0], 
+            'usd_budget_total': self.po_finance_values(usd_totals)[0],
             }
         return val 
     
+    def get_memo_finances(self, memo_ids, currency_name='NGN'):
+        '''reads the so / po totals of all the memo_ids from the finance snapshot
+        returns {memo_id: {'so': {...}, 'po': {...}}} see memo.finance'''
+        return request.env['memo.finance.snapshot'].sudo().get_totals(memo_ids, currency_name)
+    
+    def so_finance_values(self, totals):
+        '''returns budget, invoiced and paid revenue of a memo totals
+        as computed by compute_so_naira_dollar_value'''
+        so_totals = totals['so']
+        return round(so_totals['budget'], 3), round(so_totals['confirmed'], 3), round(so_totals['invoiced'], 3)
+    
+    def po_finance_values(self, totals):
+        '''returns total cost, invoiced, paid and to be invoiced cost of a memo totals
+        as computed by compute_po_naira_dollar_value'''
+        po_totals = totals['po']
+        return round(po_totals['budget']), round(po_totals['confirmed']), round(po_totals['invoiced']), round(po_totals['to_invoice'], 2)
+    
     def compute_revenue_total(self, memo_obj):
         ng_revenue_total, usd_revenue_total = 0, 0 
         ng_revenue_total += self.compute_so_naira_dollar_value(memo_obj.so_ids, 'NGN')[0]
@@ -743,26 +778,6 @@ class MainOfficeDashboard(http.Controller):
         usd_budget_total = self.compute_po_naira_dollar_value(memo_obj.po_ids, 'USD') 
         return usd_budget_total[0]
     
-    def get_month_deals(kwargs={}):
-        today = fields.Date.today() 
-        today_month = fields.Date.today().month # e.g 9
-        current_year = today.year or kwargs.get('current_year', today.year) # 2024
-        jan_period = DT.date(current_year, 1, 1) 
-        jan_period = jan_period.month or 1
-        dic_item = {}
-        header = [
-            'Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
-            'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec', 
-            ]
-        for dtm in range(jan_period, today_month+1): # range(1, 10) jan, sept
-            # 0
-            dtm = dtm - 1 # 1 - 0 = 0
-            val = header[dtm] # header[0] = Jan
-            dic_item.update({
-                f'{val}': 0
-            })
-        return dic_item
-    
     # def compute_memo_periodic_filter(self, memo_obj, month=False, year=False):
     #     '''Used to compute the memo records based on the year, month, filter'''
     #     if month and not year:
@@ -776,140 +791,11 @@ class MainOfficeDashboard(http.Controller):
     #         so_ids = pm.mapped('so_ids').filtered(lambda s: s.date_order.strftime("%b") == month and s.date_order.strftime('%Y') == year)
     #         _logger.info(f"this sale: 3 {so_ids}")
     
-    def dynamic_mmr_table(self,domain, kwargs=None):
-        memo_obj = request.env['memo.model'].search(domain)
-        records = []
-        # new_items = {'S/N': '', 'Company': request.env.user.company_id.name, 'Department': ''}
-        new_items = {'Department': ''}
-        # items = {**new_items, **self.get_month_deals()} 
-        memo_project_type = set(memo_obj.mapped('memo_project_type')) #i.e 'payment', 'travel', 'cfwd'
-        currency_name = kwargs.get('currency_name')
-        overall_po_cost = 0
-        _logger.info(f"Check Memo records ==> domainx {domain} and {memo_obj} ")
-        today_year = fields.Date.today()
-        header_item = ['Department', 'Margin'] 
-        for m_type in memo_project_type: # eg ['transport', 'agency', 'travel']
-            if m_type != False:
-                result = {}
-                month_items = {**self.get_month_deals()} # {'Jan': 0, 'Feb': 0 ....} .... 
-                if kwargs.get('month') or kwargs.get('year'):
-                    # filter all within current year
-                    p_memo_ids = memo_obj.filtered(
-                        lambda r: r.memo_project_type == m_type and r.closing_date != False and r.closing_date.strftime('%Y') == kwargs.get('year')
-                        )
-                else:
-                    p_memo_ids = memo_obj.filtered(
-                        lambda r: r.memo_project_type == m_type and r.closing_date != False and r.closing_date.strftime('%Y') == str(today_year.year)
-                        )
-                _logger.info(f"get naira/dollar value of the Projects => {p_memo_ids} {[self.compute_po_naira_dollar_value(pm.po_ids, currency_name)[1] for pm in p_memo_ids]}")
-                month, year = kwargs.get('month'), kwargs.get('year') 
-                # [word for sentence in text for word in sentence]
-                
-                monthly_totals = month_items # {'Jan': 0,} .... # {'Department': '', 'Jan': 0, ..... }
-                for pm in p_memo_ids: #  [143, 134, 411]  # 
-                    _logger.info(f"the prepared file=> {monthly_totals}")
-                    total_po_cost = 0
-                    sum_po_ids = self.compute_po_naira_dollar_value(pm.po_ids) if currency_name in ['NGN'] else \
-                        self.compute_po_naira_dollar_value(pm.po_ids, 'USD')
-                    total_po_cost = sum_po_ids[1]
-                    _logger.info(f"SUM OF PM total cost==> {pm.id} === {total_po_cost}")
-                    _logger.info(f"Check what SO of {m_type} is : PMSS => {p_memo_ids} {[self.compute_so_naira_dollar_value(pm.so_ids, currency_name)[2] for pm in p_memo_ids]}")
-                    budget_rev_total, invoice_revenue_total, invoice_paid_revenue = self.compute_so_naira_dollar_value(pm.so_ids, 'USD') if currency_name in ['USD'] else \
-                            self.compute_so_naira_dollar_value(pm.so_ids, 'NGN')
-                    margin_sum = invoice_revenue_total - total_po_cost # total revenue of the - total of all so ids 
-                    _logger.info(f"MARGIN REVENUE AND PO COST SUM ==> {pm.id} ==> SOOOO ==> {pm.so_ids} =={[p.amount_total for p in pm.so_ids]}= {invoice_revenue_total} - {total_po_cost}====> {margin_sum}")
-                    #  if not kwargs.get('paidInvoice')== "Paid" else invoice_paid_revenue 
-
-                    # filter the month of the closing date
-                    sale_month = pm.closing_date.strftime("%b") # e.g 'Jan or 'Dec' 
-                    if sale_month not in monthly_totals:
-                        # monthly_totals = {'Jan': 0.0, 'Feb': 500.00}
-                        monthly_totals[sale_month] = margin_sum
-                    else:
-                        monthly_totals[sale_month] += margin_sum
-                monthly_totals = {**new_items, **monthly_totals} # add dictionary 1 and dictionary 2 # {'Jan': 0,} .... # {'Department': '', 'Jan': 0, .......}
-                _logger.info(f"MONTHLY TOTALS = {monthly_totals}")
-                result[m_type] = monthly_totals
-                margin_total = 0
-
-                # Done because of some lazy python issues 
-                #result= {'cfwd': {'Department': '', 'Jan': 0, 'Feb': 0, 'Mar': 0, 'Apr': 0, 'May': 270500.0, 
-                # 'Jun': 0, 'Jul': 0, 'Aug': 0, 'Sep': 48000.0, 'Oct': 0, 'Nov': 36000.0}} 
-                
-                for ky, vl in result.items():
-                    for ki, vi in vl.items():
-                        header_item.append(ki) # this will append all the keys ['Department', 'Jan', Feb', 'Margin']
-                        # 'i.e {'Department': '', 'Jan': 0, 'Feb': 0, 'Mar': 0, 'Apr': 0, 'May': 270500.0, 
-                        # 'Jun': 0, 'Jul': 0, 'Aug': 0, 'Sep': 48000.0, 'Oct': 0, 'Nov': 36000.0}
-                        
-                        # COMPUTE MARGIN DIFFERENT FROM FILE TOTAL COST
-                        # if ki not in ['S/N','Company', 'Department']:
-                        if ki not in ['Department']:
-                            margin_total += vi
-                # total_margin = margin_total - total_po_cost # difference in revenue and cost
-                result.get(m_type).update({
-                        'Department': m_type.capitalize() if m_type else '',
-                        'Margin': margin_total,
-                        # 'Margin': total_margin
-                        })# ("%.2f" % margin_total)
-                # {'Jan': 0,} .... # {'Department': '', 'Jan': 0, ....... 'SubTotal': 0, 'Margin': 0}
-                records.append(result)
-                _logger.info(f"What is the value of Recordsxxx {records}")
-
-        if records:
-            ## get the records and looped through to see all the keys in each department 
-            all_month_headers = [] #['Department', 'Mar', 'Apr', 'jun', 'Dec', 'Margin']
-            for rec in records:
-                for rec_key, rec_val in rec.items():
-                    # res = rec_val.keys() # Jan, Mar, Aug ... etc
-                    all_month_headers += list(dict.fromkeys(rec_val))#['Department', 'Mar', 'Apr']
-
-            ordered_list = [
-                'Department', 'Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
-                'Jul', 'Aug', 'Sep', 'Oct', 'Nov','Dec', 'Margin']
-            headers = list(set(all_month_headers))
-            _logger.info(f"headers xvx {headers}")
-            # arrange the list to orderlist
-            given_dict = {item: True for item in headers}
-            # Prepare the result list in the order of ordered_list 
-
-            new_headers = [item for item in ordered_list if item in given_dict]
-            new_records = []
-            # Rearrange each department dictionary to match the desired key order 
-            for record in records:
-                for department, data in record.items(): 
-                    for key in new_headers:
-                        if key not in data:
-                            data[key] = 0  # Set missing months to 0
-
-                    # Rearrange the keys in the desired order
-                    record[department] = {key: data[key] for key in new_headers}
-                    new_records.append(record)
-            _logger.info(f"new record xvx {new_headers} ===== {records}")
-            
-            if new_headers:
-                return {
-                    'headers': new_headers, #[list(records[0][r].keys()) for r in records[0]][0], 
-                    'records': records,
-                    'status': True,
-                    'message': ''
-                }
-            else:
-                return {
-                    'headers': [],
-                    'records': records,
-                    'status': False,
-                    'message': 'No header found to build MMR'
-                }
-            
-        else:
-            return {
-                'headers': [],
-                'records': records,
-                'status': False,
-                'message': 'No record found to build MMR'
-            }
-        _logger.info(f"Final value of records to display {records}")
+    def dynamic_mmr_table(self, domain, kwargs=None):
+        """MMR of the memos in domain, see memo.mmr.report"""
+        kwargs = kwargs or {}
+        currency = 'USD' if kwargs.get('currency_name') in ['USD'] else 'NGN'
+        return request.env['memo.mmr.report'].get_table(domain, currency, kwargs.get('year'))
 
     def line_doughnut_filter_project_type_data(self, domain, kwargs):
         '''docs: returns: project_x_data, budget_amount_project_y_data, revenue_amount_project_y_data
@@ -933,13 +819,13 @@ class MainOfficeDashboard(http.Controller):
                     'usd_budget_total': 0,
                     }
             currency_name = kwargs.get('currency_name')
+            so_finances = self.get_memo_finances(memo_obj, 'USD' if currency_name in ['USD'] else 'NGN')
             for rec in memo_obj:
                 mtype = rec.memo_project_type if not kwargs.get('project_file_type') else rec.memo_type.memo_key
                 # mtype = rec.memo_type.memo_key
                 rec_revenue_months = list(set([r.date_order.strftime('%b') for r in rec.mapped('so_ids').filtered(lambda so: so.state not in ['draft', 'cancel'])]))
                 revenue_total, budget_total, usd_revenue_total, usd_budget_total = 0, 0, 0, 0
-                budget_rev_total, invoice_revenue_total, invoice_paid_revenue = self.compute_so_naira_dollar_value(rec.so_ids, 'USD') if currency_name in ['USD'] else \
-                    self.compute_so_naira_dollar_value(rec.so_ids, 'NGN')
+                budget_rev_total, invoice_revenue_total, invoice_paid_revenue = self.so_finance_values(so_finances[rec.id])
         
                 revenue_total = invoice_revenue_total 
                 budget_total = budget_rev_total 
@@ -1065,158 +951,29 @@ class MainOfficeDashboard(http.Controller):
         """po_ids: po_ids or po_id"""
         total_cost, total_invoiced_cost, total_paid_cost, total_po_to_be_invoiced = 0.00, 0.00, 0.00, 0.00
         if po_ids:
-            _logger.info(f'TEST MY {po_ids}')
+            memo_finance = request.env['memo.finance']
+            rate_index = memo_finance._get_usd_rate_index()
             for po in po_ids:
-                currency_id = po.currency_id
                 # compute btw dates of date approve
-                two_date_before, two_date_after = po.date_approve or po.date_order + timedelta(days=-2), po.date_approve or po.date_order + timedelta(days=2)
-                if currency in ['Naira', 'NGN']:
-                    # do conversion to naira value
-                    if currency_id.name == 'USD' or currency_id.id == 1:
-                        # set the inverse company rate. ie compute from USD to naira
-                        # filter the currency rate as at that time, if not found, used the current rate
-                        # e.g 22 sep < 24 sep > 26 sept
-                        currency_rate = currency_id.mapped('rate_ids').filtered(
-                            lambda cr: two_date_before.date() < cr.name and two_date_after.date() > cr.name
-                            )
-                        currency_usd_id = request.env.ref('base.USD')
-                        usd_rate = currency_usd_id.mapped('rate_ids')
-                        
-                        currency_rate_alternative = currency_id.rate_ids
-                        if currency_rate.ids: # if currency_rate or usd_rate:
-                            rate = currency_rate[0].inverse_company_rate# or currency_rate_alternative[0].inverse_inverse_company_rate
-                            total_cost += po.amount_total * rate
-                            total_invoiced_cost += po.amount_total * rate if po.state not in ['draft', 'cancel'] else 0.00
-                            total_paid_cost += po.amount_total * rate if po.invoice_status in ['invoiced'] else 0.00
-                            total_po_to_be_invoiced += float(po.amount_total * rate) if po.invoice_status not in ['invoiced'] else 0.00
-                            _logger.info(f"Naira filter with USD @ rate: {currency_rate} == {total_invoiced_cost} ")
-                            # ie. 50000 * 0.002600
-                        else:
-                            # usd_rate:
-                            rate = usd_rate[0].inverse_company_rate
-                            total_cost += po.amount_total * rate
-                            total_invoiced_cost += (po.amount_total * rate) if po.state not in ['draft', 'cancel'] else 0.00
-                            total_paid_cost += (po.amount_total * rate) if po.invoice_status in ['invoiced'] else 0.00
-                            total_po_to_be_invoiced += float(po.amount_total * rate) if po.invoice_status not in ['invoiced'] else 0.00
-                            _logger.info(f"Naira filter with default USD Amount {po.amount_total} converted @ rate {rate} === {total_invoiced_cost}")
-                        # else:
-                        #     raise ValidationError('You must ensure that both currencies (NGN, USD) has at least an update rate ids')
-                    else: # value to display is in naira
-                        total_cost += po.amount_total
-                        total_invoiced_cost += po.amount_total if po.state not in ['draft', 'cancel'] else 0.00
-                        total_paid_cost += po.amount_total if po.invoice_status in ['invoiced'] else 0.00
-                        total_po_to_be_invoiced += float(po.amount_total) if po.invoice_status not in ['invoiced'] else 0.00
-                else: 
-                    # Convert all to USD value
-                    if currency_id.name in ['NGN', 'Naira', False] or currency_id.currency_unit_label == 'Naira':
-                        # set the company rate. ie compute from naira to USD
-                        # filter the currency rate as at that time, if not found, used the current rate
-                        # e.g 22 sep < 24 sep > 26 sept
-                        currency_usd_id = request.env.ref('base.USD')
-                        usd_rate = currency_usd_id.mapped('rate_ids')
-                        currency_rate = usd_rate.filtered(
-                            lambda cr: two_date_before.date() < cr.name and two_date_after.date() > cr.name
-                            )
-                        # currency_rate_alternative = currency_id.rate_ids
-                        if currency_rate.ids:
-                            rate = currency_rate[0].inverse_company_rate or usd_rate[0].inverse_company_rate
-                            # total += po.amount_total / rate
-                            total_cost += float(po.amount_total / rate)
-                            total_invoiced_cost += (po.amount_total / rate) if po.state not in ['draft', 'cancel'] else 0.00
-                            total_paid_cost += po.amount_total / rate if po.invoice_status in ['invoiced'] else 0.00
-                            total_po_to_be_invoiced += float(po.amount_total / rate) if po.invoice_status not in ['invoiced'] else 0.00
-                            # ie. 50000 * 1600
-                        elif usd_rate:
-                            rate = usd_rate[0].inverse_company_rate
-                            total_cost += float(po.amount_total / rate)
-                            total_invoiced_cost += (po.amount_total / rate) if po.state not in ['draft', 'cancel'] else 0.00
-                            total_paid_cost += (po.amount_total / rate) if po.invoice_status in ['invoiced'] else 0.00
-                            total_po_to_be_invoiced += float(po.amount_total / rate) if po.invoice_status not in ['invoiced'] else 0.00
-                        else:
-                            raise ValidationError('You must ensure that both currencies (NGN, USD) has at least an update rate ids')
-                    else: # value to display is in USD
-                        total_cost += po.amount_total
-                        total_invoiced_cost += po.amount_total if po.state not in ['draft', 'cancel'] else 0.00
-                        total_paid_cost += po.amount_total if po.invoice_status in ['invoiced'] else 0.00
-                        total_po_to_be_invoiced += float(po.amount_total) if po.invoice_status not in ['invoiced'] else 0.00
+                amount = float(memo_finance._convert_amount(
+                    po.amount_total, po.currency_id, po.date_approve or po.date_order, currency, rate_index))
+                total_cost += amount
+                total_invoiced_cost += amount if po.state not in ['draft', 'cancel'] else 0.00
+                total_paid_cost += amount if po.invoice_status in ['invoiced'] else 0.00
+                total_po_to_be_invoiced += amount if po.invoice_status not in ['invoiced'] else 0.00
         return round(total_cost), round(total_invoiced_cost), round(total_paid_cost), round(total_po_to_be_invoiced, 2)
     
     def compute_so_naira_dollar_value(self, so_ids, currency='NGN'):
         total_budget_revenue, total_invoiced_revenue, total_paid_revenue = 0, 0, 0
         if so_ids:
-            currency_usd_id = request.env.ref('base.USD') 
-            usd_rate = currency_usd_id.mapped('rate_ids')
-            rate = usd_rate[0].inverse_company_rate
+            memo_finance = request.env['memo.finance']
+            rate_index = memo_finance._get_usd_rate_index()
             for so in so_ids:
-                currency_id = so.pricelist_id.currency_id
-                # compute btw dates of date approve
-                two_date_before, two_date_after = so.date_order + timedelta(days=-2), so.date_order + timedelta(days=2)
-                if currency in ['Naira', 'NGN']:
-                    # do conversion to naira value
-                    if currency_id.name == 'USD' or currency_id.id == 1:
-                        # set the inverse company rate. ie compute from USD to naira
-                        # filter the currency rate as at that time, if not found, used the current rate
-                        # e.g 22 sep < 24 sep > 26 sept
-                        currency_rate = currency_id.mapped('rate_ids').filtered(
-                            lambda cr: two_date_before.date() < cr.name and two_date_after.date() > cr.name
-                            )
-                        currency_rate_alternative = currency_id.rate_ids
-                        if currency_rate.ids: # or currency_rate_alternative:
-                            # rate = currency_rate[0].inverse_inverse_company_rate# or currency_rate_alternative[0].inverse_inverse_company_rate
-                            rate = currency_rate[0].inverse_company_rate# or currency_rate_alternative[0].inverse_inverse_company_rate
-                            total_budget_revenue += float(so.amount_total * rate)
-                            total_invoiced_revenue += float(so.amount_total * rate) if so.state not in ['draft', 'cancel'] else 0
-                            total_paid_revenue += float(so.amount_total * rate) if so.invoice_status in ['invoiced'] else 0
-                            # ie. 50000 * 0.002600
-                        elif usd_rate:
-                            rate = usd_rate[0].inverse_company_rate
-                            total_budget_revenue += float(so.amount_total * rate)
-                            total_invoiced_revenue += float(so.amount_total * rate) if so.state not in ['draft', 'cancel'] else 0
-                            total_paid_revenue += float(so.amount_total * rate) if so.invoice_status in ['invoiced'] else 0
-                        else:
-                            raise ValidationError('You must ensure that both currencies (NGN, USD) has at least an update rate ids')
-                    else: # value to display is in naira
-                        total_budget_revenue += float(so.amount_total)
-                        total_invoiced_revenue += float(so.amount_total) if so.state not in ['draft', 'cancel'] else 0
-                        total_paid_revenue += float(so.amount_total) if so.invoice_status in ['invoiced'] else 0
-                else: 
-                    # Convert all value to USD value
-                    # _logger.info(f'Rate SO converted {so.amount_total} --- {so.amount_total / 1600}')
-                    # _logger.info(f"AT WHAT RATE 2{so.name}")
-                    # total_budget_revenue += float(so.amount_total / rate)
-                    # total_invoiced_revenue += float(so.amount_total / rate) if so.state not in ['draft', 'cancel'] else 0
-                    # total_paid_revenue += float(so.amount_total / rate) if so.invoice_status in ['invoiced'] else 0
-                    # _logger.info(f"AT WHAT RATE 12  {total_invoiced_revenue}")
-                    if currency_id.name in ['NGN', 'Naira', False]:# or currency_id.currency_unit_label == 'Naira':
-                        currency_rate = usd_rate.filtered(
-                            lambda cr: two_date_before.date() < cr.name and two_date_after.date() > cr.name)
-                        if currency_rate.ids:
-                            # _logger.info(f'Rate sxxxx SO {currency_usd_id} --- {so}... {currency_rate} or {usd_rate}')
-                            rate = currency_rate[0].inverse_company_rate or usd_rate[0].inverse_company_rate
-                            # total += so.amount_total / rate
-                            total_budget_revenue += float(so.amount_total / rate)
-                            total_invoiced_revenue += float(so.amount_total / rate) if so.state not in ['draft', 'cancel'] else 0
-                            total_paid_revenue += float(so.amount_total / rate) if so.invoice_status in ['invoiced'] else 0
-                            # ie. 50000 * 1600
-                        # elif usd_rate:
-                        else: # usd_rate:
-                            
-                            rate = usd_rate[0].inverse_company_rate
-                            # total += so.amount_total / rate
-                            total_budget_revenue += float(so.amount_total / rate)
-                            total_invoiced_revenue += float(so.amount_total / rate) if so.state not in ['draft', 'cancel'] else 0
-                            _logger.info(f"CONVERSI {so.amount_total} AND {rate} === {so.amount_total / rate}")
-                            total_paid_revenue += float(so.amount_total / rate) if so.invoice_status in ['invoiced'] else 0
-                            _logger.info(f"AT WHAT RATE {so.id} ===> {so.amount_total} RATE: {rate} TOTAL {total_invoiced_revenue}")
-                            _logger.info(f"Naira SO filter with USD @ rate: {rate} == {total_invoiced_revenue} ")
-                        # else:
-                        #     raise ValidationError('You must ensure that currencies (USD) has at least an update rate ids')
-                    else: # value to display is in USD
-                        _logger.info(f"AT WHAT RATE 2{so.name}")
-                        # total += so.amount_total
-                        total_budget_revenue += float(so.amount_total)
-                        total_invoiced_revenue += float(so.amount_total) if so.state not in ['draft', 'cancel'] else 0
-                        total_paid_revenue += float(so.amount_total) if so.invoice_status in ['invoiced'] else 0
+                amount = float(memo_finance._convert_amount(
+                    so.amount_total, so.pricelist_id.currency_id, so.date_order, currency, rate_index))
+                total_budget_revenue += amount
+                total_invoiced_revenue += amount if so.state not in ['draft', 'cancel'] else 0
+                total_paid_revenue += amount if so.invoice_status in ['invoiced'] else 0
         return round(total_budget_revenue, 3), round(total_invoiced_revenue, 3), round(total_paid_revenue, 3)
     
     def line_doughnut_filter_customer_data(self, domain, kwargs={}):
@@ -1248,11 +1005,10 @@ class MainOfficeDashboard(http.Controller):
                     'usd_budget_total': 0,
                     }
             # e.g {'travel': {'revenue_total': 34400, 'budget_total': 6000}, 'logistics': {'total': 34400}}
+            so_finances = self.get_memo_finances(memo_obj, 'USD' if currency_name in ['USD'] else 'NGN')
             for rec in memo_obj: 
                 budget_total, revenue_total, usd_revenue_total, usd_budget_total = 0,0,0,0 
-                computed_invoice_result = self.compute_so_naira_dollar_value(rec.so_ids, 'USD') if currency_name in ['USD'] else \
-                    self.compute_so_naira_dollar_value(rec.so_ids, 'NGN')
-                budget_total, revenue_total, paid_revenue_total = computed_invoice_result, 
+                budget_total, revenue_total, paid_revenue_total = self.so_finance_values(so_finances[rec.id])
                 budget_project_total = customer_project_dicts.get(f'{rec.client_id.id}').get('budget_total') + budget_total
                 revenue_project_total = customer_project_dicts.get(f'{rec.client_id.id}').get('revenue_total') + revenue_total
                 
@@ -1287,12 +1043,17 @@ class MainOfficeDashboard(http.Controller):
         # [hr_department.browse(dp).name for dp in list(set(departments))]
 
     @http.route(["/memo-records"], type='http', auth='user', website=True, website_published=True)
+    @profiled()
     def open_related_record_view(self):
         url = "/web#action=487&model=memo.model&view_type=list&cids=1&menu_id=333"
         return request.redirect(url)
 
     @http.route(['/display-mmr-data'], type='json', website=True, auth="user", csrf=False)
+    @profiled()
     def display_MMR(self, **post):
+        return self.get_cached_payload('display_mmr', post)[1]
+    
+    def display_mmr_payload(self, post):
         kwargs = dict(
             project_file_type = post.get('project_file_type'),
             memo_project_type = post.get('memo_project_type'),
@@ -1330,12 +1091,16 @@ class MainOfficeDashboard(http.Controller):
             # by default , show the MMR for the current year and later check if year or month is added to domain
             month_domain = self.get_memo_with_month_year(kwargs.get('month'), kwargs.get('year'))
             domain += month_domain #
-        _logger.info(f"show me domain {domain}")
+        _logger.debug("show me domain %s", domain)
         vals=self.dynamic_mmr_table(domain, kwargs)
         return vals
     
     @http.route(['/display-file-admin'], type='json', website=True, auth="user", csrf=False)
+    @profiled()
     def displayFileAdmin(self, **post):
+        return self.get_cached_payload('file_admin', post)[1]
+    
+    def file_admin_payload(self, post):
         kwargs = dict(
             project_file_type = post.get('project_file_type'),
             customer_name = post.get('customer_name'),
@@ -1362,22 +1127,15 @@ class MainOfficeDashboard(http.Controller):
             fr_domain = self.get_memo_with_frame_agreement(fr_id)
             if fr_domain:
                 domain = domain + fr_domain 
-        _logger.info(f'This ko kwargs {kwargs} and {domain}')
-        
-        memo_ids = request.env["memo.model"].sudo().search(domain)
-        _logger.info(f'This is fer 0 {memo_ids}')
+        _logger.debug("This ko kwargs %s and %s", kwargs, domain)
         
         # Getting the month and year filters
-        month, year = kwargs.get('month'), kwargs.get('year')
-        if month and not year:
-            memo_ids = memo_ids.filtered(lambda mon: mon.date.strftime('%b') == month)
-        if year and not month:
-            memo_ids = memo_ids.filtered(lambda mon: mon.date.strftime('%Y') == year)
-        if year and month:
-            memo_ids = memo_ids.filtered(lambda mon: mon.date.strftime('%b') == month and mon.date.strftime('%Y') == year)
-        #####################################3 
+        if kwargs.get('month') or kwargs.get('year'):
+            domain += self.get_memo_with_month_year(kwargs.get('month'), kwargs.get('year'))
+        memo_ids = request.env["memo.model"].sudo().search(domain)
+        _logger.debug("This is fer 0 %s", memo_ids)
         vals=self.dynamicFileAdmin(memo_ids)
-        _logger.info(f'This is fer {vals} and {memo_ids}')
+        _logger.debug("This is fer %s and %s", vals, memo_ids)
         return vals
     
     def dynamicFileAdmin(self, memo_ids):
@@ -1459,7 +1217,11 @@ class MainOfficeDashboard(http.Controller):
           
     
     @http.route(['/display-frame-agreeement'], type='json', website=True, auth="user", csrf=False)
+    @profiled()
     def displayFrame_agreement(self, **post):
+        return self.get_cached_payload('frame_agreement', post)[1]
+    
+    def frame_agreement_payload(self, post):
         kwargs = dict(
             project_file_type = post.get('project_file_type'),
             customer_name = post.get('customer_name'),
@@ -1485,9 +1247,7 @@ class MainOfficeDashboard(http.Controller):
         system computes the percentage ratio as 100,000 * 100 / 500,000 = 20 %
         The green shows 20 % while the budget (red ) shows 80 %
         """
-        currency_usd_id = request.env.ref('base.USD') 
-        usd_rate = currency_usd_id.mapped('rate_ids')
-        rate = usd_rate[0].inverse_company_rate
+        rate = request.env['memo.finance']._get_usd_rate_index().latest()
         frame_agreement = request.env['memo.frame.agreement']
         memo = request.env['memo.model']
         fr_id = None
@@ -1505,24 +1265,18 @@ class MainOfficeDashboard(http.Controller):
             fr_domain = self.get_memo_with_frame_agreement(fr_id)
             if fr_domain:
                 domain = domain + fr_domain 
-        _logger.info(f"WHat is domain new {domain}")
-        frame_memo_ids = memo.search(domain)
-        
         # Getting the month and year filter
-        month, year = kwargs.get('month'), kwargs.get('year')
-        if month and not year:
-            frame_memo_ids = frame_memo_ids.filtered(lambda mon: mon.date.strftime('%b') == month)
-        if year and not month:
-            frame_memo_ids = frame_memo_ids.filtered(lambda mon: mon.date.strftime('%Y') == year)
-        if year and month:
-            frame_memo_ids = frame_memo_ids.filtered(lambda mon: mon.date.strftime('%b') == month and mon.date.strftime('%Y') == year)
-        #####################################3
+        if kwargs.get('month') or kwargs.get('year'):
+            domain = domain + self.get_memo_with_month_year(kwargs.get('month'), kwargs.get('year'))
+        _logger.debug("WHat is domain new %s", domain)
+        frame_memo_ids = memo.search(domain)
         
-        _logger.info(f"the new memos agreement {frame_memo_ids}")
+        _logger.debug("the new memos agreement %s", frame_memo_ids)
         
         currency_name = kwargs.get('currency_name')
         frame_agreement_budget, confirmed_so, all_so, balance = 0,0,0,0
         if frame_memo_ids:
+            so_finances = self.get_memo_finances(frame_memo_ids, 'USD' if currency_name in ['USD'] else 'NGN')
             for x in frame_memo_ids:
                 for fr in x.frame_agreement_ids: # you can filter the only frame id as x.mapped(frame_agreement_ids).filtered(lambda f: f.fr_id)
                     frame_agreement_budget += fr.agreed_budget
@@ -1530,8 +1284,7 @@ class MainOfficeDashboard(http.Controller):
                 # confirmed_so_ids = x.mapped('so_ids').filtered(lambda s: s.state not in ['cancel', 'draft'])
                 # all_so_ids = x.mapped('so_ids').filtered(lambda s: s.state not in ['cancel'])
                 
-                budget_revenue_total, invoice_revenue_total, invoice_paid_revenue = self.compute_so_naira_dollar_value(x.so_ids, 'USD') if currency_name in ['USD'] else \
-                    self.compute_so_naira_dollar_value(x.so_ids, 'NGN')
+                budget_revenue_total, invoice_revenue_total, invoice_paid_revenue = self.so_finance_values(so_finances[x.id])
                 amt = invoice_revenue_total + invoice_paid_revenue
                 confirmed_so += amt
                 all_so += budget_revenue_total
@@ -1558,7 +1311,11 @@ class MainOfficeDashboard(http.Controller):
         
         
     @http.route(['/refresh-data'], type='json', website=True, auth="user", csrf=False)
+    @profiled()
     def refresh_data(self, **post):
+        return self.get_cached_payload('refresh_data', post)[1]
+    
+    def refresh_data_payload(self, post):
         kwargs = dict(
             project_file_type = post.get('project_file_type'),
             project_file_category_type = post.get('project_file_category_type'),
@@ -1574,4 +1331,49 @@ class MainOfficeDashboard(http.Controller):
             )
         vals = self.office_dashboard(kwargs=kwargs)
         return vals
-        
\ No newline at end of file
+    
+    def get_cached_payload(self, endpoint, post):
+        '''returns (etag, payload) of the dashboard endpoint for the filters in post
+        from the office.dashboard.cache, the payload is only built on cache miss'''
+        payload_method = getattr(self, DASHBOARD_PAYLOADS[endpoint])
+
+        def compute_payload():
+            with profile_span(f'dashboard.{endpoint}', request.env.cr):
+                return payload_method(post)
+        return request.env['office.dashboard.cache'].get_or_compute(endpoint, post, compute_payload)
+    
+    @http.route(['/dashboard-data/<string:endpoint>'], type='http', auth="user", methods=['GET'])
+    @profiled()
+    def dashboard_data(self, endpoint, **post):
+        '''GET version of the dashboard json endpoints, the browser revalidates
+        its copy with the ETag and gets a 304 while the data did not change'''
+        if endpoint not in DASHBOARD_PAYLOADS:
+            return request.not_found()
+        etag, payload = self.get_cached_payload(endpoint, post)
+        headers = [
+            ('Content-Type', 'application/json'),
+            ('Cache-Control', 'private, no-cache'),
+            ('ETag', f'"{etag}"'),
+        ]
+        if request.httprequest.if_none_match.contains(etag):
+            return request.make_response('', headers=headers, status=304)
+        return request.make_response(request.env['office.dashboard.cache'].serialize(payload), headers=headers)
+    
+    @http.route(['/dashboard-cache/stats'], type='json', auth="user")
+    def dashboard_cache_stats(self, **post):
+        '''hit / miss counters of the dashboard cache of the current worker'''
+        if not request.env.user.has_group('base.group_system'):
+            raise AccessError(_("Only administrators can read the dashboard cache statistics"))
+        return request.env['office.dashboard.cache'].get_stats()
+
+    @http.route(['/dashboard-profiler/stats'], type='json', auth="user")
+    def dashboard_profiler_stats(self, reset=False, **post):
+        '''timing and query count of the dashboard routes and memo compute
+        methods of the current worker, reset=True clears the counters'''
+        if not request.env.user.has_group('base.group_system'):
+            raise AccessError(_("Only administrators can read the dashboard profiler statistics"))
+        stats = request.env['memo.profiler'].get_stats()
+        if reset:
+            request.env['memo.profiler'].reset()
+        return stats
+        
@@ -0,0 +1 @@
+from . import dashboard_cache
\ No newline at end of file
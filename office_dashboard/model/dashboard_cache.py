@@ -0,0 +1,226 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from odoo import models, api
+
+_logger = logging.getLogger(__name__)
+
+CACHE_SIGNALING_SEQUENCE = 'office_dashboard_cache_signaling'
+
+
+class DashboardResponseCache(object):
+    """In process LRU cache whose entries expire after ttl seconds"""
+
+    def __init__(self, max_size=256, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._data = OrderedDict()
+        self.hits, self.misses, self.evictions = 0, 0, 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits * 100.0 / lookups, 2) if lookups else 0.00,
+            }
+
+
+dashboard_cache = DashboardResponseCache()
+
+
+class OfficeDashboardCache(models.AbstractModel):
+    """Cache of the dashboard JSON payloads.
+
+    Entries are keyed by database, company, user (the payloads are built
+    with the record rules of the user), the access groups of the user, the
+    normalized filters and the currency. Writes on memos, orders and
+    currency rates, and the refresh of the memo finance snapshots, bump a
+    database sequence after commit, the sequence value is part of the key
+    so every worker stops serving older payloads.
+    """
+    _name = "office.dashboard.cache"
+    _description = "Office dashboard response cache"
+
+    def init(self):
+        self.env.cr.execute(f"CREATE SEQUENCE IF NOT EXISTS {CACHE_SIGNALING_SEQUENCE}")
+
+    def _get_version(self):
+        self.env.cr.execute(f"SELECT last_value, is_called FROM {CACHE_SIGNALING_SEQUENCE}")
+        last_value, is_called = self.env.cr.fetchone()
+        # the first nextval of a new sequence returns its start value
+        return last_value if is_called else 0
+
+    @api.model
+    def invalidate(self):
+        """invalidates the cached payloads of all the workers once the
+        current transaction is committed"""
+        cr = self.env.cr
+        if not cr.cache.get(CACHE_SIGNALING_SEQUENCE):
+            cr.cache[CACHE_SIGNALING_SEQUENCE] = True
+            registry = self.env.registry
+
+            @cr.postcommit.add
+            def signal_dashboard_changes():
+                cr.cache.pop(CACHE_SIGNALING_SEQUENCE, None)
+                with registry.cursor() as signal_cr:
+                    signal_cr.execute(f"SELECT nextval('{CACHE_SIGNALING_SEQUENCE}')")
+                dashboard_cache.clear()
+
+            @cr.postrollback.add
+            def reset_dashboard_signal():
+                cr.cache.pop(CACHE_SIGNALING_SEQUENCE, None)
+
+    def _normalize_filters(self, kwargs):
+        return tuple(sorted(
+            (key, str(value)) for key, value in (kwargs or {}).items() if value not in [None, False, '']
+        ))
+
+    def _make_key(self, endpoint, kwargs):
+        user = self.env.user
+        groups_hash = hashlib.sha1(str(sorted(user.groups_id.ids)).encode()).hexdigest()
+        currency_name = (kwargs or {}).get('currency_name') or 'NGN'
+        return (
+            self.env.cr.dbname, self.env.company.id, self.env.uid, groups_hash, endpoint,
+            self._normalize_filters(kwargs), currency_name, self._get_version(),
+        )
+
+    @api.model
+    def get_or_compute(self, endpoint, kwargs, compute):
+        """returns (etag, payload) of the endpoint for the filters kwargs,
+        compute() is only called when no valid cached payload exists"""
+        params = self.env['ir.config_parameter'].sudo()
+        dashboard_cache.ttl = int(params.get_param('office_dashboard.cache_ttl', 300))
+        dashboard_cache.max_size = int(params.get_param('office_dashboard.cache_size', 256))
+        key = self._make_key(endpoint, kwargs)
+        etag = hashlib.sha1(repr(key).encode()).hexdigest()
+        payload = dashboard_cache.get(key)
+        if payload is None:
+            payload = compute()
+            dashboard_cache.set(key, payload)
+        return etag, payload
+
+    @api.model
+    def get_stats(self):
+        stats = dashboard_cache.stats()
+        stats.update({'pid': os.getpid(), 'version': self._get_version()})
+        return stats
+
+    @api.model
+    def serialize(self, payload):
+        return json.dumps(payload, default=str)
+
+
+class MemoModel(models.Model):
+    _inherit = "memo.model"
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self.env['office.dashboard.cache'].invalidate()
+        return super(MemoModel, self).create(vals_list)
+
+    def write(self, vals):
+        self.env['office.dashboard.cache'].invalidate()
+        return super(MemoModel, self).write(vals)
+
+    def unlink(self):
+        self.env['office.dashboard.cache'].invalidate()
+        return super(MemoModel, self).unlink()
+
+
+class SaleOrder(models.Model):
+    _inherit = "sale.order"
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self.env['office.dashboard.cache'].invalidate()
+        return super(SaleOrder, self).create(vals_list)
+
+    def write(self, vals):
+        self.env['office.dashboard.cache'].invalidate()
+        return super(SaleOrder, self).write(vals)
+
+    def unlink(self):
+        self.env['office.dashboard.cache'].invalidate()
+        return super(SaleOrder, self).unlink()
+
+
+class PurchaseOrder(models.Model):
+    _inherit = "purchase.order"
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self.env['office.dashboard.cache'].invalidate()
+        return super(PurchaseOrder, self).create(vals_list)
+
+    def write(self, vals):
+        self.env['office.dashboard.cache'].invalidate()
+        return super(PurchaseOrder, self).write(vals)
+
+    def unlink(self):
+        self.env['office.dashboard.cache'].invalidate()
+        return super(PurchaseOrder, self).unlink()
+
+
+class ResCurrencyRate(models.Model):
+    _inherit = "res.currency.rate"
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self.env['office.dashboard.cache'].invalidate()
+        return super(ResCurrencyRate, self).create(vals_list)
+
+    def write(self, vals):
+        self.env['office.dashboard.cache'].invalidate()
+        return super(ResCurrencyRate, self).write(vals)
+
+    def unlink(self):
+        self.env['office.dashboard.cache'].invalidate()
+        return super(ResCurrencyRate, self).unlink()
+
+
+class MemoFinanceSnapshot(models.Model):
+    _inherit = "memo.finance.snapshot"
+
+    @api.model
+    def refresh_snapshots(self, memo_ids):
+        # the snapshot rows are written in SQL by the cron after the orders
+        # were written, the payloads cached in between hold the old totals
+        result = super(MemoFinanceSnapshot, self).refresh_snapshots(memo_ids)
+        self.env['office.dashboard.cache'].invalidate()
+        return result
@@ -15,6 +15,7 @@ from bs4 import BeautifulSoup
 import odoo
 import odoo.addons.web.controllers.home as main
 from odoo.addons.web.controllers.utils import ensure_db, _get_login_redirect_url, is_user_internal
+from odoo.addons.portal.controllers.portal import pager as portal_pager
 from odoo.tools.translate import _
 
 
@@ -24,6 +25,15 @@ SIGN_UP_REQUEST_PARAMS = {'db', 'login', 'debug', 'token', 'message', 'error', '
                           'redirect', 'redirect_hostname', 'email', 'name', 'partner_id',
                           'password', 'confirm_password', 'city', 'country_id', 'lang', 'signup_email'}
 LOGIN_SUCCESSFUL_PARAMS = set()
+MY_REQUESTS_PAGE_SIZE = 10
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+# request_type of /portal-request-employee => (model, domain)
+AUTOCOMPLETE_MODELS = {
+	'department': ('hr.department', [('active', '=', True)]),
+	'role': ('hr.job', [('active', '=', True)]),
+	'district': ('hr.district', []),
+}
 
 def get_url(id):
 	base_url = http.request.env['ir.config_parameter'].sudo().get_param('web.base.url')
@@ -122,14 +132,7 @@ class PortalRequest(http.Controller):
 	def portal_request(self):
 		"""Request portal for employee / portal users
 		"""
-		memo_config_memo_type_ids = [mt.memo_type.id for mt in request.env["memo.config"].sudo().search([])]
-		vals = {
-			# "district_ids": request.env["hr.district"].sudo().search([]),
-			"leave_type_ids": request.env["hr.leave.type"].sudo().search([]),
-			"memo_key_ids": request.env["memo.type"].sudo().search([
-				('id', 'in', memo_config_memo_type_ids), ('allow_for_publish', '=', True)
-				]),
-		}
+		vals = request.env["portal.request.bootstrap"].get_bootstrap(request.env.company.id)
 		return request.render("portal_request.portal_request_template", vals)
 	 
 	@http.route(['/check_staffid/<staff_num>'], type='json', website=True, auth="user", csrf=False)
@@ -471,80 +474,52 @@ class PortalRequest(http.Controller):
 		# request.session.clear()
 		return request.render("portal_request.portal_request_success_template", vals)
 
+	def autocomplete_response(self, model, domain, post, display):
+		"""select2 page of the records of model matching domain whose name starts with the search term (q),
+		page and page_limit (max AUTOCOMPLETE_MAX_LIMIT) are the page number and size"""
+		limit = min(int(post.get('page_limit') or AUTOCOMPLETE_LIMIT), AUTOCOMPLETE_MAX_LIMIT)
+		page = max(int(post.get('page') or 1), 1)
+		if post.get('q'):
+			domain = domain + [('name', '=ilike', post.get('q') + '%')]
+		records = request.env[model].sudo().search(domain, order='name, id', limit=limit + 1, offset=(page - 1) * limit)
+		return json.dumps({
+			"results": [display(item) for item in records[:limit]],
+			"pagination": {
+				"more": len(records) > limit,
+			}
+		})
+
 	@http.route(['/portal-request-product'], type='http', website=True, auth="user", csrf=False)
 	def get_portal_product(self, **post):
-		productItems = json.loads(post.get('productItems'))
+		productItems = json.loads(post.get('productItems') or '[]')
 		request_type_option = post.get('request_type')
-		_logger.info(f'productitemmms {productItems}')
 		domain = [
 			('detailed_type', 'in', ['consu', 'product']), ('id', 'not in', [int(i) for i in productItems])
 			]
 		if request_type_option and request_type_option == "vehicle_request":
 			domain = [('is_vehicle_product', '=', True), ('detailed_type', 'in', ['service']), ('id', 'not in', [int(i) for i in productItems])]
-		products = request.env["product.product"].sudo().search(domain)
-		return json.dumps({
-			"results": [{"id": item.id,"text": f'{item.name} {item.id}', 'qty': item.qty_available} for item in products],
-			"pagination": {
-				"more": True,
-			}
-		})
+		return self.autocomplete_response(
+			"product.product", domain, post,
+			lambda item: {"id": item.id, "text": f'{item.name} {item.id}', 'qty': item.qty_available})
 
 	@http.route(['/portal-request-employee'], type='http', website=True, auth="user", csrf=False)
 	def get_portal_employee(self, **post):
 		request_type_option = post.get('request_type')
-		if request_type_option:
-			if request_type_option == "employee":
-				employeeItems = json.loads(post.get('employeeItems'))
-				_logger.info(f'Employeeitemmms {employeeItems}')
-				domain = [('active', '=', True), ('id', 'not in', [int(i) for i in employeeItems])]
-				employees = request.env["hr.employee"].sudo().search(domain)
-				return json.dumps({
-					"results": [{"id": item.id,"text": f'{item.name} - {item.employee_number}'} for item in employees],
-					"pagination": {
-						"more": True,
-					}
-				})	
-			elif request_type_option == "department":
-				domain = [('active', '=', True)]
-				departments = request.env["hr.department"].sudo().search(domain)
-				return json.dumps({
-					"results": [{"id": item.id,"text": f'{item.name}'} for item in departments],
-					"pagination": {
-						"more": True,
-					}
-				})
-			elif request_type_option == "role":
-				domain = [('active', '=', True)]
-				departments = request.env["hr.job"].sudo().search(domain)
-				return json.dumps({
-					"results": [{"id": item.id,"text": f'{item.name}'} for item in departments],
-					"pagination": {
-						"more": True,
-					}
-				})
-			elif request_type_option == "district":
-				domain = []
-				departments = request.env["hr.district"].sudo().search(domain)
-				return json.dumps({
-					"results": [{"id": item.id,"text": f'{item.name}'} for item in departments],
-					"pagination": {
-						"more": True,
-					}
-				})
-			else:	
-				return json.dumps({
-					"results": [{"id": '',"text": '',}],
-					"pagination": {
-						"more": True,
-					}
-				})	
+		if request_type_option == "employee":
+			employeeItems = json.loads(post.get('employeeItems') or '[]')
+			domain = [('active', '=', True), ('id', 'not in', [int(i) for i in employeeItems])]
+			return self.autocomplete_response(
+				"hr.employee", domain, post, lambda item: {"id": item.id, "text": f'{item.name} - {item.employee_number}'})
+		elif request_type_option in AUTOCOMPLETE_MODELS:
+			model, domain = AUTOCOMPLETE_MODELS[request_type_option]
+			return self.autocomplete_response(model, domain, post, lambda item: {"id": item.id, "text": f'{item.name}'})
 		else:
 			return json.dumps({
 				"results": [{"id": '',"text": ''}],
 				"pagination": {
-					"more": True,
+					"more": False,
 				}
-			})	
+			})
 
 	@http.route(['/my/request-state'], type='json', website=True, auth="user", csrf=False)
 	def check_qty(self,  *args, **kwargs):
@@ -854,24 +829,6 @@ class PortalRequest(http.Controller):
 				})
 			counter += 1
 
-	def get_pagination(self, page):
-		sessions = request.session  
-		session_start_limit = sessions.get('start')
-		session_end_limit = sessions.get('end')
-		if page == "next":
-			s = session_end_limit 
-			e = session_end_limit + 10
-		elif page == 'prev': 
-			# e.g start 20 , end 30
-			s = session_start_limit - 10
-			e = session_end_limit - 10
-			# sessions['start'] = s 
-			# sessions['end'] = e
-		else:
-			s = 0 
-			e = 10
-		return s, e
-	
 	def get_request_info(self, request):
 		"""
 		Returns context data extracted from :param:`request`.
@@ -882,59 +839,42 @@ class PortalRequest(http.Controller):
 		query_string = urlparts.query
 		_logger.info(f"URL PARTS = {urlparts} QUERY STRING IS {query_string}")
 
-	@http.route(['/my/requests', '/my/requests/<string:type>', '/my/requests/param/<string:search_param>', '/my/requests/page/<string:page>'], type='http', auth="user", website=True)
-	def my_requests(self, type=False, page=False, search_param=False):
+	@http.route([
+		'/my/requests', '/my/requests/page/<int:page>',
+		'/my/requests/<string:type>', '/my/requests/<string:type>/page/<int:page>',
+		'/my/requests/param/<string:search_param>', '/my/requests/param/<string:search_param>/page/<int:page>',
+		], type='http', auth="user", website=True)
+	def my_requests(self, type=False, page=1, search_param=False):
 		"""This route is used to call the requesters or user records for display
-		page: the pagination index: prev or next
+		page: the page number, the page records are read with limit / offset
 		type: material_request
 		"""
 		user = request.env.user
-		sessions = request.session
-		if not page: 
-			sessions['start'] = 0 
-			sessions['end'] = 10
-		
-		all_memo_type_keys = [rec.memo_key for rec in request.env['memo.type'].search([])]
-		
 		memo_type = ['payment_request', 'Loan'] if type in ['payment_request', 'Loan'] \
 			else ['soe', 'cash_advance'] if type in ['soe', 'cash_advance'] \
 				else ['leave_request'] if type in ['leave_request'] \
 					else ['employee_update'] if type in ['employee_update'] \
 						else ['Internal', 'procurement_request', 'procurement', 'vehicle_request', 'material_request'] \
 							if type in ['Internal', 'procurement_request','procurement','server_access' 'vehicle_request', 'material_request'] \
-								else all_memo_type_keys
+								else False
 		request_id = request.env['memo.model'].sudo()
-		domain = [
-				('active', '=', True),
-				'|','|','|','|',('employee_id.user_id', '=', user.id),
-				('users_followers.user_id','=', user.id),
-				('employee_id.administrative_supervisor_id.user_id.id','=', user.id),
-				('memo_setting_id.approver_ids.user_id.id','=', user.id),
-				('stage_id.approver_ids.user_id.id','=', user.id),
-			]
-		domain += [
-			('memo_type.memo_key', 'in', memo_type),
-		]
+		domain = [('active', '=', True)] + request_id._get_visible_memo_domain(user.id)
+		if memo_type:
+			domain += [('memo_type.memo_key', 'in', memo_type)]
 		if search_param:
-			# if request.httprequest:
-			requests = request.httprequest 
-			# url_obj = self.get_request_info()
-			# self.get_request_info(requests)
 			domain += [
 				'|', ('name', 'ilike', search_param),
 				('code', 'ilike', search_param),
 			]
-			
-		start, end = self.get_pagination(page)# if page else False, False
-		_logger.info(f"Session storage is {sessions.get('start')} {sessions.get('end')}")
-		requests = request_id.search(domain)
-		if requests:
-			requests = requests[start:end]# if page else request_id.search(domain)
-			sessions['start'] = start
-			sessions['end'] = end 
-		else:
-			requests = False
-		values = {'requests': requests}
+		url = '/my/requests/param/%s' % search_param if search_param else '/my/requests/%s' % type if type else '/my/requests'
+		pager = portal_pager(
+			url=url,
+			total=request_id.search_count(domain),
+			page=page,
+			step=MY_REQUESTS_PAGE_SIZE,
+		)
+		requests = request_id.search(domain, limit=MY_REQUESTS_PAGE_SIZE, offset=pager['offset'])
+		values = {'requests': requests or False, 'pager': pager}
 		return request.render("portal_request.my_portal_request", values)
 	
 	@http.route('/my/request/view/<string:id>', type='http', auth="user", website=True)
@@ -946,14 +886,8 @@ class PortalRequest(http.Controller):
 		attachment = request.env['ir.attachment'].sudo()
 		domain = [
 				('active', '=', True),
-				# ('employee_id.user_id', '=', user.id),
 				('id', '=', int(id)),
-				'|','|','|','|',('employee_id.user_id', '=', user.id),
-				('users_followers.user_id','=', user.id),
-				('employee_id.administrative_supervisor_id.user_id.id','=', user.id),
-				('memo_setting_id.approver_ids.user_id.id','=', user.id),
-				('stage_id.approver_ids.user_id.id','=', user.id),
-			]
+			] + request_id._get_visible_memo_domain(user.id)
 		requests = request_id.search(domain, limit=1)
 		memo_attachment_ids = attachment.search([
 			('res_model', '=', 'memo.model'),
@@ -973,10 +907,8 @@ class PortalRequest(http.Controller):
 		user = request.env.user
 		request_id = request.env['memo.model'].sudo()
 		domain = [
-			# ('employee_id.user_id', '=', user.id),
 			('id', '=', post.get('memo_id')),
-			# ('state', 'in', ['Refuse']),
-		]
+		] + request_id._get_visible_memo_domain(user.id)
 		request_record = request_id.search(domain, limit=1)
 		stage_id = False
 		status = post.get('status', '')
@@ -1086,7 +1018,7 @@ class PortalRequest(http.Controller):
 		request_id = request.env['memo.model'].sudo()
 		domain = [
 			('id', '=', int(post.get('memo_id'))),
-		]
+		] + request_id._get_visible_memo_domain(request.env.user.id)
 		request_record = request_id.search(domain, limit=1)
 		_logger.info(f"retriving memo update {request_record}...")
 		if request_record:
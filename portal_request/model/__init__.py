@@ -1 +1,2 @@
-from . import product_inherit
\ No newline at end of file
+from . import product_inherit
+from . import portal_bootstrap
\ No newline at end of file
@@ -0,0 +1,104 @@
+from odoo import models, fields, api, tools
+
+# fields whose change alters the reference lists of the request form
+BOOTSTRAP_FIELDS = {
+    'memo.config': {'memo_type', 'active'},
+    'memo.type': {'allow_for_publish', 'active'},
+    'hr.leave.type': {'company_id', 'active'},
+}
+
+
+class PortalRequestBootstrap(models.AbstractModel):
+    """Reference lists of the portal request form, cached per company.
+
+    The ids are kept in the registry ormcache, keyed by the version of the
+    portal_bootstrap cache (see memo.cache.version), bumped when a memo
+    config, memo type or leave type is created, deleted or one of the
+    BOOTSTRAP_FIELDS is written.
+    """
+    _name = "portal.request.bootstrap"
+    _description = "Portal Request Bootstrap"
+
+    @api.model
+    @tools.ormcache('company_id', 'version')
+    def _get_bootstrap_ids(self, company_id, version):
+        return self._read_bootstrap_ids(company_id)
+
+    @api.model
+    def _read_bootstrap_ids(self, company_id):
+        self = self.sudo()
+        memo_type_ids = self.env["memo.config"].search([]).memo_type.ids
+        return {
+            'leave_type_ids': tuple(self.env["hr.leave.type"].search([('company_id', 'in', [False, company_id])]).ids),
+            'memo_key_ids': tuple(self.env["memo.type"].search([
+                ('id', 'in', memo_type_ids), ('allow_for_publish', '=', True),
+            ]).ids),
+        }
+
+    @api.model
+    def get_bootstrap(self, company_id):
+        """returns the records of the form reference lists: {'leave_type_ids', 'memo_key_ids'}"""
+        version = self.env['memo.cache.version'].get('portal_bootstrap')
+        if version is None:
+            ids = self._read_bootstrap_ids(company_id)
+        else:
+            ids = self._get_bootstrap_ids(company_id, version)
+        return {
+            'leave_type_ids': self.env["hr.leave.type"].sudo().browse(ids['leave_type_ids']),
+            'memo_key_ids': self.env["memo.type"].sudo().browse(ids['memo_key_ids']),
+        }
+
+    @api.model
+    def invalidate_bootstrap(self):
+        self.env['memo.cache.version'].bump('portal_bootstrap')
+
+
+class MemoCacheVersion(models.AbstractModel):
+    _inherit = "memo.cache.version"
+
+    def _get_cache_names(self):
+        return super()._get_cache_names() + ['portal_bootstrap']
+
+
+class PortalBootstrapMixin(models.AbstractModel):
+    _name = "portal.request.bootstrap.mixin"
+    _description = "Invalidates the portal request bootstrap cache"
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['portal.request.bootstrap'].invalidate_bootstrap()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if set(vals) & BOOTSTRAP_FIELDS.get(self._name, set()):
+            self.env['portal.request.bootstrap'].invalidate_bootstrap()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['portal.request.bootstrap'].invalidate_bootstrap()
+        return res
+
+
+class MemoConfig(models.Model):
+    _name = "memo.config"
+    _inherit = ["memo.config", "portal.request.bootstrap.mixin"]
+
+
+class MemoType(models.Model):
+    _name = "memo.type"
+    _inherit = ["memo.type", "portal.request.bootstrap.mixin"]
+
+
+class HrLeaveType(models.Model):
+    _name = "hr.leave.type"
+    _inherit = ["hr.leave.type", "portal.request.bootstrap.mixin"]
+
+
+class HrEmployee(models.Model):
+    _inherit = "hr.employee"
+
+    # prefix search of the request form autocompletion
+    name = fields.Char(index='trigram')
@@ -318,7 +318,7 @@ $(document).ready(function () {
                 };
               },
               results: function (data, page) {
-                var more = (page * 30) < data.total;
+                var more = data.pagination.more;
                 console.log(data);
                 return {results: data.results, more: more};
               },
@@ -344,7 +344,7 @@ $(document).ready(function () {
                 };
               },
               results: function (data, page) {
-                var more = (page * 30) < data.total;
+                var more = data.pagination.more;
                 console.log(data);
                 return {results: data.results, more: more};
               },
@@ -370,7 +370,7 @@ $(document).ready(function () {
                 };
               },
               results: function (data, page) {
-                var more = (page * 30) < data.total;
+                var more = data.pagination.more;
                 console.log(data);
                 return {results: data.results, more: more};
               },
@@ -396,7 +396,7 @@ $(document).ready(function () {
                 };
               },
               results: function (data, page) {
-                var more = (page * 30) < data.total;
+                var more = data.pagination.more;
                 console.log(data);
                 return {results: data.results, more: more};
               },
@@ -425,7 +425,7 @@ $(document).ready(function () {
                 };
               },
               results: function (data, page) {
-                var more = (page * 30) < data.total;
+                var more = data.pagination.more;
                 console.log(data);
                 // localStorage.setItem('productStorage', JSON.stringify(data.results))
                 return {results: data.results, more: more};
@@ -452,7 +452,7 @@ $(document).ready(function () {
         };
         },
         results: function (data, page) {
-        var more = (page * 30) < data.total;
+        var more = data.pagination.more;
         return {results: data.results, more: more};
         },
         cache: true
@@ -13,6 +13,7 @@
         'views/trucking_view.xml',
         'data/warehouse_stage_data.xml',
         'data/memo_type_warehouse.xml',
+        'data/customer_stock_ledger_data.xml',
         'views/financial_file_views.xml',
         'views/stock_move_operations_views.xml',
         'views/stock_picking_views.xml',
@@ -1,4 +1,5 @@
 from . import inventory
 from . import stock_move
 from . import trucking
-from . import stock_picking
\ No newline at end of file
+from . import stock_picking
+from . import stock_ledger
\ No newline at end of file
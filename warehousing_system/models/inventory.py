@@ -41,7 +41,18 @@ class WarehouseInventory(models.Model):
     def create(self, vals):
         vals['is_saved'] = True
         result = super(WarehouseInventory, self).create(vals)
-        
+
+        return result
+
+    def write(self, vals):
+        if 'customer_id' not in vals:
+            return super(WarehouseInventory, self).write(vals)
+        # move the done quantities to the new customer in the customer stock ledger
+        done_moves = self.move_ids.filtered(lambda move: move.state == 'done')
+        ledger = self.env['customer.stock.ledger'].sudo()
+        ledger._apply_moves(done_moves, sign=-1)
+        result = super(WarehouseInventory, self).write(vals)
+        ledger._apply_moves(done_moves)
         return result
     is_saved = fields.Boolean(default=False)
     @api.onchange('warehouse_id')
@@ -913,6 +924,63 @@ class WarehouseInventory(models.Model):
             return 0
     
     
+    def _get_dashboard_cards(self):
+        """returns {card: (aggregate, domain)} of the dashboard cards,
+        aggregate is 'count' (number of pickings) or 'area' (sum of area_chargeable)"""
+        return {
+            'totalInventoryItem': ('count', self.total_inventory_item_domain()),
+            'expectedTomorrow': ('count', self.expected_date_today_domain()),
+            'expectedToday': ('count', self.expected_date_later_domain()),
+            'toBePutInStock': ('count', self.to_be_put_in_stock_domain()),
+            'withoutAllocatedStorage': ('count', self.without_allocated_storage_domain()),
+            'labelsToBePrinted': ('count', self.labels_to_be_printed_domain()),
+            'longerThan90Days': ('count', self._actual_arrival_date_domain_90_days()),
+            'openOSDInventory': ('count', self.open_osd_inventory_domain()),
+            'PendingdispatchedItems': ('count', self.pending_dispatched_items_domain()),
+            'criticalStockItems': ('count', self.get_critical_items_domain()),
+            'dangerousGoods': ('count', self.get_dangerous_goods_domain()),
+            'temperatureSensitive': ('count', self.get_temperature_sensitive_domain()),
+            'mainWarehouseUtilization': ('area', self.get_mainWarehouse_utilization_domain()),
+            'bondedWarehouseUtilization': ('area', self.get_bondedWarehouse_utilization_domain()),
+            'coveredStackingUtilization': ('area', self.get_coveredStacking_utilization_domain()),
+            'openStackingUtilization': ('area', self.get_openStacking_utilization_domain()),
+        }
+
+    def _compute_dashboard_cards(self, base_domain, cards):
+        """Computes all the cards on the pickings of base_domain in a single query,
+        each card being a COUNT(*) / SUM(area_chargeable) FILTER (WHERE <card domain>)
+        returns {card: value}, areas are formatted with 2 decimals
+        """
+        self._flush_search(base_domain)
+        query = self._where_calc(base_domain)
+        self._apply_ir_rules(query, 'read')
+        from_clause, where_clause, where_params = query.get_sql()
+        columns, column_params, result = [], [], {}
+        for card, (aggregate, domain) in cards.items():
+            self._flush_search(domain)
+            card_query = self._where_calc(domain)
+            if card_query._joins:
+                # the card needs other tables than stock_picking, not possible in a FILTER clause
+                pickings = self.search(base_domain + domain)
+                result[card] = len(pickings) if aggregate == 'count' else sum(pickings.mapped('area_chargeable'))
+                continue
+            _from, card_where, card_params = card_query.get_sql()
+            if aggregate == 'count':
+                columns.append(f'COUNT(*) FILTER (WHERE {card_where or "TRUE"})')
+            else:
+                columns.append(f'COALESCE(SUM("{self._table}"."area_chargeable") FILTER (WHERE {card_where or "TRUE"}), 0)')
+            column_params += card_params
+        query_cards = [card for card in cards if card not in result]
+        if query_cards:
+            self.env.cr.execute(
+                f"SELECT {', '.join(columns)} FROM {from_clause} WHERE {where_clause or 'TRUE'}",
+                column_params + where_params)
+            result.update(zip(query_cards, self.env.cr.fetchone()))
+        return {
+            card: "%.2f" % (result[card] or 0.00) if cards[card][0] == 'area' else result[card]
+            for card in cards
+        }
+
     @api.model
     def get_warehouse_dashboard_data(self, filters=None):
         """
@@ -927,74 +995,13 @@ class WarehouseInventory(models.Model):
                 - month: Month for create_date
                 - year: Year for create_date
         """
-        # _logger.info(f"Method called with args: {repr(locals())}")
-        # _logger.info(f"self: {self}")
-        # _logger.info(f"filters parameter: {repr(filters)}")
         if not filters:
             filters = {}
-        # _logger.info(f"Filters type: {type(filters)}")
-        # _logger.info(f"Filters content: {filters}")
-        # _logger.info(f"Filters repr: {repr(filters)}")
             
         base_domain = self.get_base_domain(filters) or []
-        _logger.info(f'Base: Domain: {base_domain}')
-        
-        total_inventory_item = self.search_count(base_domain + self.total_inventory_item_domain())
-        expected_tomorrow = self.search_count(base_domain + self.expected_date_today_domain())
-        expected_today = self.search_count(base_domain + self.expected_date_later_domain())
-        to_be_put_in_stock = self.search_count(base_domain + self.to_be_put_in_stock_domain())
-        without_allocated_storage = self.search_count(base_domain + self.without_allocated_storage_domain())
-        
-        not_printed_labels = self.search(base_domain + self.labels_to_be_printed_domain())
-        labels_to_be_printed = len(not_printed_labels)
-        
-        longer_than_90_days = self.search_count(base_domain + self._actual_arrival_date_domain_90_days())
-        
-        open_osd_inventory = self.search_count(base_domain + self.open_osd_inventory_domain())
-        
-        # displaced_items = self.search_count(base_domain + self.displaced_items_domain())
-        
-        PendingdispatchedItems = self.search_count(base_domain + self.pending_dispatched_items_domain())
-        
-        move_base_domain = self._get_move_base_domain(filters)
-        _logger.info(f'Base Domain for stock.move: {move_base_domain}')
-
-
-        critical_stock_items = self.search_count(base_domain + self.get_critical_items_domain())
-        dangerous_goods = self.search_count(base_domain + self.get_dangerous_goods_domain())
-        temperature_sensitive = self.search_count(base_domain + self.get_temperature_sensitive_domain())
-        
-        main_domain = base_domain + self.get_mainWarehouse_utilization_domain()
-        bonded_domain = base_domain + self.get_bondedWarehouse_utilization_domain()
-        covered_domain = base_domain + self.get_coveredStacking_utilization_domain()
-        open_domain = base_domain + self.get_openStacking_utilization_domain()
-        
-        mainWarehouseUtilization = self.get_utilizationArea(main_domain)
-        bondedWarehouseUtilization = self.get_utilizationArea(bonded_domain)
-        coveredStackingUtilization = self.get_utilizationArea(covered_domain)
-        openStackingUtilization = self.get_utilizationArea(open_domain)
-        
-        result = {
-            'totalInventoryItem': total_inventory_item,
-            'expectedTomorrow': expected_tomorrow,
-            'expectedToday': expected_today,
-            'toBePutInStock': to_be_put_in_stock,
-            'withoutAllocatedStorage': without_allocated_storage,
-            'labelsToBePrinted': labels_to_be_printed,
-            'longerThan90Days': longer_than_90_days,
-            'openOSDInventory': open_osd_inventory,
-            'criticalStockItems': critical_stock_items,
-            'dangerousGoods': dangerous_goods,
-            'temperatureSensitive': temperature_sensitive,
-            'PendingdispatchedItems': PendingdispatchedItems,
-            'mainWarehouseUtilization': "%.2f" % mainWarehouseUtilization,
-            'bondedWarehouseUtilization': "%.2f" % bondedWarehouseUtilization,
-            'coveredStackingUtilization': "%.2f" % coveredStackingUtilization,
-            'openStackingUtilization': "%.2f" % openStackingUtilization
-        }
-        
-        _logger.info(f"Dashboard data: {result}")
-        
+        _logger.debug("Base: Domain: %s", base_domain)
+        result = self._compute_dashboard_cards(base_domain, self._get_dashboard_cards())
+        _logger.debug("Dashboard data: %s", result)
         return result
 
     
@@ -1102,55 +1109,15 @@ class WarehouseInventory(models.Model):
             filters = {}
             
         base_domain = self._get_customer_secure_base_domain(filters) or []
-        _logger.info(f'Customer Base Domain: {base_domain}')
-        
-        total_inventory_item = self.search_count(base_domain + self.total_inventory_item_domain())
-        expected_tomorrow = self.search_count(base_domain + self.expected_date_later_domain())
-        expected_today = self.search_count(base_domain + self.expected_date_today_domain())
-        to_be_put_in_stock = self.search_count(base_domain + self.to_be_put_in_stock_domain())
-        without_allocated_storage = self.search_count(base_domain + self.without_allocated_storage_domain())
-        
-        not_printed_labels = self.search(base_domain + self.labels_to_be_printed_domain())
-        labels_to_be_printed = len(not_printed_labels)
-        
-        longer_than_90_days = self.search_count(base_domain + self._actual_arrival_date_domain_90_days())
-        open_osd_inventory = self.search_count(base_domain + self.open_osd_inventory_domain())
-        pending_dispatched_items = self.search_count(base_domain + self.pending_dispatched_items_domain())
-        
-        critical_stock_items = self.search_count(base_domain + self.get_critical_items_domain())
-        dangerous_goods = self.search_count(base_domain + self.get_dangerous_goods_domain())
-        temperature_sensitive = self.search_count(base_domain + self.get_temperature_sensitive_domain())
-        
-        main_domain = base_domain + self.get_mainWarehouse_utilization_domain()
-        bonded_domain = base_domain + self.get_bondedWarehouse_utilization_domain()
-        covered_domain = base_domain + self.get_coveredStacking_utilization_domain()
-        open_domain = base_domain + self.get_openStacking_utilization_domain()
-        
-        main_warehouse_utilization = self.get_utilizationArea(main_domain)
-        bonded_warehouse_utilization = self.get_utilizationArea(bonded_domain)
-        covered_stacking_utilization = self.get_utilizationArea(covered_domain)
-        open_stacking_utilization = self.get_utilizationArea(open_domain)
-        
-        result = {
-            'totalInventoryItem': total_inventory_item,
-            'expectedTomorrow': expected_tomorrow,
-            'expectedToday': expected_today,
-            'toBePutInStock': to_be_put_in_stock,
-            'withoutAllocatedStorage': without_allocated_storage,
-            'labelsToBePrinted': labels_to_be_printed,
-            'longerThan90Days': longer_than_90_days,
-            'openOSDInventory': open_osd_inventory,
-            'pendingDispatchedItems': pending_dispatched_items,
-            'criticalStockItems': critical_stock_items,
-            'dangerousGoods': dangerous_goods,
-            'temperatureSensitive': temperature_sensitive,
-            'mainWarehouseUtilization': "%.2f" % main_warehouse_utilization,
-            'bondedWarehouseUtilization': "%.2f" % bonded_warehouse_utilization,
-            'coveredStackingUtilization': "%.2f" % covered_stacking_utilization,
-            'openStackingUtilization': "%.2f" % open_stacking_utilization
-        }
-        
-        _logger.info(f"Customer Dashboard data: {result}")
+        _logger.debug("Customer Base Domain: %s", base_domain)
+        cards = self._get_dashboard_cards()
+        cards.update({
+            'expectedTomorrow': ('count', self.expected_date_later_domain()),
+            'expectedToday': ('count', self.expected_date_today_domain()),
+            'pendingDispatchedItems': cards.pop('PendingdispatchedItems'),
+        })
+        result = self._compute_dashboard_cards(base_domain, cards)
+        _logger.debug("Customer Dashboard data: %s", result)
         return result
 
     @api.model
@@ -0,0 +1,163 @@
+from odoo import api, fields, models, _
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# done incoming / outgoing moves of the customers grouped by (customer, product, location)
+# incoming moves are counted at their destination, outgoing moves at their source location
+LEDGER_MOVES_QUERY = """
+    SELECT sp.customer_id AS customer_id,
+           sm.product_id AS product_id,
+           CASE WHEN spt.code = 'incoming' THEN sm.location_dest_id ELSE sm.location_id END AS location_id,
+           SUM(CASE WHEN spt.code = 'incoming' THEN sm.product_uom_qty ELSE 0 END)::float8 AS qty_in,
+           SUM(CASE WHEN spt.code = 'outgoing' THEN sm.product_uom_qty ELSE 0 END)::float8 AS qty_out
+      FROM stock_move sm
+      JOIN stock_picking sp ON sp.id = sm.picking_id
+      JOIN stock_picking_type spt ON spt.id = sm.picking_type_id
+     WHERE sm.state = 'done'
+       AND sm.active IS NOT FALSE
+       AND sp.customer_id IS NOT NULL
+       AND spt.code IN ('incoming', 'outgoing')
+       {move_filter}
+  GROUP BY 1, 2, 3
+"""
+
+
+class CustomerStockLedger(models.Model):
+    """Running balance of the quantities received and dispatched for a customer,
+    per product and location.
+
+    The ledger is updated incrementally when stock moves are done, so the
+    quantity in stock of a customer is a single row lookup instead of summing
+    the whole history of the customer moves.
+    """
+    _name = 'customer.stock.ledger'
+    _description = 'Customer Stock Ledger'
+    _rec_name = 'product_id'
+
+    customer_id = fields.Many2one('res.partner', string='Customer', required=True, index=True, ondelete='cascade')
+    product_id = fields.Many2one('product.product', string='Product', required=True, ondelete='cascade')
+    location_id = fields.Many2one('stock.location', string='Location', required=True, ondelete='cascade')
+    qty_in = fields.Float(string='Quantity Received')
+    qty_out = fields.Float(string='Quantity Dispatched')
+    balance = fields.Float(string='Balance', compute='_compute_balance')
+
+    _sql_constraints = [
+        ('customer_product_location_uniq', 'unique(customer_id, product_id, location_id)',
+         'A customer can only have one ledger line per product and location'),
+    ]
+
+    def init(self):
+        # first installation: build the ledger from the existing moves
+        self.env.cr.execute("SELECT 1 FROM customer_stock_ledger LIMIT 1")
+        if not self.env.cr.fetchone():
+            self.rebuild_ledger()
+
+    @api.depends('qty_in', 'qty_out')
+    def _compute_balance(self):
+        for rec in self:
+            rec.balance = max(0.0, rec.qty_in - rec.qty_out)
+
+    def _flush_moves(self):
+        self.env['stock.move'].flush_model(['state', 'active', 'product_id', 'product_uom_qty', 'location_id', 'location_dest_id', 'picking_id', 'picking_type_id'])
+        self.env['stock.picking'].flush_model(['customer_id'])
+
+    @api.model
+    def _apply_moves(self, moves, sign=1):
+        """Adds (sign=1) or removes (sign=-1) the done moves quantities to the ledger"""
+        if not moves:
+            return
+        self._flush_moves()
+        self.env.cr.execute(f"""
+            INSERT INTO customer_stock_ledger (customer_id, product_id, location_id, qty_in, qty_out,
+                                               create_uid, create_date, write_uid, write_date)
+            SELECT customer_id, product_id, location_id, %s * qty_in, %s * qty_out,
+                   %s, now() at time zone 'UTC', %s, now() at time zone 'UTC'
+              FROM ({LEDGER_MOVES_QUERY.format(move_filter='AND sm.id = ANY(%s)')}) moves
+            ON CONFLICT (customer_id, product_id, location_id) DO UPDATE SET
+                qty_in = customer_stock_ledger.qty_in + EXCLUDED.qty_in,
+                qty_out = customer_stock_ledger.qty_out + EXCLUDED.qty_out,
+                write_uid = EXCLUDED.write_uid,
+                write_date = EXCLUDED.write_date
+        """, [sign, sign, self.env.uid, self.env.uid, moves.ids])
+        self.invalidate_model()
+
+    @api.model
+    def get_balances(self, keys):
+        """keys: iterable of (customer_id, product_id, location_id)
+        returns {key: quantity still in stock}, missing keys have a 0.0 balance"""
+        keys = {key for key in keys if all(key)}
+        if not keys:
+            return {}
+        self.flush_model()
+        customer_ids, product_ids, location_ids = (list({key[i] for key in keys}) for i in range(3))
+        self.env.cr.execute("""
+            SELECT customer_id, product_id, location_id, GREATEST(qty_in - qty_out, 0)
+              FROM customer_stock_ledger
+             WHERE customer_id = ANY(%s) AND product_id = ANY(%s) AND location_id = ANY(%s)
+        """, [customer_ids, product_ids, location_ids])
+        balances = {row[:3]: row[3] for row in self.env.cr.fetchall()}
+        return {key: balances.get(key, 0.0) for key in keys}
+
+    @api.model
+    def rebuild_ledger(self):
+        """Recomputes the whole ledger from the done stock moves"""
+        self._flush_moves()
+        self.env.cr.execute("DELETE FROM customer_stock_ledger")
+        self.env.cr.execute(f"""
+            INSERT INTO customer_stock_ledger (customer_id, product_id, location_id, qty_in, qty_out,
+                                               create_uid, create_date, write_uid, write_date)
+            SELECT customer_id, product_id, location_id, qty_in, qty_out,
+                   %s, now() at time zone 'UTC', %s, now() at time zone 'UTC'
+              FROM ({LEDGER_MOVES_QUERY.format(move_filter='')}) moves
+        """, [self.env.uid, self.env.uid])
+        self.invalidate_model()
+        _logger.info("Customer stock ledger rebuilt with %s lines", self.env.cr.rowcount)
+        return True
+
+    @api.model
+    def check_consistency(self):
+        """Compares the ledger with the done stock moves
+        returns the list of (customer_id, product_id, location_id, ledger (in, out), moves (in, out))
+        of the lines that differ"""
+        self.flush_model()
+        self._flush_moves()
+        self.env.cr.execute(f"""
+            WITH moves AS ({LEDGER_MOVES_QUERY.format(move_filter='')})
+            SELECT COALESCE(l.customer_id, m.customer_id), COALESCE(l.product_id, m.product_id),
+                   COALESCE(l.location_id, m.location_id),
+                   COALESCE(l.qty_in, 0), COALESCE(l.qty_out, 0), COALESCE(m.qty_in, 0), COALESCE(m.qty_out, 0)
+              FROM customer_stock_ledger l
+         FULL JOIN moves m ON m.customer_id = l.customer_id
+                          AND m.product_id = l.product_id
+                          AND m.location_id = l.location_id
+             WHERE ABS(COALESCE(l.qty_in, 0) - COALESCE(m.qty_in, 0)) > 0.0001
+                OR ABS(COALESCE(l.qty_out, 0) - COALESCE(m.qty_out, 0)) > 0.0001
+        """)
+        return [
+            (customer_id, product_id, location_id, (ledger_in, ledger_out), (moves_in, moves_out))
+            for customer_id, product_id, location_id, ledger_in, ledger_out, moves_in, moves_out in self.env.cr.fetchall()
+        ]
+
+    @api.model
+    def _cron_check_consistency(self, repair=False):
+        mismatches = self.check_consistency()
+        if mismatches:
+            _logger.warning("Customer stock ledger has %s lines different from the stock moves: %s",
+                            len(mismatches), mismatches[:20])
+            if repair:
+                self.rebuild_ledger()
+        return mismatches
+
+    def action_rebuild_ledger(self):
+        self.rebuild_ledger()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Customer Stock Ledger'),
+                'message': _('The customer stock ledger has been rebuilt from the stock moves.'),
+                'type': 'success',
+                'sticky': False,
+            },
+        }
@@ -105,52 +105,51 @@ class StockMove(models.Model):
 
     def _get_customer_remaining_qty(self, product, customer_id, location_id):
         """Calculate what’s still in stock for this customer+location."""
-        inc = self.env['stock.move'].search([
-            ('product_id', '=', product.id),
-            ('restrict_partner_id', '=', customer_id),
-            ('location_dest_id', '=', location_id),
-            ('picking_type_id.code', '=', 'incoming'),
-            ('state', '=', 'done'),
-        ])
-        total_in = sum(inc.mapped('product_uom_qty'))
-        out = self.env['stock.move'].search([
-            ('product_id', '=', product.id),
-            ('restrict_partner_id', '=', customer_id),
-            ('location_id', '=', location_id),
-            ('picking_type_id.code', '=', 'outgoing'),
-            ('state', '=', 'done'),
-        ])
-        total_out = sum(out.mapped('product_uom_qty'))
-        return max(0.0, total_in - total_out)
+        key = (customer_id, product.id, location_id)
+        return self.env['customer.stock.ledger'].sudo().get_balances([key]).get(key, 0.0)
     
     
     remaining_qty = fields.Float(
         string="Quantity in Stock",
-        compute="_compute_remaining_qty",
-        store=True)
+        compute="_compute_remaining_qty")
     
     @api.depends('product_id', 'restrict_partner_id', 'location_id')
     def _compute_remaining_qty(self):
+        keys = {
+            move: (move.restrict_partner_id.id, move.product_id.id, move.location_id.id)
+            for move in self
+        }
+        balances = self.env['customer.stock.ledger'].sudo().get_balances(keys.values())
         for move in self:
-            if move.product_id and move.restrict_partner_id and move.location_id:
-                move.remaining_qty = self._get_customer_remaining_qty(
-                    move.product_id,
-                    move.restrict_partner_id.id,
-                    move.location_id.id,
-                )
-            else:
-                move.remaining_qty = 0.0
+            move.remaining_qty = balances.get(keys[move], 0.0)
     
     balance_qty = fields.Float(
         string="Balance Qty", 
         compute="_compute_balance_qty",
-        store=True
         )
     
     @api.depends('remaining_qty', 'product_uom_qty')
     def _compute_balance_qty(self):
         for move in self:
             move.balance_qty = move.remaining_qty - move.product_uom_qty
+
+    def _action_done(self, cancel_backorder=False):
+        already_done = self.filtered(lambda move: move.state == 'done')
+        moves = super(StockMove, self)._action_done(cancel_backorder=cancel_backorder)
+        self.env['customer.stock.ledger'].sudo()._apply_moves(
+            moves.filtered(lambda move: move.state == 'done') - already_done)
+        return moves
+
+    def write(self, vals):
+        if 'active' not in vals:
+            return super(StockMove, self).write(vals)
+        # archived done moves are no longer part of the customer stock
+        changed = self.filtered(lambda move: move.state == 'done' and move.active != bool(vals['active']))
+        ledger = self.env['customer.stock.ledger'].sudo()
+        ledger._apply_moves(changed.filtered('active'), sign=-1)
+        res = super(StockMove, self).write(vals)
+        ledger._apply_moves(changed.filtered('active'))
+        return res
             
     @api.onchange('product_id')
     def _auto_fill_description_picking(self):